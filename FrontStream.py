@@ -9,16 +9,37 @@ import pandas as pd
 import plotly.express as px
 import threading
 import time
+import os
 import regex
-from forecastFront import show_forecast,get_forecast
+from collections import deque
+from contextlib import contextmanager
+from forecastFront import show_forecast,get_forecast,prefetch_bundle,ASSETS_URL
+from dashboardFront import pagina_tablero
+from ringBuffer import RingBuffer
+from weatherStreamClient import suscripcion
+from weatherAssets import recurso_para
 from datetime import datetime, timedelta
 
 #https://openweathermap.org/forecast5
 
 # Definir la URL base de la API
 base_url = "http://localhost:8000/weather/"
-# URL base para obtener los íconos de OpenWeather
-icon_base_url = "https://openweathermap.org/img/wn/"
+# Segundos entre actualizaciones de la vista en vivo
+REFRESH_SECONDS = 5
+# Antigüedad máxima del último evento del flujo de la ciudad antes de consultar el servicio directamente
+# (el flujo solo publica cuando los datos cambian, una vez por CACHE_CURRENT_TTL del servicio: 60 s por defecto)
+STREAM_MAX_AGE = 180
+# Puntos que se conservan por métrica (720 = 1 hora con actualizaciones cada 5 segundos)
+HISTORY_CAPACITY = 720
+# Reducción de puntos (conservando mínimos y máximos) al dibujar una serie llena
+CHART_DOWNSAMPLE = True
+CHART_MAX_POINTS = 240
+# Modo instrumentación: tiempos por etapa de cada actualización (también activable en la barra lateral)
+INSTRUMENTATION_DEFAULT = os.getenv("CLIMA_INSTRUMENT", "0") == "1"
+INSTRUMENTATION_HISTORY = 120
+# Imagen de fondo servida por el servicio: ancho (se redondea a una variante pregenerada) y formato
+HERO_WIDTH = 1280
+HERO_FORMAT = "webp"
 
 # Configuración de la página
 st.set_page_config(page_title="Reportes climáticos", page_icon="🌤️",layout="wide")
@@ -32,9 +53,53 @@ st.sidebar.write(
     "3. Para conocer el pronóstico de los proximos 5 dias, presiona 'Mostrar forecast'.\n"
     "4. Presiona 'Detener Seguimiento' para detener todo el monitoreo.\n"
     "5. Recomiendo recargar la página para consultar el clima de otra ciudad luego de detener el seguimiento.\n"
+    "6. Para seguir varias ciudades a la vez, elige el modo 'Tablero' e ingresa las ciudades separadas por comas.\n"
 )
+st.sidebar.radio("Modo", ["Una ciudad", "Tablero"], key="modo", horizontal=True)
+st.sidebar.checkbox("Modo instrumentación", value=INSTRUMENTATION_DEFAULT, key="instrumentacion",
+                    help="Mide el tiempo de cada etapa de la actualización en vivo.")
 forecast_message_marker = st.empty()
 
+@contextmanager
+def medir(etapa):
+    """
+    Acumula el tiempo transcurrido dentro del bloque en la etapa indicada del tick actual.
+
+    Solo mide cuando el modo instrumentación está activo; en otro caso no hace nada.
+
+    Parámetros:
+    - etapa (str): Nombre de la etapa, p. ej. "get_weather_data" o "plotly_chart".
+    """
+    if not st.session_state.get("instrumentacion"):
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        tick = st.session_state.setdefault("tiempos_tick", {})
+        tick[etapa] = tick.get(etapa, 0.0) + (time.perf_counter() - inicio) * 1000
+
+def mostrar_instrumentacion():
+    """
+    Guarda los tiempos del tick actual y muestra el último tick y la media de los recientes.
+
+    No devuelve nada.
+    """
+    tick = st.session_state.pop("tiempos_tick", None)
+    if not tick:
+        return
+    historial = st.session_state.setdefault("historial_tiempos", deque(maxlen=INSTRUMENTATION_HISTORY))
+    historial.append(tick)
+    etapas = list(tick)
+    tabla = pd.DataFrame({
+        "Etapa": etapas,
+        "Último tick (ms)": [round(tick[e], 2) for e in etapas],
+        f"Media últimos {len(historial)} (ms)": [round(sum(t.get(e, 0.0) for t in historial) / len(historial), 2) for e in etapas],
+    })
+    with st.expander("Instrumentación"):
+        st.dataframe(tabla, hide_index=True)
+
 # Función para obtener datos climáticos de la API
 def get_weather_data(city):
     """
@@ -43,6 +108,13 @@ def get_weather_data(city):
     La función valida el nombre de la ciudad para asegurar que contenga solo letras Unicode y espacios.
     Si la API devuelve un error o no se encuentra información para la ciudad proporcionada, 
     se muestra un mensaje de error en Streamlit y se restablece el estado de seguimiento.
+    Si OpenWeather no está disponible (503/504) o se agotó la cuota de consultas (429) el seguimiento
+    continúa y se reintenta en la siguiente actualización; si el servicio responde con datos
+    obsoletos, se indica su antigüedad.
+
+    Los datos se toman del flujo Server-Sent Events de la ciudad, compartido por todas las sesiones
+    que la siguen; solo si el flujo todavía no recibió nada reciente (p. ej. en la primera
+    actualización) se consulta el servicio directamente.
 
     Parámetros:
     - city (str): Nombre de la ciudad para la cual obtener los datos climáticos.
@@ -56,20 +128,32 @@ def get_weather_data(city):
         st.session_state.start_update = False  # Reset tracking state
         return None
 
-    url = base_url + city
-    response = httpx.get(url)
-    
-    if response.status_code == 404:
+    evento = suscripcion(base_url + city + "/stream").ultimo_evento(max_age=STREAM_MAX_AGE)
+    if evento is None:
+        # Solo se piden los campos que usa la interfaz
+        response = httpx.get(base_url + city, params={"compact": "true"})
+        status_code = response.status_code
+    else:
+        nombre, datos = evento
+        status_code = 200 if nombre == "weather" else datos["status"]
+
+    if status_code == 404:
         st.error(f"No se encontró información climática para la ciudad: {city}. Por favor, intenta con otra ciudad.")
         st.session_state.start_update = False  # Reset tracking state
         return None
-    elif response.status_code != 200:
+    elif status_code == 429:
+        st.warning("Se alcanzó el límite de consultas a OpenWeather. Se reintentará en la próxima actualización.")
+        return None
+    elif status_code in (503, 504):
+        st.warning("OpenWeather no responde en este momento. Se reintentará en la próxima actualización.")
+        return None
+    elif status_code != 200:
         st.error("Hubo un problema al obtener los datos del clima. Por favor, intenta nuevamente.")
         st.session_state.start_update = False  # Reset tracking state
         return None
 
-    weather_data = response.json()
-    st.session_state.weather_data = response.json()
+    weather_data = response.json() if evento is None else datos
+    st.session_state.weather_data = weather_data
     
     essential_keys = ['name', 'weather', 'main', 'sys', 'coord', 'wind']
     for key in essential_keys:
@@ -78,8 +162,32 @@ def get_weather_data(city):
             st.session_state.start_update = False  # Reset tracking state
             return None
 
+    if "stale" in weather_data:
+        st.warning(f"OpenWeather no responde: se muestran los últimos datos disponibles "
+                   f"(de hace {weather_data['stale']['age'] // 60} min).")
     return weather_data
 
+def grafico_serie(buffer, metrica, titulo):
+    """
+    Crea el gráfico de línea de una serie en vivo.
+
+    Cuando el buffer está lleno y `CHART_DOWNSAMPLE` está activo, la serie se reduce a
+    `CHART_MAX_POINTS` puntos conservando mínimos y máximos.
+
+    Parámetros:
+    - buffer (RingBuffer): Serie de la métrica.
+    - metrica (str): Nombre de la métrica (etiqueta del eje y).
+    - titulo (str): Título del gráfico.
+
+    Devuelve:
+    - plotly.graph_objects.Figure: Gráfico de la serie.
+    """
+    if CHART_DOWNSAMPLE and buffer.full:
+        tiempos, valores = buffer.downsample(CHART_MAX_POINTS)
+    else:
+        tiempos, valores = buffer.times(), buffer.values()
+    return px.line(x=tiempos, y=valores, labels={"x": "Tiempo", "y": metrica}, title=titulo)
+
 # Función para mostrar TODA la información climática en la interfaz
 def mostrar_info_climatica(weather_data, info_container):
     """
@@ -106,7 +214,7 @@ def mostrar_info_climatica(weather_data, info_container):
     info_container.write(
         f'<div style="display: flex; align-items: center;">'
         f'<h1 style="margin-right: 10px;">Clima en {st.session_state.city_name}</h1>'
-        f'<img src="{icon_base_url}{weather_data["weather"][0]["icon"]}@2x.png" style="width: 180px; height: 120px;">'
+        f'<img src="{ASSETS_URL}/icons/{weather_data["weather"][0]["icon"]}.png" style="width: 180px; height: 120px;">'
         f'</div>',
         unsafe_allow_html=True
     )
@@ -120,25 +228,11 @@ def mostrar_info_climatica(weather_data, info_container):
     kpi2.metric(label="Hora local", value=timezone_str)
     kpi3.metric(label="Temperatura", value=f"{weather_data['main']['temp']} °C")
 
-    # Mostrar imagen según el campo "icon" de "weather"
-    weather_icon = weather_data["weather"][0]["icon"]
-    weather_main = weather_data["weather"][0]["main"]
-    if weather_icon.endswith("d"):
-        if weather_main == "Rain":
-            st.image("images\\rainy.png", caption="Dia con Lluvia")
-        elif weather_main == "Clear":
-            st.image("images\clear.jpg", caption="Dia Despejado")
-        elif weather_main == "Clouds":
-            st.image("images\cloudy.jpg", caption="Dia Nublado")
-    else:
-        if weather_main == "Rain":
-            st.image("images\\rainy_n.jpg", caption="Noche con Lluvia")
-        elif weather_main == "Clear":
-            st.image("images\clear_n.jpg", caption="Noche Despejada")
-        elif weather_main == "Clouds":
-            st.image("images\cloudy_n.jpg", caption="Noche Nublada")
-        else:
-            st.image("images\default_image.jpg", caption="Estado del tiempo desconocido")
+    # Mostrar imagen de fondo según el código de condición y si es de día o de noche;
+    # el navegador la guarda en caché, así que no se vuelve a descargar en cada actualización
+    recurso = recurso_para(weather_data["weather"][0]["id"], weather_data["weather"][0]["icon"])
+    st.image(f"{ASSETS_URL}/backgrounds/{recurso['background']}.{HERO_FORMAT}?w={HERO_WIDTH}",
+             caption=recurso["caption"])
 
     # Mostrar tabla con datos adicionales, incluyendo descripción del clima y el ícono
     st.subheader("Datos adicionales")
@@ -163,61 +257,45 @@ def mostrar_info_climatica(weather_data, info_container):
     # Mostrar gráficas
     timezone_offset = weather_data["timezone"]
     timezone = datetime.utcnow() + timedelta(seconds=timezone_offset)
-    timezone_str = timezone.strftime("%H:%M:%S")
 
-    # Verificar si los DataFrames ya existen en el estado de la sesión. Si no, inicializarlos.
-    if "temp_time_df" not in st.session_state:
-        st.session_state.temp_time_df = pd.DataFrame(columns=["Tiempo", "Temperatura"])
+    # Series en vivo: un buffer circular de capacidad fija por métrica (memoria constante por sesión)
+    if "series" not in st.session_state:
+        st.session_state.series = {metrica: RingBuffer(HISTORY_CAPACITY) for metrica in ("Temperatura", "Presión Atmosférica", "Humedad")}
     if "temp_min_max_time_df" not in st.session_state:
         st.session_state.temp_min_max_time_df = pd.DataFrame(columns=["Tipo", "Valor"])
-    if "pressure_time_df" not in st.session_state:
-        st.session_state.pressure_time_df = pd.DataFrame(columns=["Tiempo", "Presión Atmosférica"])
-    if "humidity_time_df" not in st.session_state:
-        st.session_state.humidity_time_df = pd.DataFrame(columns=["Tiempo", "Humedad"])
-
-    # Agregar nuevos datos a los DataFrames
-    new_temp_data = pd.DataFrame({
-        "Tiempo": [timezone_str],
-        "Temperatura": [weather_data["main"]["temp"]]
-    })
-    st.session_state.temp_time_df = pd.concat([st.session_state.temp_time_df, new_temp_data], ignore_index=True)
-
-    new_temp_min_max_data = pd.DataFrame({
-        "Tipo": ["Temperatura Máxima", "Temperatura Mínima"],
-        "Valor": [weather_data["main"]["temp_max"], weather_data["main"]["temp_min"]]
-    })
-    st.session_state.temp_min_max_time_df = new_temp_min_max_data
-    
-    new_pressure_data = pd.DataFrame({
-        "Tiempo": [timezone_str],
-        "Presión Atmosférica": [weather_data["main"]["pressure"]]
-    })
-    st.session_state.pressure_time_df = pd.concat([st.session_state.pressure_time_df, new_pressure_data], ignore_index=True)
-
-    new_humidity_data = pd.DataFrame({
-        "Tiempo": [timezone_str],
-        "Humedad": [weather_data["main"]["humidity"]]
-    })
-    st.session_state.humidity_time_df = pd.concat([st.session_state.humidity_time_df, new_humidity_data], ignore_index=True)
-
-    # Crear gráficos usando los DataFrames actualizados
-    temp_time_chart = px.line(st.session_state.temp_time_df, x="Tiempo", y="Temperatura", title="Variación de Temperatura en el Tiempo")
-    temp_min_max_chart = px.bar(
-        st.session_state.temp_min_max_time_df, 
-        x="Tipo", y="Valor", 
-        title="Temperatura Mínima y Máxima", 
-        labels={'Valor': 'Temperatura (°C)'},
-        color="Tipo",
-        color_discrete_map={
-            "Temperatura Máxima": "red",
-            "Temperatura Mínima": "blue"
-        },
-        text="Valor"
-    )
-    temp_min_max_chart.update_traces(texttemplate='%{text} °C', textposition='outside')
 
-    pressure_time_chart = px.line(st.session_state.pressure_time_df, x="Tiempo", y="Presión Atmosférica", title="Variación de Presión Atmosférica en el Tiempo")
-    humidity_time_chart = px.line(st.session_state.humidity_time_df, x="Tiempo", y="Humedad", title="Variación de Humedad en el Tiempo")
+    # Agregar nuevos datos a las series
+    with medir("actualizacion_datos"):
+        series = st.session_state.series
+        series["Temperatura"].append(timezone, weather_data["main"]["temp"])
+        series["Presión Atmosférica"].append(timezone, weather_data["main"]["pressure"])
+        series["Humedad"].append(timezone, weather_data["main"]["humidity"])
+
+        new_temp_min_max_data = pd.DataFrame({
+            "Tipo": ["Temperatura Máxima", "Temperatura Mínima"],
+            "Valor": [weather_data["main"]["temp_max"], weather_data["main"]["temp_min"]]
+        })
+        st.session_state.temp_min_max_time_df = new_temp_min_max_data
+
+    # Crear gráficos usando las series actualizadas
+    with medir("construccion_figuras"):
+        temp_time_chart = grafico_serie(series["Temperatura"], "Temperatura", "Variación de Temperatura en el Tiempo")
+        temp_min_max_chart = px.bar(
+            st.session_state.temp_min_max_time_df, 
+            x="Tipo", y="Valor", 
+            title="Temperatura Mínima y Máxima", 
+            labels={'Valor': 'Temperatura (°C)'},
+            color="Tipo",
+            color_discrete_map={
+                "Temperatura Máxima": "red",
+                "Temperatura Mínima": "blue"
+            },
+            text="Valor"
+        )
+        temp_min_max_chart.update_traces(texttemplate='%{text} °C', textposition='outside')
+
+        pressure_time_chart = grafico_serie(series["Presión Atmosférica"], "Presión Atmosférica", "Variación de Presión Atmosférica en el Tiempo")
+        humidity_time_chart = grafico_serie(series["Humedad"], "Humedad", "Variación de Humedad en el Tiempo")
         
     # Dividir el espacio en dos columnas para los gráficos interactivos
     fig_col1, fig_col2 = st.columns(2)
@@ -226,19 +304,23 @@ def mostrar_info_climatica(weather_data, info_container):
     # Mostrar los gráficos interactivos en las columnas respectivas
     with fig_col1:
         st.markdown("### Temperatura Actual")
-        st.plotly_chart(temp_time_chart)
+        with medir("plotly_chart"):
+            st.plotly_chart(temp_time_chart)
 
     with fig_col2:
         st.markdown("### Temperatura Mínima y Máxima")
-        st.plotly_chart(temp_min_max_chart)
+        with medir("plotly_chart"):
+            st.plotly_chart(temp_min_max_chart)
 
     with fig_col3:
         st.markdown("### Presión Atmosférica")
-        st.plotly_chart(pressure_time_chart)
+        with medir("plotly_chart"):
+            st.plotly_chart(pressure_time_chart)
 
     with fig_col4:
         st.markdown("### Humedad")
-        st.plotly_chart(humidity_time_chart)
+        with medir("plotly_chart"):
+            st.plotly_chart(humidity_time_chart)
 
 def update_weather_data(city, info_container):
     """
@@ -255,7 +337,8 @@ def update_weather_data(city, info_container):
 
     No devuelve nada.
     """
-    weather_data = get_weather_data(city)
+    with medir("get_weather_data"):
+        weather_data = get_weather_data(city)
     # Verificar si weather_data es None (indicando un error)
     if weather_data is None:
         return  # Salir de la función
@@ -264,8 +347,26 @@ def update_weather_data(city, info_container):
 
     mostrar_info_climatica(weather_data, info_container)
 
+def vista_en_vivo():
+    """
+    Dibuja la parte en vivo de la página: encabezado, tarjetas KPI, imagen y gráficos.
+
+    Se ejecuta como fragmento de Streamlit con `run_every`, por lo que en cada actualización
+    solo se vuelve a ejecutar esta función y no todo el script (configuración de la página,
+    barra lateral, botones y pronóstico se dibujan una vez por interacción del usuario).
+    El tiempo de CPU de cada actualización queda en `st.session_state.tick_cpu_ms` y, con el
+    modo instrumentación activo, se muestran los tiempos de cada etapa.
+
+    No devuelve nada.
+    """
+    if not (st.session_state.start_update and st.session_state.tracking_city):
+        return
+    inicio = time.process_time()
+    update_weather_data(st.session_state.tracking_city, st.empty())
+    st.session_state.tick_cpu_ms = (time.process_time() - inicio) * 1000
+    mostrar_instrumentacion()
+
 # Crear containers para contenido dinamico
-info_climatica_container = st.empty()
 graph_container = st.empty()
 forecast_container = st.empty()
 
@@ -280,6 +381,10 @@ if 'show_forecast' in st.session_state and st.session_state.show_forecast:
 
 
 if __name__ == '__main__':
+    if st.session_state.modo == "Tablero":
+        pagina_tablero(REFRESH_SECONDS)
+        st.stop()
+
     city = st.text_input("Ingrese el nombre de la ciudad:", st.session_state.tracking_city)
 
     col_iniciar, col_detener, col_forecast = st.columns(3)
@@ -306,16 +411,20 @@ if __name__ == '__main__':
             st.session_state.show_forecast_message = True
             st.session_state.forecast_lon = st.session_state.weather_data["coord"]["lon"]
             st.session_state.forecast_lat = st.session_state.weather_data["coord"]["lat"]
-            if 'forecast_data' not in st.session_state:
+            # Normalmente ya se descargó junto con el clima actual al iniciar el seguimiento
+            if not st.session_state.get('forecast_data'):
                 forecast_data = get_forecast(st.session_state.forecast_lon, st.session_state.forecast_lat)
                 st.session_state['forecast_data'] = forecast_data
 
     if 'show_forecast' in st.session_state and st.session_state.show_forecast:
         show_forecast(forecast_message_marker)
 
-    if start_update_button:
-        st.session_state.start_update = not st.session_state.start_update
+    if start_update_button and city:
+        st.session_state.start_update = True
         st.session_state.tracking_city = city
+        # Clima actual y pronóstico en paralelo, para que "Mostrar forecast" sea inmediato
+        prefetch_bundle(city)
+        st.rerun()  # Redibujar los botones con el nuevo estado
 
     if stop_update_button:
         st.session_state.start_update = False
@@ -324,9 +433,8 @@ if __name__ == '__main__':
         st.session_state.show_forecast_message = False
         st.warning("Se ha detenido el seguimiento del clima en tiempo real.")
 
-        
-    if st.session_state.start_update and st.session_state.tracking_city:
-        update_weather_data(st.session_state.tracking_city, info_climatica_container)
-        time.sleep(5)  # Refresh data every 5 seconds (can be adjusted as needed)
-        st.experimental_rerun()
+
+    # Solo el fragmento se vuelve a ejecutar cada REFRESH_SECONDS mientras hay seguimiento activo
+    intervalo = REFRESH_SECONDS if st.session_state.start_update else None
+    st.fragment(run_every=intervalo)(vista_en_vivo)()
 
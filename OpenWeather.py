@@ -2,57 +2,988 @@
 Módulo para interactuar con la API de OpenWeather.
 """
 
-from fastapi import FastAPI, HTTPException
+import asyncio
+import importlib.util
+import json
+import os
+import sys
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 import httpx
-import streamlit as st
 
-app = FastAPI()
+from cacheBackends import crear_backend
+from cityIndex import CityIndex
+from forecastSummary import resumen_diario
+from observationStore import ObservationStore
+from serviceMetrics import Registry, instrumentar
+from serviceSettings import Settings
+from spatialIndex import GridIndex
+from upstreamQuota import (BACKGROUND, BATCH, PRIORIDADES, QuotaExceeded, QuotaScheduler, compartir_prioridad,
+                           con_prioridad, prioridad)
+from upstreamResilience import ResilientUpstream, UpstreamUnavailable
+from weatherAssets import CONDICIONES, FONDOS, ICONOS, Asset, AssetStore, guardar_archivo, leer_archivo, recurso_para
+from weatherCache import TTLCache, normalizar_ciudad
+from weatherResponses import CompactWeather, compactar_actual, compactar_pronostico, proyectar, responder
+from weatherScheduler import PollScheduler
+
+# Opciones del entorno, de settings.toml o del archivo de secretos (ver `serviceSettings`)
+settings = Settings.load()
+
+DEFAULT_BASE_URL = "http://api.openweathermap.org/data/2.5"
+API_KEY = settings.get("OPENWEATHER_API_KEY", "")
+# URLs de OpenWeather; se pueden apuntar a un sustituto local (ver benchmarks/mock_upstream.py)
+OPENWEATHER_BASE_URL = settings.get("OPENWEATHER_BASE_URL", DEFAULT_BASE_URL)
+CURRENT_WEATHER_URL = settings.get("CURRENT_WEATHER_URL", OPENWEATHER_BASE_URL + "/weather?q={}&units=metric&appid={}")
+FORECAST_WEATHER_URL = settings.get("FORECAST_WEATHER_URL", OPENWEATHER_BASE_URL + "/forecast?lat={}&lon={}&units=metric&appid={}")
+FORECAST_CITY_URL = settings.get("FORECAST_CITY_URL", OPENWEATHER_BASE_URL + "/forecast?q={}&units=metric&appid={}")
+CURRENT_WEATHER_ID_URL = settings.get("CURRENT_WEATHER_ID_URL", OPENWEATHER_BASE_URL + "/weather?id={}&units=metric&appid={}")
+
+# Configuración del cliente HTTP compartido hacia OpenWeather (pool de conexiones y timeouts)
+HTTP_MAX_CONNECTIONS = int(settings.get("OPENWEATHER_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(settings.get("OPENWEATHER_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(settings.get("OPENWEATHER_KEEPALIVE_EXPIRY", "30"))
+HTTP_CONNECT_TIMEOUT = float(settings.get("OPENWEATHER_CONNECT_TIMEOUT", "3"))
+HTTP_READ_TIMEOUT = float(settings.get("OPENWEATHER_READ_TIMEOUT", "10"))
+HTTP_WRITE_TIMEOUT = float(settings.get("OPENWEATHER_WRITE_TIMEOUT", "5"))
+HTTP_POOL_TIMEOUT = float(settings.get("OPENWEATHER_POOL_TIMEOUT", "5"))
+# HTTP/2 requiere el extra `httpx[http2]`; si no está instalado se usa HTTP/1.1
+HTTP2 = settings.get("OPENWEATHER_HTTP2", "0") == "1" and importlib.util.find_spec("h2") is not None
+
+# Resiliencia de las llamadas a OpenWeather: plazo por llamada (con reintentos), timeout por intento,
+# reintentos con backoff y jitter, solicitudes de cobertura tras el p95 y circuit breaker por endpoint
+UPSTREAM_DEADLINE = float(settings.get("UPSTREAM_DEADLINE", "4"))
+UPSTREAM_ATTEMPT_TIMEOUT = float(settings.get("UPSTREAM_ATTEMPT_TIMEOUT", "2"))
+UPSTREAM_RETRIES = int(settings.get("UPSTREAM_RETRIES", "2"))
+UPSTREAM_BACKOFF_BASE = float(settings.get("UPSTREAM_BACKOFF_BASE", "0.1"))
+UPSTREAM_BACKOFF_MAX = float(settings.get("UPSTREAM_BACKOFF_MAX", "1"))
+# Percentil de latencia tras el que se lanza la cobertura (0 la desactiva) y fracción máxima de llamadas cubiertas
+UPSTREAM_HEDGE_QUANTILE = float(settings.get("UPSTREAM_HEDGE_QUANTILE", "0.95"))
+UPSTREAM_HEDGE_BUDGET = float(settings.get("UPSTREAM_HEDGE_BUDGET", "0.1"))
+UPSTREAM_BREAKER_FAILURES = int(settings.get("UPSTREAM_BREAKER_FAILURES", "5"))
+UPSTREAM_BREAKER_RESET = float(settings.get("UPSTREAM_BREAKER_RESET", "30"))
+
+# Cuota del plan de OpenWeather (0 la desactiva), ráfaga máxima y espera máxima por clase de prioridad
+# (interactiva, segundo plano, lote) antes de responder 429 o la última respuesta en caché
+OPENWEATHER_CALLS_PER_MINUTE = int(settings.get("OPENWEATHER_CALLS_PER_MINUTE", "60"))
+OPENWEATHER_QUOTA_BURST = int(settings.get("OPENWEATHER_QUOTA_BURST", "10"))
+OPENWEATHER_QUOTA_MAX_WAIT = tuple(float(w) for w in settings.get("OPENWEATHER_QUOTA_MAX_WAIT", "2,10,30").split(","))
+# Workers del servidor (el mismo valor que lee uvicorn para --workers); la cuota se reparte entre ellos
+WEB_CONCURRENCY = max(1, int(settings.get("WEB_CONCURRENCY", "1")))
+
+# Caché de respuestas: OpenWeather actualiza sus datos cada pocos minutos
+CURRENT_CACHE_TTL = float(settings.get("CACHE_CURRENT_TTL", "60"))
+FORECAST_CACHE_TTL = float(settings.get("CACHE_FORECAST_TTL", "600"))
+CACHE_MAX_ENTRIES = int(settings.get("CACHE_MAX_ENTRIES", "1024"))
+CACHE_MAX_BYTES = int(settings.get("CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+# Segundos tras el vencimiento en que una respuesta se sirve mientras se renueva en segundo plano,
+# y en que se conserva para responder (marcada como obsoleta) si OpenWeather no está disponible
+CURRENT_CACHE_REVALIDATE = float(settings.get("CACHE_CURRENT_REVALIDATE", "30"))
+FORECAST_CACHE_REVALIDATE = float(settings.get("CACHE_FORECAST_REVALIDATE", "300"))
+CACHE_STALE_TTL = float(settings.get("CACHE_STALE_TTL", "3600"))
+# Backend compartido entre workers como segundo nivel de las cachés ("memory" no comparte nada),
+# y segundos máximos que un worker espera a que otro descargue la misma clave
+CACHE_BACKEND = settings.get("CACHE_BACKEND", "memory")
+CACHE_SQLITE_PATH = settings.get("CACHE_SQLITE_PATH", "cache.db")
+CACHE_REDIS_URL = settings.get("CACHE_REDIS_URL", "redis://localhost:6379/0")
+CACHE_LOCK_LEASE = float(settings.get("CACHE_LOCK_LEASE", "5"))
+
+# Ciudades cuyo clima actual (y pronóstico) se descarga al iniciar, separadas por comas
+CACHE_PREWARM_CITIES = [c.strip() for c in settings.get("CACHE_PREWARM_CITIES", "").split(",") if c.strip()]
+CACHE_PREWARM_FORECAST = settings.get("CACHE_PREWARM_FORECAST", "1") == "1"
+
+cache_backend = crear_backend(CACHE_BACKEND, CACHE_SQLITE_PATH, CACHE_REDIS_URL)
+nivel_compartido = cache_backend if cache_backend.shared else None
+
+# Las revalidaciones en segundo plano ceden la cuota a las solicitudes interactivas, y una descarga
+# compartida toma la prioridad más alta entre las solicitudes que la esperan
+current_cache = TTLCache(CURRENT_CACHE_TTL, CACHE_MAX_ENTRIES, CACHE_MAX_BYTES,
+                         stale_ttl=CACHE_STALE_TTL, revalidate=CURRENT_CACHE_REVALIDATE,
+                         background=lambda fetch: con_prioridad(BACKGROUND, fetch), coalesce=compartir_prioridad,
+                         backend=nivel_compartido, namespace="current:", lease=CACHE_LOCK_LEASE)
+forecast_cache = TTLCache(FORECAST_CACHE_TTL, CACHE_MAX_ENTRIES, CACHE_MAX_BYTES,
+                          stale_ttl=CACHE_STALE_TTL, revalidate=FORECAST_CACHE_REVALIDATE,
+                          background=lambda fetch: con_prioridad(BACKGROUND, fetch), coalesce=compartir_prioridad,
+                          backend=nivel_compartido, namespace="forecast:", lease=CACHE_LOCK_LEASE)
+
+# Caché espacial de pronósticos: las coordenadas se ajustan a una rejilla de FORECAST_GRID_RESOLUTION
+# grados y, si la celda propia no tiene datos, se reutiliza la celda fresca más cercana dentro de
+# FORECAST_GRID_TOLERANCE_KM. Con resolución 0 se usan las coordenadas pedidas (4 decimales).
+FORECAST_GRID_RESOLUTION = float(settings.get("FORECAST_GRID_RESOLUTION", "0.05"))
+FORECAST_GRID_TOLERANCE_KM = float(settings.get("FORECAST_GRID_TOLERANCE_KM", "5"))
+
+forecast_grid = None
+if FORECAST_GRID_RESOLUTION > 0:
+    forecast_grid = GridIndex(FORECAST_GRID_RESOLUTION, FORECAST_GRID_TOLERANCE_KM,
+                              is_fresh=forecast_cache.has, max_cells=2 * CACHE_MAX_ENTRIES)
+
+# Consultas por lote: máximo de ciudades por solicitud y de descargas simultáneas hacia OpenWeather
+BATCH_MAX_CITIES = int(settings.get("BATCH_MAX_CITIES", "500"))
+BATCH_CONCURRENCY = int(settings.get("BATCH_CONCURRENCY", "20"))
+batch_semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+# Seguimiento en tiempo real: intervalo de consulta por ciudad y keep-alive del stream SSE
+POLL_INTERVAL = float(settings.get("POLL_INTERVAL", "5"))
+SSE_KEEPALIVE = float(settings.get("SSE_KEEPALIVE", "15"))
+
+# Historial de observaciones: archivo SQLite, tamaño de lote y periodo de escritura
+HISTORY_DB_PATH = settings.get("HISTORY_DB_PATH", "observations.db")
+HISTORY_BATCH_SIZE = int(settings.get("HISTORY_BATCH_SIZE", "100"))
+HISTORY_FLUSH_INTERVAL = float(settings.get("HISTORY_FLUSH_INTERVAL", "5"))
+HISTORY_MAX_BUCKETS = int(settings.get("HISTORY_MAX_BUCKETS", "2000"))
+
+observation_store = ObservationStore(HISTORY_DB_PATH, HISTORY_BATCH_SIZE, HISTORY_FLUSH_INTERVAL)
+
+# Índice local de ciudades: la lista completa de OpenWeather si está en data/, o la muestra empaquetada
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+CITY_INDEX_PATH = settings.get("CITY_INDEX_PATH") or next(
+    (p for p in (os.path.join(DATA_DIR, "city.list.json.gz"), os.path.join(DATA_DIR, "city.list.json"))
+     if os.path.exists(p)),
+    os.path.join(DATA_DIR, "cities.csv"),
+)
+# "1": rechazar las ciudades que no están en el índice; "0": consultarlas igualmente a OpenWeather;
+# "auto": rechazarlas solo si el índice es la lista completa de OpenWeather
+CITY_INDEX_STRICT = settings.get("CITY_INDEX_STRICT", "auto")
+CITY_SUGGEST_MAX = int(settings.get("CITY_SUGGEST_MAX", "50"))
+# Segundos que se recuerda que OpenWeather no conoce una ciudad, para no pagar otra llamada
+# por cada nombre mal escrito que se repite (0 lo desactiva)
+CITY_NOT_FOUND_TTL = float(settings.get("CITY_NOT_FOUND_TTL", "300"))
+
+city_index = CityIndex()
+not_found_cache = TTLCache(CITY_NOT_FOUND_TTL, CACHE_MAX_ENTRIES)
+
+# Recursos gráficos: íconos de OpenWeather guardados en memoria y variantes de los fondos de images/
+OPENWEATHER_ICON_URL = settings.get("OPENWEATHER_ICON_URL", "https://openweathermap.org/img/wn/{}@2x.png")
+# Carpeta opcional con los íconos ya descargados ({icono}@2x.png), para no depender de internet
+ASSETS_ICONS_DIR = settings.get("ASSETS_ICONS_DIR")
+ASSETS_BACKGROUND_WIDTHS = tuple(int(w) for w in settings.get("ASSETS_BACKGROUND_WIDTHS", "640,1280,1920").split(","))
+ASSETS_JPEG_QUALITY = int(settings.get("ASSETS_JPEG_QUALITY", "80"))
+ASSETS_WEBP_QUALITY = int(settings.get("ASSETS_WEBP_QUALITY", "75"))
+ASSETS_MAX_AGE = int(settings.get("ASSETS_MAX_AGE", str(30 * 24 * 3600)))
+# Directorio donde se guardan las variantes y los íconos descargados, compartido por todos los
+# workers y entre reinicios (vacío: solo en memoria)
+ASSETS_CACHE_DIR = settings.get("ASSETS_CACHE_DIR", "assets_cache")
+# Generar todas las variantes y descargar todos los íconos al iniciar, en segundo plano. Por defecto
+# no: se generan o descargan con la primera solicitud de cada uno, y el arranque no depende de la red
+ASSETS_PRECOMPUTE = settings.get("ASSETS_PRECOMPUTE", "0") == "1"
+
+asset_store = AssetStore(widths=ASSETS_BACKGROUND_WIDTHS, jpeg_quality=ASSETS_JPEG_QUALITY,
+                         webp_quality=ASSETS_WEBP_QUALITY, cache_dir=ASSETS_CACHE_DIR or None)
+icon_cache = TTLCache(float("inf"), len(ICONOS), CACHE_MAX_BYTES)
+
+
+def crear_cliente_http():
+    """
+    Crea el cliente HTTP asíncrono que comparte toda la aplicación.
+
+    El cliente mantiene un pool de conexiones keep-alive hacia OpenWeather, de modo que
+    las solicitudes reutilizan la conexión TCP/TLS en lugar de abrir una nueva cada vez.
+
+    Devuelve:
+    - httpx.AsyncClient: Cliente configurado con los límites y timeouts del módulo.
+    """
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(
+        connect=HTTP_CONNECT_TIMEOUT,
+        read=HTTP_READ_TIMEOUT,
+        write=HTTP_WRITE_TIMEOUT,
+        pool=HTTP_POOL_TIMEOUT,
+    )
+    return httpx.AsyncClient(limits=limits, timeout=timeout, http2=HTTP2)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """
+    Abre el cliente HTTP compartido y carga el índice de ciudades al iniciar el servicio,
+    y libera los recursos al apagarlo.
+
+    Lanza:
+    - RuntimeError: Si no hay API key de OpenWeather configurada (salvo con un upstream sustituto).
+    """
+    if not API_KEY and OPENWEATHER_BASE_URL == DEFAULT_BASE_URL:
+        raise RuntimeError("Falta la API key de OpenWeather: define OPENWEATHER_API_KEY, "
+                           "OPENWEATHER_API_KEY_FILE o api_key en .streamlit/secrets.toml")
+    app.state.http_client = crear_cliente_http()
+    await asyncio.to_thread(city_index.load, CITY_INDEX_PATH)
+    flusher = asyncio.create_task(observation_store.run_flusher())
+    precarga = asyncio.create_task(precargar_assets()) if ASSETS_PRECOMPUTE else None
+    # El precalentamiento cede la cuota a las solicitudes interactivas que lleguen mientras tanto
+    prewarm = asyncio.create_task(con_prioridad(BACKGROUND, precalentar_cache)()) if CACHE_PREWARM_CITIES else None
+    try:
+        yield
+    finally:
+        await scheduler.close()
+        flusher.cancel()
+        for tarea in (precarga, prewarm):
+            if tarea is not None:
+                tarea.cancel()
+        await asyncio.to_thread(observation_store.close)
+        await cache_backend.close()
+        await app.state.http_client.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+# Métricas expuestas en /metrics
+metrics = Registry()
+http_request_duration = metrics.histogram(
+    "http_request_duration_seconds", "Latencia de las solicitudes al servicio por ruta", ("method", "route", "status"))
+http_requests_in_flight = metrics.gauge(
+    "http_requests_in_flight", "Solicitudes al servicio en curso")
+upstream_request_duration = metrics.histogram(
+    "upstream_request_duration_seconds", "Latencia de las llamadas a OpenWeather", ("endpoint", "status"))
+upstream_requests_in_flight = metrics.gauge(
+    "upstream_requests_in_flight", "Llamadas a OpenWeather en curso")
+cache_events = metrics.counter(
+    "weather_cache_events_total", "Contadores de las cachés de respuestas", ("cache", "event"))
+cache_size = metrics.gauge(
+    "weather_cache_size", "Entradas y bytes en las cachés de respuestas", ("cache", "unit"))
+upstream_events = metrics.counter(
+    "upstream_resilience_events_total", "Reintentos, coberturas, timeouts y rechazos de las llamadas a OpenWeather",
+    ("event",))
+upstream_circuit_open = metrics.gauge(
+    "upstream_circuit_open", "1 si el circuito de un endpoint de OpenWeather está abierto o semiabierto",
+    ("endpoint",))
+quota_queue_depth = metrics.gauge(
+    "upstream_quota_queue_depth", "Llamadas a OpenWeather esperando cuota por clase de prioridad", ("priority",))
+quota_events = metrics.counter(
+    "upstream_quota_events_total", "Llamadas concedidas, encoladas y rechazadas por falta de cuota", ("priority", "event"))
+quota_tokens = metrics.gauge(
+    "upstream_quota_tokens", "Fichas disponibles en el token bucket de la cuota de OpenWeather")
+
+
+def _recolectar_cache():
+    for nombre, cache in (("current", current_cache), ("forecast", forecast_cache)):
+        stats = cache.stats()
+        for evento in ("hits", "misses", "coalesced", "evictions", "expirations", "revalidations", "stale",
+                       "shared_hits", "shared_waits", "backend_errors"):
+            cache_events.set_total(stats[evento], cache=nombre, event=evento)
+        cache_size.set(stats["entries"], cache=nombre, unit="entries")
+        cache_size.set(stats["bytes"], cache=nombre, unit="bytes")
+    if forecast_grid is not None:
+        stats = forecast_grid.stats()
+        for evento in ("exact", "nearby", "misses"):
+            cache_events.set_total(stats[evento], cache="forecast_grid", event=evento)
+        cache_size.set(stats["cells"], cache="forecast_grid", unit="entries")
+
+
+def _recolectar_upstream():
+    stats = upstream.stats()
+    for evento in ("calls", "retried", "hedged", "hedge_wins", "timeouts", "failures", "rejected", "rate_limited"):
+        upstream_events.set_total(stats[evento], event=evento)
+    for endpoint, estado in stats["endpoints"].items():
+        upstream_circuit_open.set(int(estado["state"] != "closed"), endpoint=endpoint)
+    if upstream_quota is not None:
+        stats = upstream_quota.stats()
+        quota_tokens.set(stats["tokens"])
+        for nombre, clase in stats["classes"].items():
+            quota_queue_depth.set(clase["queue_depth"], priority=nombre)
+            for evento in ("granted", "queued", "throttled"):
+                quota_events.set_total(clase[evento], priority=nombre, event=evento)
+
+
+metrics.add_collector(_recolectar_cache)
+metrics.add_collector(_recolectar_upstream)
+
+
+instrumentar(app, http_request_duration, http_requests_in_flight)
+
+
+@app.middleware("http")
+async def asignar_prioridad(request, call_next):
+    """
+    Toma la clase de prioridad de las llamadas a OpenWeather del encabezado `X-Priority`
+    ("interactive", "background" o "batch"). Sin encabezado, las solicitudes son interactivas,
+    salvo las consultas por lote (ver `get_current_weather_batch`).
+    """
+    nombre = request.headers.get("x-priority")
+    if nombre in PRIORIDADES:
+        prioridad.set(PRIORIDADES[nombre])
+    return await call_next(request)
+
+
+async def enviar_upstream(url, endpoint):
+    """
+    Realiza un único intento de GET a OpenWeather usando el cliente compartido de la aplicación.
+
+    Parámetros:
+    - url (str): URL completa a consultar.
+    - endpoint (str): Nombre del endpoint de OpenWeather ("weather" o "forecast") para las métricas.
+
+    Devuelve:
+    - httpx.Response: Respuesta de OpenWeather.
+    """
+    upstream_requests_in_flight.inc()
+    inicio = time.perf_counter()
+    status = "error"
+    try:
+        response = await app.state.http_client.get(url)
+        status = str(response.status_code)
+        return response
+    finally:
+        upstream_requests_in_flight.dec()
+        upstream_request_duration.observe(time.perf_counter() - inicio, endpoint=endpoint, status=status)
+
+
+# Cada worker administra su parte de la cuota del plan
+upstream_quota = None
+if OPENWEATHER_CALLS_PER_MINUTE > 0:
+    upstream_quota = QuotaScheduler(max(2, OPENWEATHER_CALLS_PER_MINUTE // WEB_CONCURRENCY),
+                                    max(1, OPENWEATHER_QUOTA_BURST // WEB_CONCURRENCY), OPENWEATHER_QUOTA_MAX_WAIT)
+
+upstream = ResilientUpstream(
+    enviar_upstream,
+    deadline=UPSTREAM_DEADLINE,
+    attempt_timeout=UPSTREAM_ATTEMPT_TIMEOUT,
+    retries=UPSTREAM_RETRIES,
+    backoff_base=UPSTREAM_BACKOFF_BASE,
+    backoff_max=UPSTREAM_BACKOFF_MAX,
+    hedge_quantile=UPSTREAM_HEDGE_QUANTILE or None,
+    hedge_budget=UPSTREAM_HEDGE_BUDGET,
+    failure_threshold=UPSTREAM_BREAKER_FAILURES,
+    reset_timeout=UPSTREAM_BREAKER_RESET,
+    quota=upstream_quota,
+)
+
+
+async def consultar_upstream(url, endpoint, metered=True):
+    """
+    Realiza una solicitud GET a OpenWeather con cuota, plazo, reintentos, hedging y circuit
+    breaker (ver `upstreamResilience.ResilientUpstream` y `upstreamQuota.QuotaScheduler`).
+
+    Parámetros:
+    - url (str): URL completa a consultar.
+    - endpoint (str): Nombre del endpoint de OpenWeather ("weather", "forecast" o "icon").
+    - metered (bool): Si la llamada cuenta para la cuota del plan (los íconos no cuentan).
+
+    Devuelve:
+    - httpx.Response: Respuesta de OpenWeather (2xx o 4xx distinto de 429).
+
+    Lanza:
+    - UpstreamUnavailable: Si OpenWeather no respondió dentro del plazo, falló en todos los
+        intentos o su circuito está abierto (503/504 con `Retry-After`).
+    - QuotaExceeded: Si no hay cuota dentro de la espera máxima de la clase de prioridad
+        actual o si OpenWeather respondió 429 (429 con `Retry-After`).
+    """
+    return await upstream.get(url, endpoint, metered)
 
-API_KEY = st.secrets["api_key"]
-CURRENT_WEATHER_URL = "http://api.openweathermap.org/data/2.5/weather?q={}&units=metric&appid={}"
-FORECAST_WEATHER_URL = "http://api.openweathermap.org/data/2.5/forecast?lat={}&lon={}&units=metric&appid={}"
 
+async def obtener_con_respaldo(cache, key, descargar):
+    """
+    Obtiene `key` de la caché como `TTLCache.get_or_fetch`, pero si OpenWeather no está disponible
+    o se agotó la cuota devuelve la última respuesta buena de esa clave marcada como obsoleta.
+
+    Parámetros:
+    - cache (TTLCache): Caché de respuestas.
+    - key (str): Clave normalizada.
+    - descargar (callable): Corrutina que consulta OpenWeather (ver `get_or_fetch`).
+
+    Devuelve:
+    - dict: Respuesta fresca o, si el upstream falla o no hay cuota, una copia de la última
+        respuesta con `"stale": {"age": segundos}`.
+    """
+    try:
+        return await cache.get_or_fetch(key, descargar)
+    except (UpstreamUnavailable, QuotaExceeded):
+        anterior = await cache.recover(key)
+        if anterior is None:
+            raise
+        data, edad = anterior
+        return {**data, "stale": {"age": round(edad)}}
+
+
+def resolver_ciudad(city):
+    """
+    Busca una ciudad en el índice local antes de consultar OpenWeather.
+
+    Los nombres y alias que resuelven a la misma ciudad ("CDMX", "Ciudad de México") comparten
+    la clave de caché y de historial. Con el índice en modo estricto, una ciudad desconocida se
+    rechaza sin gastar una llamada al upstream. Con `CITY_INDEX_STRICT=auto` (el valor por defecto)
+    eso solo ocurre si está cargada la lista completa de OpenWeather: con la lista de muestra
+    `data/cities.csv` las ciudades que no están en ella se consultan igualmente al upstream.
+
+    Si el nombre corresponde a varias ciudades del índice sin forma de elegir entre ellas (p. ej.
+    "Springfield" en la lista de OpenWeather), la ciudad se acepta pero no se devuelve registro:
+    la consulta llega tal cual a OpenWeather, que elige como lo haría sin índice.
+
+    Un nombre fuera del índice por el que OpenWeather respondió 404 hace menos de
+    `CITY_NOT_FOUND_TTL` segundos se rechaza sin volver a consultarlo.
+
+    Parámetros:
+    - city (str): Nombre de la ciudad, opcionalmente con código de país ("Paris,FR").
 
-@app.get("/weather/{city}")
-async def get_current_weather(city: str):
+    Devuelve:
+    - tuple: (clave normalizada, registro del índice o None si la ciudad no está en él o es ambigua).
+
+    Lanza:
+    - HTTPException: 404 si la ciudad no está en el índice estricto o OpenWeather no la conoce.
+    """
+    registro = city_index.resolve(city)
+    if registro is not None and not registro["ambiguous"]:
+        return normalizar_ciudad(f"{registro['name']},{registro['country']}"), registro
+    if registro is None and (CITY_INDEX_STRICT == "1" or (CITY_INDEX_STRICT == "auto" and city_index.complete)):
+        raise HTTPException(status_code=404, detail="City not found")
+    key = normalizar_ciudad(city)
+    if not_found_cache.get(key) is not None:
+        raise HTTPException(status_code=404, detail="City not found")
+    return key, None
+
+
+def ciudad_desconocida(key):
+    """
+    Recuerda que OpenWeather respondió 404 para `key` y devuelve la excepción a lanzar.
+    """
+    if CITY_NOT_FOUND_TTL > 0:
+        not_found_cache.set(key, True)
+    return HTTPException(status_code=404, detail="City not found")
+
+
+async def obtener_clima_actual(city):
+    """
+    Obtiene el clima actual de una ciudad pasando por la caché de respuestas.
+
+    Parámetros:
+    - city (str): Nombre de la ciudad; se resuelve con el índice local (ver `resolver_ciudad`)
+        y se normaliza para compartir la entrada de caché.
+
+    Devuelve:
+    - dict: Respuesta de OpenWeather con el clima actual (marcada con "stale" si OpenWeather
+        no está disponible y se devuelve la última respuesta buena).
+    """
+    city = " ".join(city.split())
+    key, registro = resolver_ciudad(city)
+    if registro is None:
+        url = CURRENT_WEATHER_URL.format(city, API_KEY)
+    elif city_index.complete:
+        # Los ids de la lista de OpenWeather identifican la ciudad (solo hay registro si el nombre es único)
+        url = CURRENT_WEATHER_ID_URL.format(registro["id"], API_KEY)
+    else:
+        url = CURRENT_WEATHER_URL.format(f"{registro['name']},{registro['country']}", API_KEY)
+
+    async def descargar():
+        response = await consultar_upstream(url, "weather")
+        if response.status_code == 200:
+            data = response.json()
+            observation_store.add(key, data)
+            return data, len(response.content)
+        elif response.status_code == 404:
+            raise ciudad_desconocida(key)
+        else:
+            raise HTTPException(status_code=500, detail="API call failed")
+
+    return await obtener_con_respaldo(current_cache, key, descargar)
+
+
+async def obtener_pronostico(lat, lon):
+    """
+    Obtiene el pronóstico de 5 días para unas coordenadas pasando por la caché de respuestas.
+
+    Con la caché espacial activa, el pronóstico se pide para el centro de la celda de la
+    rejilla que contiene el punto, o se reutiliza el de la celda vecina fresca más cercana
+    dentro de la tolerancia, de modo que puntos a pocos cientos de metros comparten una
+    sola llamada a OpenWeather.
+
+    Parámetros:
+    - lat (float): Latitud geográfica.
+    - lon (float): Longitud geográfica.
+
+    Devuelve:
+    - dict: Respuesta de OpenWeather con el pronóstico.
+    """
+    celda = None
+    if forecast_grid is None:
+        lat, lon = round(lat, 4), round(lon, 4)
+    else:
+        celda = forecast_grid.lookup(lat, lon) or forecast_grid.snap(lat, lon)
+        lat, lon = forecast_grid.center(celda)
+
+    async def descargar():
+        response = await consultar_upstream(FORECAST_WEATHER_URL.format(lat, lon, API_KEY), "forecast")
+        if response.status_code == 200:
+            return response.json(), len(response.content)
+        else:
+            raise HTTPException(status_code=500, detail="API call failed")
+
+    data = await obtener_con_respaldo(forecast_cache, f"{lat},{lon}", descargar)
+    # La celda se registra con cualquier respuesta, no solo tras descargarla: también cuando llega del
+    # backend compartido (la descargó otro worker) o de la última respuesta buena. `lookup` solo
+    # reutiliza celdas con datos frescos en la caché local.
+    if celda is not None:
+        forecast_grid.add(celda)
+    return data
+
+
+async def obtener_pronostico_ciudad(city):
+    """
+    Obtiene el pronóstico de 5 días de una ciudad por nombre, pasando por la caché de pronósticos.
+
+    Permite pedir el pronóstico sin esperar antes las coordenadas del clima actual. Si la
+    ciudad está en el índice local se usan sus coordenadas y la misma entrada de caché que
+    `/forecast`.
+
+    Parámetros:
+    - city (str): Nombre de la ciudad.
+
+    Devuelve:
+    - dict: Respuesta de OpenWeather con el pronóstico.
+    """
+    city = " ".join(city.split())
+    key, registro = resolver_ciudad(city)
+    if registro is not None:
+        return await obtener_pronostico(registro["lat"], registro["lon"])
+
+    async def descargar():
+        response = await consultar_upstream(FORECAST_CITY_URL.format(city, API_KEY), "forecast")
+        if response.status_code == 200:
+            return response.json(), len(response.content)
+        elif response.status_code == 404:
+            raise ciudad_desconocida(key)
+        else:
+            raise HTTPException(status_code=500, detail="API call failed")
+
+    return await obtener_con_respaldo(forecast_cache, "q:" + key, descargar)
+
+
+@app.get("/weather/{city}", responses={200: {
+    "model": CompactWeather,
+    "description": "Con `compact=true`, exactamente esta forma. Sin él, la respuesta completa de OpenWeather, "
+                   "que incluye estos mismos campos. Con `fields`, solo los campos pedidos.",
+}})
+async def get_current_weather(city: str, request: Request, fields: str = None, compact: bool = False):
     """
     Obtiene el clima actual de una ciudad específica usando la API de OpenWeather.
 
     Parámetros:
     - city (str): Nombre de la ciudad para la cual obtener el clima.
+    - fields (str): Campos de primer nivel a devolver, separados por comas (p. ej. "name,main").
+    - compact (bool): Si es True, devuelve solo los campos que usa el front end
+        (ver `weatherResponses.compactar_actual`).
 
     Devuelve:
-    - dict: Diccionario con información del clima actual.
+    - dict: Diccionario con información del clima actual, en JSON o en MessagePack
+        según el encabezado `Accept`.
         Si hay un error en la solicitud, devuelve None.
     """
-    async with httpx.AsyncClient() as client:
-        response = await client.get(CURRENT_WEATHER_URL.format(city, API_KEY))
-    
-    if response.status_code == 200:
-        return response.json()
-    elif response.status_code == 404:
-        raise HTTPException(status_code=404, detail="City not found")
+    data = await obtener_clima_actual(city)
+    if compact:
+        data = compactar_actual(data)
+    return responder(proyectar(data, fields), request.headers.get("accept"))
+
+
+# Las consultas periódicas son actualizaciones en segundo plano: ceden la cuota a las interactivas
+scheduler = PollScheduler(con_prioridad(BACKGROUND, obtener_clima_actual), POLL_INTERVAL)
+
+
+@app.get("/weather/{city}/bundle")
+async def get_weather_bundle(city: str, request: Request, fields: str = None, compact: bool = False):
+    """
+    Obtiene en una sola solicitud el clima actual y el pronóstico diario de una ciudad.
+
+    Ambas consultas a OpenWeather se hacen de forma concurrente (el pronóstico se pide por
+    nombre de ciudad, sin esperar las coordenadas), de modo que el cliente paga un solo viaje
+    de ida y vuelta al iniciar el seguimiento.
+
+    Parámetros:
+    - city (str): Nombre de la ciudad.
+    - fields (str): Campos de primer nivel del clima actual a devolver, separados por comas.
+    - compact (bool): Si es True, el clima actual usa la forma compacta de `/weather/{city}`.
+
+    Devuelve:
+    - dict: {"current": datos del clima actual, "forecast": resumen diario o None}, en JSON o
+            en MessagePack según el encabezado `Accept`.
+            Si falla el pronóstico se incluye además "forecast_error"; si falla el clima
+            actual se devuelve el mismo error que `/weather/{city}`.
+    """
+    current, forecast = await asyncio.gather(
+        obtener_clima_actual(city), obtener_pronostico_ciudad(city), return_exceptions=True
+    )
+    if isinstance(current, BaseException):
+        raise current
+
+    bundle = {"current": proyectar(compactar_actual(current) if compact else current, fields), "forecast": None}
+    if isinstance(forecast, HTTPException):
+        bundle["forecast_error"] = {"status": forecast.status_code, "detail": forecast.detail}
+    elif isinstance(forecast, BaseException):
+        bundle["forecast_error"] = {"status": 500, "detail": "API call failed"}
     else:
-        raise HTTPException(status_code=500, detail="API call failed")
+        bundle["forecast"] = resumen_diario(forecast)
+    return responder(bundle, request.headers.get("accept"))
+
+
+@app.get("/weather/{city}/history")
+async def get_weather_history(city: str, start: int = None, end: int = None, bucket: int = 3600):
+    """
+    Devuelve el historial de observaciones de una ciudad agregado por intervalos.
+
+    Cada intervalo incluye el número de observaciones y el mínimo, la media y el máximo de
+    temperatura, presión, humedad y velocidad del viento, de modo que una semana de datos
+    cabe en una respuesta pequeña.
+
+    Parámetros:
+    - city (str): Nombre de la ciudad.
+    - start (int): Inicio del rango en segundos Unix. Por defecto, 7 días antes de `end`.
+    - end (int): Fin del rango en segundos Unix (exclusivo). Por defecto, un intervalo después del
+        momento actual, para incluir la observación más reciente aunque su `dt` sea el segundo actual.
+    - bucket (int): Tamaño de cada intervalo en segundos (por defecto 1 hora).
+
+    Devuelve:
+    - dict: {"city", "start", "end", "bucket"} más las series agregadas en formato columnar.
+    """
+    end = int(time.time()) + bucket if end is None else end
+    start = end - 7 * 24 * 3600 if start is None else start
+    if bucket <= 0 or start >= end:
+        raise HTTPException(status_code=400, detail="Invalid time range or bucket")
+    if (end - start) // bucket > HISTORY_MAX_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"At most {HISTORY_MAX_BUCKETS} buckets per request")
+
+    key, _ = resolver_ciudad(city)
+    historial = await asyncio.to_thread(observation_store.history, key, start, end, bucket)
+    return {"city": key, "start": start, "end": end, "bucket": bucket, **historial}
+
+
+@app.get("/weather/{city}/stream")
+async def stream_current_weather(city: str):
+    """
+    Envía el clima actual de una ciudad en tiempo real mediante Server-Sent Events.
+
+    Todos los clientes que siguen la misma ciudad comparten una única consulta periódica
+    a OpenWeather; la ciudad deja de consultarse cuando se desconecta su último suscriptor.
+
+    Parámetros:
+    - city (str): Nombre de la ciudad a seguir.
+
+    Devuelve:
+    - StreamingResponse: Flujo `text/event-stream` con eventos `weather` (datos del clima)
+        y `error` ({"status": int, "detail": str}).
+    """
+    async def eventos():
+        # La suscripción se crea al empezar a enviar el flujo: si el cliente se desconecta antes,
+        # o la respuesta nunca se recorre, no queda ninguna consulta periódica huérfana
+        queue = scheduler.subscribe(city)
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {message['event']}\ndata: {json.dumps(message['data'])}\n\n"
+        finally:
+            scheduler.unsubscribe(city, queue)
+
+    return StreamingResponse(eventos(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.get("/scheduler/cities")
+async def get_tracked_cities():
+    """
+    Devuelve las ciudades que el planificador consulta y su número de suscriptores.
+    """
+    return scheduler.tracked()
+
+
+@app.get("/weather")
+async def get_current_weather_batch(cities: str, request: Request, fields: str = None, compact: bool = False):
+    """
+    Obtiene el clima actual de varias ciudades en una sola solicitud.
+
+    Las ciudades se consultan de forma concurrente, limitadas por `BATCH_CONCURRENCY`, y pasan
+    por la misma caché que `/weather/{city}`, por lo que un lote nunca hace más llamadas a
+    OpenWeather que las mismas solicitudes enviadas una por una. Los nombres repetidos
+    (tras normalizarlos) se consultan una sola vez. Salvo que el cliente envíe `X-Priority`,
+    las llamadas del lote tienen la prioridad más baja en la cuota de OpenWeather.
+
+    Parámetros:
+    - cities (str): Nombres de ciudades separados por comas, p. ej. "London,Paris,Tokyo".
+    - fields (str): Campos de primer nivel a devolver por ciudad, separados por comas.
+    - compact (bool): Si es True, cada resultado usa la forma compacta de `/weather/{city}`.
+
+    Devuelve:
+    - dict: {"results": {ciudad: datos}, "errors": {ciudad: {"status": int, "detail": str}}}.
+            Un error en una ciudad no hace fallar al resto del lote.
+    """
+    if "x-priority" not in request.headers:
+        prioridad.set(BATCH)
+    nombres = {}
+    for city in cities.split(","):
+        city = " ".join(city.split())
+        if city:
+            nombres.setdefault(normalizar_ciudad(city), city)
+
+    if not nombres:
+        raise HTTPException(status_code=400, detail="No cities given")
+    if len(nombres) > BATCH_MAX_CITIES:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_CITIES} cities per request")
+
+    async def consultar(city):
+        async with batch_semaphore:
+            try:
+                return city, await obtener_clima_actual(city), None
+            except HTTPException as exc:
+                return city, None, {"status": exc.status_code, "detail": exc.detail}
+            except Exception:
+                # Cualquier otro error (de transporte, una respuesta que no es JSON...) solo afecta a esa ciudad
+                return city, None, {"status": 500, "detail": "API call failed"}
+
+    results, errors = {}, {}
+    for city, data, error in await asyncio.gather(*(consultar(c) for c in nombres.values())):
+        if error is None:
+            results[city] = proyectar(compactar_actual(data) if compact else data, fields)
+        else:
+            errors[city] = error
+    return responder({"results": results, "errors": errors}, request.headers.get("accept"))
 
 
 @app.get("/forecast")
-async def get_forecast_weather(lat: float, lon: float):
+async def get_forecast_weather(lat: float, lon: float, request: Request, fields: str = None, compact: bool = False):
     """
     Obtiene el pronóstico del clima para los próximos 5 días basado en la longitud y latitud.
 
     Parámetros:
     - lon (float): Longitud geográfica para la cual obtener el pronóstico.
     - lat (float): Latitud geográfica para la cual obtener el pronóstico.
+    - fields (str): Campos de primer nivel a devolver, separados por comas (p. ej. "city,list").
+    - compact (bool): Si es True, cada entrada conserva solo fecha, temperaturas, presión,
+        humedad, condición principal y viento.
 
     Devuelve:
-    - dict: Diccionario con información del pronóstico del clima para los próximos 5 días.
+    - dict: Diccionario con información del pronóstico del clima para los próximos 5 días,
+            en JSON o en MessagePack según el encabezado `Accept`.
             Si hay un error en la solicitud, devuelve None.
     """
-    async with httpx.AsyncClient() as client:
-        response = await client.get(FORECAST_WEATHER_URL.format(lat, lon, API_KEY))
-    
-    if response.status_code == 200:
-        return response.json()
-    else:
-        raise HTTPException(status_code=500, detail="API call failed")
\ No newline at end of file
+    data = await obtener_pronostico(lat, lon)
+    if compact:
+        data = compactar_pronostico(data)
+    return responder(proyectar(data, fields), request.headers.get("accept"))
+
+
+@app.get("/forecast/daily")
+async def get_daily_forecast(lat: float, lon: float):
+    """
+    Obtiene el pronóstico de 5 días resumido por día local de la ciudad.
+
+    Usa el mismo pronóstico en caché que `/forecast`, pero devuelve solo una fila por día
+    (temperatura mínima, máxima y media, condición dominante e ícono) en lugar de las
+    40 entradas cada 3 horas.
+
+    Parámetros:
+    - lat (float): Latitud geográfica para la cual obtener el pronóstico.
+    - lon (float): Longitud geográfica para la cual obtener el pronóstico.
+
+    Devuelve:
+    - dict: {"city": {...}, "days": [...]} con aproximadamente 5 filas.
+    """
+    return resumen_diario(await obtener_pronostico(lat, lon))
+
+
+async def obtener_icono(codigo):
+    """
+    Obtiene el PNG de un ícono de OpenWeather, descargándolo una sola vez por proceso.
+
+    Antes de descargarlo se busca en `ASSETS_ICONS_DIR` y en la caché en disco
+    (`ASSETS_CACHE_DIR`), donde queda guardado tras la descarga para el resto de los workers.
+
+    Parámetros:
+    - codigo (str): Código del ícono, p. ej. "10n".
+
+    Devuelve:
+    - Asset: Ícono en memoria.
+    """
+    if codigo not in ICONOS:
+        raise HTTPException(status_code=404, detail="Icon not found")
+
+    archivo = f"{codigo}@2x.png"
+    en_cache = os.path.join(ASSETS_CACHE_DIR, "icons", archivo) if ASSETS_CACHE_DIR else None
+
+    async def descargar():
+        for ruta in (os.path.join(ASSETS_ICONS_DIR, archivo) if ASSETS_ICONS_DIR else None, en_cache):
+            body = ruta and await asyncio.to_thread(leer_archivo, ruta)
+            if body:
+                asset = Asset(body, "image/png")
+                return asset, len(asset.body)
+        response = await consultar_upstream(OPENWEATHER_ICON_URL.format(codigo), "icon", metered=False)
+        if response.status_code != 200:
+            raise HTTPException(status_code=500, detail="API call failed")
+        asset = Asset(response.content, "image/png")
+        if en_cache:
+            await asyncio.to_thread(guardar_archivo, en_cache, asset.body)
+        return asset, len(asset.body)
+
+    return await icon_cache.get_or_fetch(codigo, descargar)
+
+
+async def precargar_assets():
+    """
+    Genera las variantes de los fondos y descarga los íconos en segundo plano al iniciar,
+    para que la primera visita no pague ese costo.
+    """
+    await asyncio.to_thread(asset_store.precompute)
+    await asyncio.gather(*(obtener_icono(codigo) for codigo in ICONOS), return_exceptions=True)
+
+
+prewarm_stats = {"cities": len(CACHE_PREWARM_CITIES), "warmed": 0, "failed": 0, "seconds": None}
+
+
+async def precalentar_cache():
+    """
+    Descarga al iniciar el clima actual y el pronóstico de las ciudades de `CACHE_PREWARM_CITIES`,
+    para que sus primeras solicitudes sean aciertos de caché.
+
+    Las descargas usan el mismo límite de concurrencia que las consultas por lote; una ciudad
+    que falla no detiene al resto.
+    """
+    inicio = time.perf_counter()
+
+    async def precalentar(city):
+        async with batch_semaphore:
+            try:
+                await obtener_clima_actual(city)
+                if CACHE_PREWARM_FORECAST:
+                    await obtener_pronostico_ciudad(city)
+            except Exception as exc:
+                # Cualquier error (ciudad desconocida, OpenWeather caído, una respuesta que no es JSON...)
+                # solo cuenta como fallo de esa ciudad
+                print(f"No se pudo precalentar {city}: {exc!r}", file=sys.stderr)
+                prewarm_stats["failed"] += 1
+            else:
+                prewarm_stats["warmed"] += 1
+
+    await asyncio.gather(*(precalentar(city) for city in CACHE_PREWARM_CITIES))
+    prewarm_stats["seconds"] = round(time.perf_counter() - inicio, 3)
+
+
+def servir_asset(asset, request):
+    """
+    Construye la respuesta de un recurso con ETag y Cache-Control de larga duración.
+
+    Si el navegador envía `If-None-Match` con el mismo ETag se responde 304 sin cuerpo.
+    """
+    headers = {"ETag": asset.etag, "Cache-Control": f"public, max-age={ASSETS_MAX_AGE}"}
+    etags = [e.strip() for e in request.headers.get("if-none-match", "").split(",")]
+    if asset.etag in etags or "*" in etags:
+        return Response(status_code=304, headers=headers)
+    return Response(asset.body, media_type=asset.media_type, headers=headers)
+
+
+@app.get("/assets/icons/{codigo}.png")
+async def get_icon(codigo: str, request: Request):
+    """
+    Sirve un ícono de condición de OpenWeather (p. ej. `/assets/icons/10n.png`) desde memoria.
+    """
+    return servir_asset(await obtener_icono(codigo), request)
+
+
+@app.get("/assets/backgrounds/{nombre}.{formato}")
+async def get_background(nombre: str, formato: str, request: Request, w: int = None):
+    """
+    Sirve una imagen de fondo redimensionada y recomprimida desde memoria.
+
+    Parámetros:
+    - nombre (str): Fondo sin extensión, p. ej. "clear_n" (ver `/assets/conditions`).
+    - formato (str): "jpg" o "webp".
+    - w (int): Ancho deseado en píxeles; se redondea al siguiente ancho de
+        `ASSETS_BACKGROUND_WIDTHS` (por defecto, el mayor).
+    """
+    if formato not in ("jpg", "webp"):
+        raise HTTPException(status_code=404, detail="Unsupported format")
+    asset = await asyncio.to_thread(asset_store.background, nombre, w, formato)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Background not found")
+    return servir_asset(asset, request)
+
+
+@app.get("/assets/conditions")
+async def get_condition_assets():
+    """
+    Devuelve el ícono, el fondo y la leyenda de cada código de condición de OpenWeather.
+
+    Devuelve:
+    - dict: {"conditions": {código: {"day": {...}, "night": {...}}}, "icons": [...],
+            "backgrounds": [...], "formats": [...], "widths": [...]}.
+    """
+    return {
+        "conditions": {
+            codigo: {"day": recurso_para(codigo, "d"), "night": recurso_para(codigo, "n")}
+            for codigo in CONDICIONES
+        },
+        "icons": list(ICONOS),
+        "backgrounds": list(FONDOS),
+        "formats": list(asset_store.formats),
+        "widths": list(asset_store.widths),
+    }
+
+
+@app.get("/cities/suggest")
+async def suggest_cities(q: str, limit: int = 10):
+    """
+    Sugiere ciudades del índice local cuyo nombre o alias empieza por el texto dado.
+
+    No consulta OpenWeather, por lo que puede llamarse en cada pulsación de tecla.
+
+    Parámetros:
+    - q (str): Texto escrito hasta ahora, p. ej. "guada".
+    - limit (int): Máximo de sugerencias (hasta `CITY_SUGGEST_MAX`).
+
+    Devuelve:
+    - list: [{"id", "name", "country", "lat", "lon"}], las coincidencias exactas y las ciudades
+            más pobladas primero.
+    """
+    return city_index.suggest(q, max(0, min(limit, CITY_SUGGEST_MAX)))
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Expone las métricas del servicio en formato de texto de Prometheus.
+
+    Incluye histogramas de latencia por ruta y de llamadas a OpenWeather por código de estado,
+    solicitudes en curso y los contadores de las cachés.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """
+    Devuelve los contadores de aciertos, fallos y desalojos de las cachés de respuestas.
+
+    Devuelve:
+    - dict: Estadísticas de la caché de clima actual y de la caché de pronóstico y, con la
+            caché espacial activa, búsquedas resueltas en la celda propia, en una vecina o sin datos;
+            además, las ciudades que OpenWeather no conoce, los íconos, las variantes de fondo en memoria, el backend compartido y, si está
+            configurado, el avance del precalentamiento.
+    """
+    stats = {"current": current_cache.stats(), "forecast": forecast_cache.stats()}
+    if forecast_grid is not None:
+        stats["forecast_grid"] = forecast_grid.stats()
+    stats["not_found"] = not_found_cache.stats()
+    stats["icons"] = icon_cache.stats()
+    stats["backgrounds"] = asset_store.stats()
+    stats["backend"] = cache_backend.stats()
+    if CACHE_PREWARM_CITIES:
+        stats["prewarm"] = prewarm_stats
+    return stats
+
+
+@app.get("/upstream/stats")
+async def get_upstream_stats():
+    """
+    Devuelve los contadores de la capa de resiliencia hacia OpenWeather.
+
+    Devuelve:
+    - dict: Llamadas, reintentos, coberturas, timeouts, fallos, llamadas rechazadas por circuito
+            abierto y, por endpoint, el estado del circuito y la latencia p95 reciente; con la cuota
+            activa, además las fichas disponibles y la cola de cada clase de prioridad.
+    """
+    stats = upstream.stats()
+    if upstream_quota is not None:
+        stats["quota"] = upstream_quota.stats()
+    return stats
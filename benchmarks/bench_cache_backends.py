@@ -0,0 +1,180 @@
+"""
+Benchmark: llamadas al upstream y latencia con 1, 4 y 8 workers según el backend de caché.
+
+Cada worker es un proceso con su propia `TTLCache` (como un worker de uvicorn) que atiende
+solicitudes de ciudades con popularidad tipo Zipf durante un tiempo fijo. El upstream se simula
+con una espera fija y un contador compartido entre procesos, sin red. Se compara:
+
+- memory: solo la caché local de cada worker (el comportamiento sin backend compartido).
+- sqlite: archivo SQLite en WAL como segundo nivel compartido.
+- redis: servidor Redis como segundo nivel compartido (se omite si no hay uno en --redis-url).
+
+Reporta llamadas al upstream, su reducción frente a memory con el mismo número de workers,
+p50/p99 de la latencia de las solicitudes y p50/p99 de las lecturas al backend compartido (el
+costo de un acierto en el segundo nivel).
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/bench_cache_backends.py --seconds 5 --workers 1,4,8
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import socket
+import statistics
+import sys
+import tempfile
+import time
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cacheBackends import MemoryBackend, RedisBackend, SQLiteBackend  # noqa: E402
+from weatherCache import TTLCache  # noqa: E402
+
+PAYLOAD = {
+    "coord": {"lon": -0.1257, "lat": 51.5085},
+    "weather": [{"id": 803, "main": "Clouds", "description": "broken clouds", "icon": "04d"}],
+    "main": {"temp": 12.3, "feels_like": 11.5, "temp_min": 10.9, "temp_max": 13.6, "pressure": 1012, "humidity": 76},
+    "visibility": 10000,
+    "wind": {"speed": 4.6, "deg": 240},
+    "clouds": {"all": 75},
+    "dt": 1700000000,
+    "sys": {"country": "GB", "sunrise": 1699990000, "sunset": 1700020000},
+    "timezone": 0,
+}
+
+
+def crear(nombre, args, ejecucion):
+    if nombre == "memory":
+        return MemoryBackend()
+    if nombre == "sqlite":
+        return SQLiteBackend(args.sqlite_path)
+    return RedisBackend(args.redis_url, prefix=f"bench_clima:{ejecucion}:")
+
+
+class Medido:
+    """
+    Envuelve un backend para medir la latencia de sus lecturas.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.shared = backend.shared
+        self.latencias = []
+
+    async def get(self, key):
+        inicio = time.perf_counter()
+        try:
+            return await self.backend.get(key)
+        finally:
+            self.latencias.append(time.perf_counter() - inicio)
+
+    def __getattr__(self, nombre):
+        return getattr(self.backend, nombre)
+
+
+async def atender(indice, nombre, args, ejecucion, contador, barrera):
+    backend = Medido(crear(nombre, args, ejecucion))
+    cache = TTLCache(args.ttl, backend=backend if backend.shared else None, lease=args.lease)
+    rng = random.Random(args.seed + indice)
+    claves = [f"city-{i}" for i in range(args.keys)]
+    pesos = [1 / (i + 1) ** args.zipf for i in range(args.keys)]
+
+    async def descargar(clave):
+        with contador.get_lock():
+            contador.value += 1
+        await asyncio.sleep(args.upstream_ms / 1000)
+        return {**PAYLOAD, "name": clave}, 600
+
+    latencias = []
+    await asyncio.to_thread(barrera.wait)
+    fin = time.monotonic() + args.seconds
+
+    async def cliente():
+        while time.monotonic() < fin:
+            clave = rng.choices(claves, pesos)[0]
+            inicio = time.perf_counter()
+            await cache.get_or_fetch(clave, lambda: descargar(clave))
+            latencias.append(time.perf_counter() - inicio)
+            await asyncio.sleep(args.think_ms / 1000)
+
+    await asyncio.gather(*(cliente() for _ in range(args.concurrency)))
+    await backend.close()
+    return latencias, backend.latencias
+
+
+def worker(indice, nombre, args, ejecucion, contador, barrera, cola):
+    cola.put(asyncio.run(atender(indice, nombre, args, ejecucion, contador, barrera)))
+
+
+def correr(nombre, workers, args, ejecucion):
+    contador = multiprocessing.Value("i", 0)
+    barrera = multiprocessing.Barrier(workers)
+    cola = multiprocessing.Queue()
+    procesos = [multiprocessing.Process(target=worker, args=(i, nombre, args, ejecucion, contador, barrera, cola))
+                for i in range(workers)]
+    for proceso in procesos:
+        proceso.start()
+    resultados = [cola.get() for _ in procesos]
+    for proceso in procesos:
+        proceso.join()
+    latencias = [x for r in resultados for x in r[0]]
+    lecturas = [x for r in resultados for x in r[1]]
+    return contador.value, latencias, lecturas
+
+
+def cuantiles(valores):
+    if len(valores) < 2:
+        return float("nan"), float("nan")
+    q = statistics.quantiles(valores, n=100)
+    return q[49] * 1000, q[98] * 1000
+
+
+def redis_disponible(url):
+    partes = urlparse(url)
+    try:
+        socket.create_connection((partes.hostname or "localhost", partes.port or 6379), timeout=0.2).close()
+        return True
+    except OSError:
+        return False
+
+
+def main(args):
+    backends = ["memory", "sqlite"]
+    if redis_disponible(args.redis_url):
+        backends.append("redis")
+    else:
+        print(f"(sin servidor Redis en {args.redis_url}: se omite el backend redis)")
+    print(f"{'workers':>7}  {'backend':<8}{'requests':>9}{'upstream':>9}{'reduction':>10}"
+          f"{'p50 ms':>8}{'p99 ms':>8}{'L2 p50 ms':>10}{'L2 p99 ms':>10}")
+    ejecucion = f"{os.getpid()}-{int(time.time())}"
+    with tempfile.TemporaryDirectory() as directorio:
+        for workers in args.workers:
+            base = None
+            for nombre in backends:
+                args.sqlite_path = os.path.join(directorio, f"cache-{workers}.db")
+                llamadas, latencias, lecturas = correr(nombre, workers, args, f"{ejecucion}-{workers}")
+                base = llamadas if base is None else base
+                p50, p99 = cuantiles(latencias)
+                l2_50, l2_99 = cuantiles(lecturas)
+                print(f"{workers:>7}  {nombre:<8}{len(latencias):>9}{llamadas:>9}{1 - llamadas / base:>10.0%}"
+                      f"{p50:>8.2f}{p99:>8.1f}{l2_50:>10.3f}{l2_99:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=lambda v: [int(w) for w in v.split(",")], default=[1, 4, 8])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--concurrency", type=int, default=8, help="clientes simultáneos por worker")
+    parser.add_argument("--think-ms", type=float, default=5.0, help="pausa de cada cliente entre solicitudes")
+    parser.add_argument("--keys", type=int, default=500, help="ciudades distintas")
+    parser.add_argument("--zipf", type=float, default=1.0, help="exponente de la popularidad de las ciudades")
+    parser.add_argument("--ttl", type=float, default=2.0, help="TTL de las respuestas (corto para ver renovaciones)")
+    parser.add_argument("--lease", type=float, default=5.0)
+    parser.add_argument("--upstream-ms", type=float, default=50.0, help="latencia simulada de OpenWeather")
+    parser.add_argument("--redis-url", default=os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0"))
+    parser.add_argument("--seed", type=int, default=1)
+    main(parser.parse_args())
@@ -0,0 +1,82 @@
+"""
+Benchmark: memoria y costo de dibujo del modo tablero según el número de ciudades.
+
+Para N ciudades con el historial lleno (`DASHBOARD_CAPACITY` puntos por ciudad y métrica)
+mide la memoria de las series, el tiempo de construir los cuatro gráficos del tablero, el
+tiempo de serializarlos a JSON (lo que Streamlit envía al navegador en cada actualización),
+el tamaño de ese JSON y los puntos dibujados. Compara el tablero (`Scattergl` con presupuesto
+de puntos) contra trazas SVG (`Scatter`) con todos los puntos.
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/bench_dashboard.py --cities 1,5,10,25,50
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import plotly.graph_objects as go  # noqa: E402
+import plotly.io as pio  # noqa: E402
+
+from benchmarks.payloads import current_payload  # noqa: E402
+from dashboardFront import DASHBOARD_CAPACITY, DASHBOARD_POINT_BUDGET, METRICAS, DashboardSeries  # noqa: E402
+
+
+def llenar(n, capacity):
+    series = DashboardSeries(capacity)
+    inicio = datetime(2023, 10, 18)
+    ciudades = [f"Bench City {chr(65 + i % 26)}{chr(65 + i // 26 % 26)}" for i in range(n)]
+    for i in range(capacity):
+        now = 1697630400 + 600 * i  # un payload distinto cada 10 minutos sintéticos
+        series.update({city: current_payload(city, now=now) for city in ciudades}, inicio + timedelta(seconds=5 * i))
+    return series
+
+
+def figuras_svg(series):
+    return [
+        go.Figure(data=[{"type": "scatter", "x": buffers[metrica].times(), "y": buffers[metrica].values(),
+                         "mode": "lines", "name": city} for city, buffers in series._series.items()],
+                  layout={"title": metrica})
+        for metrica in METRICAS
+    ]
+
+
+def medir(construir, repeat):
+    inicio = time.perf_counter()
+    for _ in range(repeat):
+        figuras = construir()
+    construccion = (time.perf_counter() - inicio) / repeat * 1000
+    inicio = time.perf_counter()
+    for _ in range(repeat):
+        json_total = sum(len(pio.to_json(fig, validate=False)) for fig in figuras)
+    serializacion = (time.perf_counter() - inicio) / repeat * 1000
+    puntos = sum(len(trace.x) for fig in figuras for trace in fig.data)
+    return construccion, serializacion, json_total, puntos
+
+
+def main(args):
+    print(f"capacity={args.capacity} points per city and metric, budget={args.budget} points per chart")
+    print(f"{'cities':>6}{'series KiB':>12}{'variant':>10}{'build ms':>10}{'json ms':>9}{'json KiB':>10}{'points':>9}")
+    for n in (int(c) for c in args.cities.split(",")):
+        series = llenar(n, args.capacity)
+        variantes = {
+            "webgl": lambda: [series.figure(metrica, args.budget) for metrica in METRICAS],
+            "svg-all": lambda: figuras_svg(series),
+        }
+        for nombre, construir in variantes.items():
+            construccion, serializacion, json_total, puntos = medir(construir, args.repeat)
+            print(f"{n:>6}{series.nbytes / 1024:>12.1f}{nombre:>10}{construccion:>10.1f}{serializacion:>9.1f}"
+                  f"{json_total / 1024:>10.0f}{puntos:>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cities", default="1,5,10,25,50")
+    parser.add_argument("--capacity", type=int, default=DASHBOARD_CAPACITY)
+    parser.add_argument("--budget", type=int, default=DASHBOARD_POINT_BUDGET)
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
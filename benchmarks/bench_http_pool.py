@@ -0,0 +1,117 @@
+"""
+Benchmark: cliente HTTP por solicitud vs. cliente compartido con pool de conexiones.
+
+Levanta un sustituto local de OpenWeather (HTTP/1.1 con keep-alive) que simula el costo de
+establecer una conexión nueva (DNS + TCP + TLS) con un retardo configurable, y mide la
+latencia p50/p99 de las dos estrategias:
+
+- per-request: `async with httpx.AsyncClient()` en cada llamada (comportamiento anterior).
+- pooled: un único cliente creado con `OpenWeather.crear_cliente_http()`.
+
+Uso (desde la raíz del proyecto, con los mismos secrets que el servicio):
+    python benchmarks/bench_http_pool.py --requests 500 --concurrency 20 --setup-ms 30
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from OpenWeather import crear_cliente_http  # noqa: E402
+
+BODY = json.dumps({
+    "coord": {"lon": -0.1257, "lat": 51.5085},
+    "weather": [{"id": 803, "main": "Clouds", "description": "broken clouds", "icon": "04d"}],
+    "main": {"temp": 14.2, "feels_like": 13.6, "temp_min": 12.9, "temp_max": 15.4,
+             "pressure": 1012, "humidity": 77},
+    "wind": {"speed": 4.6, "deg": 240},
+    "sys": {"country": "GB", "sunrise": 1697610000, "sunset": 1697648000},
+    "timezone": 3600,
+    "name": "London",
+}).encode()
+
+
+async def _atender_conexion(reader, writer, setup_delay):
+    # Simula el costo de una conexión nueva (handshake TLS, DNS, etc.)
+    await asyncio.sleep(setup_delay)
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                b"Content-Length: " + str(len(BODY)).encode() + b"\r\n\r\n" + BODY
+            )
+            await writer.drain()
+    except ConnectionResetError:
+        pass
+    finally:
+        writer.close()
+
+
+def _percentil(muestras, p):
+    ordenadas = sorted(muestras)
+    indice = min(len(ordenadas) - 1, int(round(p / 100 * (len(ordenadas) - 1))))
+    return ordenadas[indice]
+
+
+async def _ejecutar(nombre, llamar, total, concurrencia):
+    semaforo = asyncio.Semaphore(concurrencia)
+    latencias = []
+
+    async def una():
+        async with semaforo:
+            inicio = time.perf_counter()
+            response = await llamar()
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            response.raise_for_status()
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(una() for _ in range(total)))
+    duracion = time.perf_counter() - inicio
+    print(
+        f"{nombre:<12} p50={_percentil(latencias, 50):7.2f} ms  "
+        f"p99={_percentil(latencias, 99):7.2f} ms  "
+        f"media={statistics.mean(latencias):7.2f} ms  {total / duracion:8.1f} req/s"
+    )
+
+
+async def main(args):
+    server = await asyncio.start_server(
+        lambda r, w: _atender_conexion(r, w, args.setup_ms / 1000), "127.0.0.1", 0
+    )
+    port = server.sockets[0].getsockname()[1]
+    url = f"http://127.0.0.1:{port}/data/2.5/weather?q=London&units=metric&appid=bench"
+
+    async def por_solicitud():
+        async with httpx.AsyncClient() as client:
+            return await client.get(url)
+
+    cliente = crear_cliente_http()
+
+    async def compartido():
+        return await cliente.get(url)
+
+    async with server:
+        await _ejecutar("per-request", por_solicitud, args.requests, args.concurrency)
+        await _ejecutar("pooled", compartido, args.requests, args.concurrency)
+    await cliente.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--setup-ms", type=float, default=30.0,
+                        help="retardo simulado por conexión nueva (ms)")
+    asyncio.run(main(parser.parse_args()))
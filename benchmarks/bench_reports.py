@@ -0,0 +1,139 @@
+"""
+Benchmark: generador de reportes por lote (`climateReports.py`).
+
+Tres mediciones, con un upstream simulado en proceso (sin red ni cuota):
+
+- fetch: ciudades por segundo consultando una a una frente a `generar` con concurrencia acotada
+  (latencia lognormal del upstream, dos llamadas por ciudad como el clima actual y el pronóstico).
+- memory: pico de memoria (tracemalloc) al escribir las filas a medida que llegan frente a
+  acumular todas las respuestas y escribir al final.
+- render: reportes HTML+PNG por segundo en serie frente al pool de procesos.
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/bench_reports.py --cities 2000 --concurrency 50 --render-cities 40
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.payloads import coordenadas, current_payload, forecast_payload  # noqa: E402
+from climateReports import Checkpoint, CsvSink, fila, generar, renderizar_reporte  # noqa: E402
+from weatherResponses import compactar_actual, compactar_pronostico  # noqa: E402
+
+
+def crear_obtener(args, rng):
+    async def obtener(city):
+        for _ in range(2):
+            await asyncio.sleep(rng.lognormvariate(math.log(args.median_ms / 1000), 0.5))
+        lat, lon = coordenadas(city)
+        return current_payload(city), forecast_payload(lat, lon, name=city)
+
+    return obtener
+
+
+async def medir_fetch(args, directorio):
+    ciudades = [f"city-{i}" for i in range(args.cities)]
+    print(f"{'fetch':<8}{'variant':<12}{'cities':>8}{'seconds':>9}{'cities/s':>10}")
+    secuencial = ciudades[:args.sequential_cities]
+    obtener = crear_obtener(args, random.Random(args.seed))
+    inicio = time.perf_counter()
+    for city in secuencial:
+        await obtener(city)
+    duracion = time.perf_counter() - inicio
+    print(f"{'':<8}{'sequential':<12}{len(secuencial):>8}{duracion:>9.1f}{len(secuencial) / duracion:>10.1f}")
+
+    checkpoint = Checkpoint(os.path.join(directorio, "checkpoint.jsonl"))
+    sink = CsvSink(directorio)
+    inicio = time.perf_counter()
+    await generar(ciudades, crear_obtener(args, random.Random(args.seed)), sink, checkpoint, args.concurrency)
+    duracion = time.perf_counter() - inicio
+    sink.close()
+    checkpoint.close()
+    print(f"{'':<8}{f'bounded {args.concurrency}':<12}{len(ciudades):>8}{duracion:>9.1f}{len(ciudades) / duracion:>10.1f}")
+
+
+async def medir_memoria(args):
+    ciudades = [f"city-{i}" for i in range(args.memory_cities)]
+    print(f"\n{'memory':<8}{'variant':<12}{'cities':>8}{'peak MiB':>10}")
+    args_rapidos = argparse.Namespace(**{**vars(args), "median_ms": 0.01})
+
+    with tempfile.TemporaryDirectory() as directorio:
+        tracemalloc.start()
+        checkpoint = Checkpoint(os.path.join(directorio, "checkpoint.jsonl"))
+        sink = CsvSink(directorio)
+        await generar(ciudades, crear_obtener(args_rapidos, random.Random(args.seed)), sink, checkpoint, args.concurrency)
+        sink.close()
+        checkpoint.close()
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    print(f"{'':<8}{'streaming':<12}{len(ciudades):>8}{pico / 2**20:>10.1f}")
+
+    tracemalloc.start()
+    obtener = crear_obtener(args_rapidos, random.Random(args.seed))
+    semaforo = asyncio.Semaphore(args.concurrency)
+
+    async def una(city):
+        async with semaforo:
+            return city, *(await obtener(city))
+
+    respuestas = await asyncio.gather(*(una(c) for c in ciudades))
+    filas = [fila(city, actual, pronostico) for city, actual, pronostico in respuestas]
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del respuestas, filas
+    print(f"{'':<8}{'collect-all':<12}{len(ciudades):>8}{pico / 2**20:>10.1f}")
+
+
+def medir_render(args, directorio):
+    trabajos = []
+    for i in range(args.render_cities):
+        city = f"city-{i}"
+        lat, lon = coordenadas(city)
+        trabajos.append((directorio, city, compactar_actual(current_payload(city)),
+                         compactar_pronostico(forecast_payload(lat, lon, name=city)), ("html", "png")))
+    print(f"\n{'render':<8}{'variant':<12}{'reports':>8}{'seconds':>9}{'reports/s':>10}")
+    renderizar_reporte(*trabajos[0])  # importa plotly y matplotlib antes de medir
+    inicio = time.perf_counter()
+    for trabajo in trabajos:
+        renderizar_reporte(*trabajo)
+    duracion = time.perf_counter() - inicio
+    print(f"{'':<8}{'serial':<12}{len(trabajos):>8}{duracion:>9.1f}{len(trabajos) / duracion:>10.1f}")
+
+    with ProcessPoolExecutor(args.render_workers) as pool:
+        list(pool.map(renderizar_reporte, *zip(*trabajos[:args.render_workers])))
+        inicio = time.perf_counter()
+        list(pool.map(renderizar_reporte, *zip(*trabajos)))
+        duracion = time.perf_counter() - inicio
+    variante = f"pool {args.render_workers}"
+    print(f"{'':<8}{variante:<12}{len(trabajos):>8}{duracion:>9.1f}{len(trabajos) / duracion:>10.1f}")
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as directorio:
+        asyncio.run(medir_fetch(args, directorio))
+    asyncio.run(medir_memoria(args))
+    with tempfile.TemporaryDirectory() as directorio:
+        medir_render(args, directorio)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cities", type=int, default=2000)
+    parser.add_argument("--sequential-cities", type=int, default=50, help="ciudades de la variante una a una")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--median-ms", type=float, default=80, help="latencia mediana de cada llamada al upstream")
+    parser.add_argument("--memory-cities", type=int, default=5000)
+    parser.add_argument("--render-cities", type=int, default=40)
+    parser.add_argument("--render-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=1)
+    main(parser.parse_args())
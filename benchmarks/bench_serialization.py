@@ -0,0 +1,61 @@
+"""
+Micro-benchmark: bytes por respuesta y tiempo de serialización por solicitud.
+
+Compara, para el clima actual y el pronóstico, la respuesta completa de OpenWeather contra la
+forma compacta (`compact=true`) y una proyección (`fields=`), serializadas con:
+
+- default: el camino por defecto de FastAPI (`jsonable_encoder` + `json.dumps`).
+- orjson / msgpack: los serializadores opcionales de `weatherResponses.responder`.
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/bench_serialization.py --repeat 2000
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from benchmarks.payloads import current_payload, forecast_payload  # noqa: E402
+from weatherResponses import compactar_actual, compactar_pronostico, msgpack, orjson, proyectar  # noqa: E402
+
+
+def _default(payload):
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def main(args):
+    serializadores = {"default": _default}
+    if orjson is not None:
+        serializadores["orjson"] = orjson.dumps
+    if msgpack is not None:
+        serializadores["msgpack"] = msgpack.packb
+
+    current = current_payload("London", now=1697630400)
+    forecast = forecast_payload(51.5085, -0.1257, now=1697630400, name="London")
+    casos = {
+        "current raw": lambda: current,
+        "current compact": lambda: compactar_actual(current),
+        "current fields=name,main": lambda: proyectar(current, "name,main"),
+        "forecast raw": lambda: forecast,
+        "forecast compact": lambda: compactar_pronostico(forecast),
+    }
+
+    print(f"{'payload':<28}{'serializer':<10}{'bytes':>9}{'µs/req':>10}")
+    for nombre, construir in casos.items():
+        for serializador, dumps in serializadores.items():
+            tamaño = len(dumps(construir()))
+            segundos = timeit.timeit(lambda: dumps(construir()), number=args.repeat)
+            print(f"{nombre:<28}{serializador:<10}{tamaño:>9}{segundos / args.repeat * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000)
+    main(parser.parse_args())
@@ -0,0 +1,94 @@
+"""
+Benchmark: llamadas al upstream de `/forecast` con y sin la caché espacial de pronósticos.
+
+Genera una carga sintética agrupada: solicitudes alrededor de unos pocos centros (ciudades) con
+dispersión gaussiana de algunos kilómetros y con coordenadas enviadas con distinta precisión
+(de 2 a 6 decimales). La misma secuencia se pasa por:
+
+- exact: la clave anterior, coordenadas redondeadas a 4 decimales.
+- grid: coordenadas ajustadas a la rejilla, sin reutilizar celdas vecinas.
+- grid+tolerance: rejilla y celda fresca más cercana dentro de la tolerancia.
+
+Para cada variante reporta llamadas al upstream, reducción frente a `exact` y la distancia entre
+el punto pedido y el punto cuyo pronóstico se devuelve (el costo en precisión).
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/bench_spatial_cache.py --clusters 50 --requests 20000 --spread-km 2
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from spatialIndex import KM_POR_GRADO, GridIndex, distancia_km  # noqa: E402
+from weatherCache import TTLCache  # noqa: E402
+
+
+def carga_agrupada(args):
+    rng = random.Random(args.seed)
+    centros = [(rng.uniform(-55, 65), rng.uniform(-180, 180)) for _ in range(args.clusters)]
+    pesos = [1 / (i + 1) for i in range(args.clusters)]  # unas pocas ciudades concentran la carga
+    sigma = args.spread_km / KM_POR_GRADO
+    puntos = []
+    for lat, lon in rng.choices(centros, weights=pesos, k=args.requests):
+        decimales = rng.randint(2, 6)
+        puntos.append((round(rng.gauss(lat, sigma), decimales), round(rng.gauss(lon, sigma), decimales)))
+    return puntos
+
+
+async def simular(puntos, resolution, tolerance_km):
+    cache = TTLCache(ttl=float("inf"), max_entries=10 ** 6, max_bytes=10 ** 12)
+    grid = GridIndex(resolution, tolerance_km, is_fresh=cache.has) if resolution else None
+    llamadas, desplazamientos = 0, []
+
+    for lat, lon in puntos:
+        celda = None
+        if grid is None:
+            clat, clon = round(lat, 4), round(lon, 4)
+        else:
+            celda = grid.lookup(lat, lon) or grid.snap(lat, lon)
+            clat, clon = grid.center(celda)
+
+        async def descargar():
+            nonlocal llamadas
+            llamadas += 1
+            if celda is not None:
+                grid.add(celda)
+            return (clat, clon), 1
+
+        servido = await cache.get_or_fetch(f"{clat},{clon}", descargar)
+        desplazamientos.append(distancia_km(lat, lon, *servido))
+    return llamadas, desplazamientos
+
+
+async def main(args):
+    puntos = carga_agrupada(args)
+    variantes = [
+        ("exact", 0, 0),
+        (f"grid {args.resolution}°", args.resolution, 0),
+        (f"grid {args.resolution}° + {args.tolerance_km} km", args.resolution, args.tolerance_km),
+    ]
+    print(f"{len(puntos)} requests around {args.clusters} centers, spread {args.spread_km} km")
+    print(f"{'variant':<26}{'upstream':>10}{'reduction':>11}{'mean km':>9}{'p95 km':>8}")
+    base = None
+    for nombre, resolution, tolerance in variantes:
+        llamadas, desplazamientos = await simular(puntos, resolution, tolerance)
+        base = base or llamadas
+        print(f"{nombre:<26}{llamadas:>10}{1 - llamadas / base:>11.1%}"
+              f"{sum(desplazamientos) / len(desplazamientos):>9.2f}{statistics.quantiles(desplazamientos, n=20)[-1]:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clusters", type=int, default=50, help="centros de la carga (ciudades)")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--spread-km", type=float, default=2.0, help="desviación estándar alrededor de cada centro")
+    parser.add_argument("--resolution", type=float, default=0.05, help="tamaño de celda en grados")
+    parser.add_argument("--tolerance-km", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,108 @@
+"""
+Benchmark: tiempo de importación y de arranque del servicio, y memoria por worker.
+
+Cada medición corre en un intérprete nuevo, como un worker de uvicorn recién creado:
+
+- import: tiempo de `import OpenWeather`.
+- startup: tiempo del arranque de la aplicación (lifespan: cliente HTTP, índice de ciudades,
+  historial) hasta poder atender solicitudes.
+- rss: memoria residente máxima del proceso tras el arranque.
+- modules: módulos importados, y si se cargó algún módulo del front end (streamlit, plotly,
+  matplotlib, pandas).
+
+La variante "service+streamlit" importa además streamlit, como hacía el servicio antes de tener
+su propia capa de configuración. Con `--max-import-ms`, `--max-startup-ms` o `--max-rss-mib` el
+script termina con código 1 si la mediana los supera (o si el servicio importa el front end),
+para usarlo como guardia contra regresiones.
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/bench_startup.py --runs 5 --max-import-ms 1000
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MEDIR = """
+import asyncio, json, resource, sys, time
+sys.path.insert(0, {raiz!r})
+inicio = time.perf_counter()
+{previo}
+import OpenWeather
+importado = time.perf_counter()
+
+async def arrancar():
+    async with OpenWeather.lifespan(OpenWeather.app):
+        return time.perf_counter()
+
+listo = asyncio.run(arrancar())
+print(json.dumps({{
+    "import": (importado - inicio) * 1000,
+    "startup": (listo - importado) * 1000,
+    "rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules": len(sys.modules),
+    "front_end": sorted(m for m in ("streamlit", "plotly", "matplotlib", "pandas") if m in sys.modules),
+}}))
+"""
+
+VARIANTES = {"service": "", "service+streamlit": "import streamlit"}
+
+
+def medir(variante, directorio):
+    entorno = {
+        **os.environ,
+        "OPENWEATHER_API_KEY": os.environ.get("OPENWEATHER_API_KEY", "benchmark"),
+        "HISTORY_DB_PATH": os.path.join(directorio, "observations.db"),
+        "CLIMA_SETTINGS_FILE": os.path.join(directorio, "settings.toml"),
+        "CLIMA_SECRETS_FILE": os.path.join(directorio, "secrets.toml"),
+        "ASSETS_PRECOMPUTE": "0",
+    }
+    codigo = MEDIR.format(raiz=RAIZ, previo=VARIANTES[variante])
+    salida = subprocess.run([sys.executable, "-c", codigo], env=entorno, cwd=directorio, capture_output=True,
+                            text=True, check=True)
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def main(args):
+    print(f"{'variant':<19}{'import ms':>10}{'startup ms':>11}{'rss MiB':>9}{'modules':>9}  front-end modules")
+    medianas = {}
+    with tempfile.TemporaryDirectory() as directorio:
+        for variante in VARIANTES:
+            if variante != "service" and not args.compare_streamlit:
+                continue
+            corridas = [medir(variante, directorio) for _ in range(args.runs)]
+            mediana = {k: statistics.median(c[k] for c in corridas) for k in ("import", "startup", "rss", "modules")}
+            mediana["front_end"] = corridas[0]["front_end"]
+            medianas[variante] = mediana
+            print(f"{variante:<19}{mediana['import']:>10.0f}{mediana['startup']:>11.0f}{mediana['rss']:>9.0f}"
+                  f"{mediana['modules']:>9.0f}  {', '.join(mediana['front_end']) or '-'}")
+
+    servicio = medianas["service"]
+    fallas = []
+    if servicio["front_end"]:
+        fallas.append(f"el servicio importa módulos del front end: {', '.join(servicio['front_end'])}")
+    for nombre, limite, clave, unidad in (("import", args.max_import_ms, "import", "ms"),
+                                          ("startup", args.max_startup_ms, "startup", "ms"),
+                                          ("rss", args.max_rss_mib, "rss", "MiB")):
+        if limite is not None and servicio[clave] > limite:
+            fallas.append(f"{nombre}: {servicio[clave]:.0f} {unidad} > {limite:.0f} {unidad}")
+    for falla in fallas:
+        print("REGRESIÓN:", falla, file=sys.stderr)
+    return 1 if fallas else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--no-compare-streamlit", dest="compare_streamlit", action="store_false",
+                        help="no medir la variante que importa streamlit")
+    parser.add_argument("--max-import-ms", type=float)
+    parser.add_argument("--max-startup-ms", type=float)
+    parser.add_argument("--max-rss-mib", type=float)
+    sys.exit(main(parser.parse_args()))
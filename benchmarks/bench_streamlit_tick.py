@@ -0,0 +1,85 @@
+"""
+Benchmark: tiempo de CPU del servidor Streamlit por actualización de la vista en vivo.
+
+Ejecuta la app con `streamlit.testing.v1.AppTest` mientras hay seguimiento activo, sustituyendo
+`httpx.get` por una respuesta fija (no hace falta el servicio FastAPI), y compara:
+
+- antes: `benchmarks/frontstream_before.py`, copia del `FrontStream.py` original, que en cada
+  actualización re-ejecutaba el script completo (`st.experimental_rerun()`). Se mide el tiempo de
+  CPU de una ejecución completa de la app.
+- después, script completo: el `FrontStream.py` actual ejecutado completo con la misma medida;
+  es lo que cuesta una interacción del usuario (p. ej. pulsar un botón), no una actualización.
+- después, fragmento: lo que cuesta cada actualización, en la que solo se vuelve a ejecutar el
+  fragmento `vista_en_vivo`; es el valor `tick_cpu_ms` que registra el propio fragmento, sin el
+  trabajo de Streamlit fuera de él.
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/bench_streamlit_tick.py --ticks 30
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from unittest import mock
+
+from streamlit.testing.v1 import AppTest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+WEATHER = {
+    "coord": {"lon": -0.1257, "lat": 51.5085},
+    "weather": [{"id": 803, "main": "Clouds", "description": "broken clouds", "icon": "04d"}],
+    "main": {"temp": 14.2, "feels_like": 13.6, "temp_min": 12.9, "temp_max": 15.4,
+             "pressure": 1012, "humidity": 77},
+    "wind": {"speed": 4.6, "deg": 240},
+    "sys": {"country": "GB", "sunrise": 1697610000, "sunset": 1697648000},
+    "timezone": 3600,
+    "name": "London",
+}
+
+
+def medir(script, ticks):
+    app = AppTest.from_file(os.path.join(RAIZ, script), default_timeout=30)
+    app.session_state["start_update"] = True
+    app.session_state["tracking_city"] = "London"
+    app.run()
+
+    completo, fragmento = [], []
+    for _ in range(ticks):
+        inicio = time.process_time()
+        app.run()
+        completo.append((time.process_time() - inicio) * 1000)
+        if app.exception:
+            raise RuntimeError(f"{script}: {app.exception[0].message}")
+        if "tick_cpu_ms" in app.session_state:
+            fragmento.append(app.session_state["tick_cpu_ms"])
+    return completo, fragmento
+
+
+def imprimir(caso, tiempos):
+    print(f"{caso:<28} media={statistics.mean(tiempos):8.2f} ms  mediana={statistics.median(tiempos):8.2f} ms CPU/tick")
+
+
+def main(args):
+    os.chdir(RAIZ)
+    respuesta = mock.Mock(status_code=200)
+    respuesta.json.return_value = WEATHER
+
+    # Sin flujo SSE: la vista en vivo consulta el servicio con httpx.get, como el script original
+    with mock.patch("httpx.get", return_value=respuesta), \
+            mock.patch("weatherStreamClient.SuscripcionClima.ultimo_evento", return_value=None):
+        antes, _ = medir(os.path.join("benchmarks", "frontstream_before.py"), args.ticks)
+        completo, fragmento = medir("FrontStream.py", args.ticks)
+
+    imprimir("antes (script completo)", antes)
+    imprimir("después (script completo)", completo)
+    imprimir("después (solo fragmento)", fragmento)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ticks", type=int, default=30)
+    sys.exit(main(parser.parse_args()))
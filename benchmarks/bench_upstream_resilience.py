@@ -0,0 +1,125 @@
+"""
+Benchmark: latencia vista por el cliente con un upstream degradado, con y sin la capa de resiliencia.
+
+Simula OpenWeather en proceso (sin red) con dos escenarios:
+
+- degraded: latencia lognormal con una fracción de respuestas muy lentas (colas largas) y de
+  errores 500.
+- outage: el upstream deja de responder (cada solicitud cuelga hasta el timeout).
+
+y compara:
+
+- baseline: un solo intento limitado solo por el timeout de lectura del cliente HTTP
+  (`OPENWEATHER_READ_TIMEOUT`, 10 s por defecto), como antes de la capa de resiliencia.
+- resilient: `upstreamResilience.ResilientUpstream` con los valores por defecto del servicio
+  (plazo, reintentos con jitter, cobertura tras el p95 y circuit breaker).
+
+Reporta p50/p95/p99/máximo de la latencia, fracción de errores y llamadas hechas al upstream.
+En el servicio, los errores de `resilient` se responden además con el último dato bueno de la
+caché cuando existe.
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/bench_upstream_resilience.py --requests 2000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import random
+import statistics
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from upstreamResilience import ResilientUpstream, UpstreamUnavailable  # noqa: E402
+
+
+class UpstreamSimulado:
+    def __init__(self, rng, median_ms, sigma, slow_rate, slow_ms, error_rate, outage=False):
+        self.rng = rng
+        self.median = median_ms / 1000
+        self.sigma = sigma
+        self.slow_rate = slow_rate
+        self.slow = slow_ms / 1000
+        self.error_rate = error_rate
+        self.outage = outage
+        self.calls = 0
+
+    async def send(self, url, endpoint):
+        self.calls += 1
+        if self.outage:
+            await asyncio.sleep(3600)
+        roll = self.rng.random()
+        if roll < self.slow_rate:
+            await asyncio.sleep(self.slow)
+        else:
+            await asyncio.sleep(self.rng.lognormvariate(math.log(self.median), self.sigma))
+        status = 500 if self.rng.random() < self.error_rate else 200
+        return httpx.Response(status, json={"cod": status})
+
+
+async def correr(llamar, requests, concurrency):
+    semaforo = asyncio.Semaphore(concurrency)
+    latencias, errores = [], 0
+
+    async def una():
+        nonlocal errores
+        async with semaforo:
+            inicio = time.perf_counter()
+            try:
+                response = await llamar()
+                if response.status_code != 200:
+                    errores += 1
+            except (UpstreamUnavailable, httpx.HTTPError, asyncio.TimeoutError):
+                errores += 1
+            latencias.append(time.perf_counter() - inicio)
+
+    await asyncio.gather(*(una() for _ in range(requests)))
+    return latencias, errores
+
+
+def reportar(escenario, variante, latencias, errores, llamadas):
+    q = statistics.quantiles(latencias, n=100)
+    print(f"{escenario:<10}{variante:<11}{q[49] * 1000:>8.0f}{q[94] * 1000:>8.0f}{q[98] * 1000:>8.0f}"
+          f"{max(latencias) * 1000:>9.0f}{errores / len(latencias):>8.1%}{llamadas:>8}")
+
+
+async def main(args):
+    print(f"{'scenario':<10}{'variant':<11}{'p50 ms':>8}{'p95 ms':>8}{'p99 ms':>8}{'max ms':>9}{'errors':>8}{'calls':>8}")
+    escenarios = [("degraded", args.requests, False), ("outage", args.outage_requests, True)]
+    for escenario, requests, outage in escenarios:
+        for variante in ("baseline", "resilient"):
+            simulado = UpstreamSimulado(random.Random(args.seed), args.median_ms, args.sigma, args.slow_rate,
+                                        args.slow_ms, args.error_rate, outage)
+            if variante == "baseline":
+                def llamar():
+                    return asyncio.wait_for(simulado.send("http://upstream", "weather"), args.read_timeout)
+            else:
+                upstream = ResilientUpstream(simulado.send, deadline=args.deadline, attempt_timeout=args.attempt_timeout,
+                                             rng=random.Random(args.seed).random)
+
+                def llamar():
+                    return upstream.get("http://upstream", "weather")
+            latencias, errores = await correr(llamar, requests, args.concurrency)
+            reportar(escenario, variante, latencias, errores, simulado.calls)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--outage-requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--median-ms", type=float, default=80)
+    parser.add_argument("--sigma", type=float, default=0.5)
+    parser.add_argument("--slow-rate", type=float, default=0.03, help="fracción de respuestas muy lentas")
+    parser.add_argument("--slow-ms", type=float, default=6000)
+    parser.add_argument("--error-rate", type=float, default=0.05, help="fracción de respuestas 500")
+    parser.add_argument("--read-timeout", type=float, default=10.0, help="timeout del baseline en segundos")
+    parser.add_argument("--deadline", type=float, default=4.0)
+    parser.add_argument("--attempt-timeout", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
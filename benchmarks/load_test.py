@@ -0,0 +1,111 @@
+"""
+Generador de carga asíncrono para el servicio FastAPI.
+
+Simula N clientes concurrentes que consultan `/weather/{city}` y `/forecast` sobre M ciudades
+durante un tiempo fijo, y reporta solicitudes por segundo, latencias p50/p95/p99, códigos de
+estado y llamadas al upstream por solicitud de cliente (leídas de `GET /__stats` del sustituto
+local `benchmarks/mock_upstream.py`).
+
+Uso típico (tres terminales):
+    python benchmarks/mock_upstream.py --port 9000 --latency lognormal:80:0.5
+    OPENWEATHER_BASE_URL=http://127.0.0.1:9000/data/2.5 uvicorn OpenWeather:app --port 8000
+    python benchmarks/load_test.py --clients 50 --cities 200 --duration 30
+
+Con `--json` imprime el resultado como JSON para compararlo contra una línea base.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.payloads import coordenadas  # noqa: E402
+
+
+def percentil(muestras, p):
+    """
+    Percentil `p` (0-100) por el método del rango más cercano.
+    """
+    if not muestras:
+        return float("nan")
+    ordenadas = sorted(muestras)
+    indice = min(len(ordenadas) - 1, max(0, int(round(p / 100 * len(ordenadas))) - 1))
+    return ordenadas[indice]
+
+
+async def _cliente(client, ciudades, args, fin, latencias, estados):
+    while time.perf_counter() < fin:
+        city = random.choice(ciudades)
+        if random.random() < args.forecast_ratio:
+            lat, lon = coordenadas(city)
+            request = client.get("/forecast", params={"lat": lat, "lon": lon})
+        else:
+            request = client.get(f"/weather/{city}")
+        inicio = time.perf_counter()
+        try:
+            response = await request
+            estados[response.status_code] += 1
+        except httpx.HTTPError as exc:
+            estados[type(exc).__name__] += 1
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        if args.think_ms:
+            await asyncio.sleep(args.think_ms / 1000)
+
+
+async def _llamadas_upstream(args):
+    async with httpx.AsyncClient(base_url=args.upstream) as client:
+        return (await client.get("/__stats")).json()["total"]
+
+
+async def main(args):
+    ciudades = [f"Bench City {chr(65 + i % 26)}{chr(65 + i // 26 % 26)}" for i in range(args.cities)]
+    latencias, estados = [], Counter()
+    upstream_antes = await _llamadas_upstream(args)
+
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(base_url=args.service, limits=limits, timeout=args.timeout) as client:
+        inicio = time.perf_counter()
+        fin = inicio + args.duration
+        await asyncio.gather(*(_cliente(client, ciudades, args, fin, latencias, estados) for _ in range(args.clients)))
+        duracion = time.perf_counter() - inicio
+
+    upstream = await _llamadas_upstream(args) - upstream_antes
+    resultado = {
+        "clients": args.clients,
+        "cities": args.cities,
+        "requests": len(latencias),
+        "requests_per_s": round(len(latencias) / duracion, 1),
+        "p50_ms": round(percentil(latencias, 50), 2),
+        "p95_ms": round(percentil(latencias, 95), 2),
+        "p99_ms": round(percentil(latencias, 99), 2),
+        "status": {str(k): v for k, v in sorted(estados.items(), key=str)},
+        "upstream_calls": upstream,
+        "upstream_calls_per_request": round(upstream / len(latencias), 4) if latencias else None,
+    }
+    if args.json:
+        print(json.dumps(resultado))
+    else:
+        for clave, valor in resultado.items():
+            print(f"{clave:<28}{valor}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--service", default="http://127.0.0.1:8000")
+    parser.add_argument("--upstream", default="http://127.0.0.1:9000")
+    parser.add_argument("--clients", type=int, default=50, help="clientes concurrentes (N)")
+    parser.add_argument("--cities", type=int, default=200, help="ciudades distintas (M)")
+    parser.add_argument("--duration", type=float, default=30.0, help="segundos de carga")
+    parser.add_argument("--forecast-ratio", type=float, default=0.2, help="fracción de solicitudes a /forecast")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="pausa de cada cliente entre solicitudes")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--json", action="store_true")
+    asyncio.run(main(parser.parse_args()))
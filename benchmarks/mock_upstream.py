@@ -0,0 +1,139 @@
+"""
+Sustituto local de OpenWeather para pruebas de carga y benchmarks repetibles.
+
+Sirve `/data/2.5/weather` y `/data/2.5/forecast` con respuestas sintéticas realistas
+(`benchmarks/payloads.py`), con latencia, tasa de errores 500 y de respuestas 429
+configurables. Cuenta las llamadas recibidas en `GET /__stats` (y `POST /__reset`).
+
+Las ciudades cuyo nombre empieza por "cityabc" o contiene dígitos devuelven 404, como el
+upstream real con nombres inexistentes.
+
+Uso:
+    python benchmarks/mock_upstream.py --port 9000 --latency lognormal:80:0.5 --error-rate 0.01 --rate-limit-rate 0.01
+
+y luego, para apuntar el servicio al sustituto:
+    OPENWEATHER_BASE_URL=http://127.0.0.1:9000/data/2.5 uvicorn OpenWeather:app
+
+Distribuciones de latencia (milisegundos): `const:50`, `uniform:20:200`, `lognormal:<mediana>:<sigma>`.
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import random
+import sys
+from collections import Counter
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.payloads import coordenadas, current_payload, forecast_payload  # noqa: E402
+
+
+def parse_latency(spec):
+    """
+    Convierte una especificación de latencia en una función sin argumentos que devuelve segundos.
+    """
+    kind, *params = spec.split(":")
+    params = [float(p) for p in params]
+    if kind == "const":
+        return lambda: params[0] / 1000
+    if kind == "uniform":
+        return lambda: random.uniform(params[0], params[1]) / 1000
+    if kind == "lognormal":
+        return lambda: random.lognormvariate(math.log(params[0]), params[1]) / 1000
+    raise ValueError(f"Distribución de latencia desconocida: {spec}")
+
+
+class MockConfig:
+    def __init__(self):
+        self.latency = os.getenv("MOCK_LATENCY", "lognormal:80:0.5")
+        self.error_rate = float(os.getenv("MOCK_ERROR_RATE", "0"))
+        self.rate_limit_rate = float(os.getenv("MOCK_RATE_LIMIT_RATE", "0"))
+        self.sample_latency = parse_latency(self.latency)
+
+
+config = MockConfig()
+calls = Counter()
+app = FastAPI()
+
+
+async def _simular(endpoint):
+    calls[endpoint] += 1
+    await asyncio.sleep(config.sample_latency())
+    roll = random.random()
+    if roll < config.rate_limit_rate:
+        calls["429"] += 1
+        return JSONResponse({"cod": 429, "message": "Too many requests"}, status_code=429,
+                            headers={"Retry-After": "1"})
+    if roll < config.rate_limit_rate + config.error_rate:
+        calls["500"] += 1
+        return JSONResponse({"cod": 500, "message": "Internal error"}, status_code=500)
+    return None
+
+
+def _no_existe(city):
+    city = city.casefold()
+    return city.startswith("cityabc") or any(c.isdigit() for c in city)
+
+
+@app.get("/data/2.5/weather")
+async def weather(q: str = None, lat: float = None, lon: float = None, id: int = None):
+    error = await _simular("weather")
+    if error is not None:
+        return error
+    if q is None:
+        # Consultas por id (índice de ciudades) o por coordenadas: siempre existen
+        return current_payload(f"id{id}" if id is not None else f"{lat},{lon}")
+    city = q.split(",")[0]
+    if _no_existe(city):
+        calls["404"] += 1
+        raise HTTPException(status_code=404, detail="city not found")
+    return current_payload(city)
+
+
+@app.get("/data/2.5/forecast")
+async def forecast(q: str = None, lat: float = None, lon: float = None):
+    error = await _simular("forecast")
+    if error is not None:
+        return error
+    name = "Synthetic"
+    if q is not None:
+        name = q.split(",")[0]
+        if _no_existe(name):
+            calls["404"] += 1
+            raise HTTPException(status_code=404, detail="city not found")
+        lat, lon = coordenadas(name)
+    return forecast_payload(lat, lon, name=name)
+
+
+@app.get("/__stats")
+async def stats():
+    return {"calls": dict(calls), "total": calls["weather"] + calls["forecast"]}
+
+
+@app.post("/__reset")
+async def reset():
+    calls.clear()
+    return {"ok": True}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", default=config.latency)
+    parser.add_argument("--error-rate", type=float, default=config.error_rate)
+    parser.add_argument("--rate-limit-rate", type=float, default=config.rate_limit_rate)
+    args = parser.parse_args()
+
+    config.latency = args.latency
+    config.sample_latency = parse_latency(args.latency)
+    config.error_rate = args.error_rate
+    config.rate_limit_rate = args.rate_limit_rate
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
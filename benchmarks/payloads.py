@@ -0,0 +1,124 @@
+"""
+Respuestas sintéticas con la misma forma y tamaño que las de OpenWeather.
+
+Se usan en los benchmarks y en el sustituto local del upstream. Los valores son
+deterministas para cada ciudad o coordenada, de modo que las corridas son comparables.
+"""
+
+import hashlib
+import random
+from datetime import datetime, timezone
+
+CONDICIONES = [
+    (800, "Clear", "clear sky", "01"),
+    (801, "Clouds", "few clouds", "02"),
+    (802, "Clouds", "scattered clouds", "03"),
+    (803, "Clouds", "broken clouds", "04"),
+    (804, "Clouds", "overcast clouds", "04"),
+    (500, "Rain", "light rain", "10"),
+    (501, "Rain", "moderate rain", "10"),
+    (600, "Snow", "light snow", "13"),
+    (211, "Thunderstorm", "thunderstorm", "11"),
+    (741, "Fog", "fog", "50"),
+]
+
+
+def _rng(*semilla):
+    digest = hashlib.sha256(repr(semilla).encode()).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+
+def coordenadas(city):
+    """
+    Coordenadas deterministas (pero arbitrarias) para una ciudad sintética.
+    """
+    rng = _rng("coord", city.casefold())
+    return round(rng.uniform(-60, 70), 4), round(rng.uniform(-180, 180), 4)
+
+
+def current_payload(city, now=None):
+    """
+    Respuesta de `/data/2.5/weather` para `city`.
+    """
+    now = int(now if now is not None else datetime.now(timezone.utc).timestamp())
+    rng = _rng("current", city.casefold(), now // 600)
+    lat, lon = coordenadas(city)
+    cond_id, main, description, icon = rng.choice(CONDICIONES)
+    temp = round(rng.uniform(-10, 35), 2)
+    tz = int(round(lon / 15)) * 3600
+    return {
+        "coord": {"lon": lon, "lat": lat},
+        "weather": [{"id": cond_id, "main": main, "description": description, "icon": icon + rng.choice("dn")}],
+        "base": "stations",
+        "main": {
+            "temp": temp,
+            "feels_like": round(temp - rng.uniform(0, 3), 2),
+            "temp_min": round(temp - rng.uniform(0, 3), 2),
+            "temp_max": round(temp + rng.uniform(0, 3), 2),
+            "pressure": rng.randint(990, 1035),
+            "humidity": rng.randint(20, 100),
+            "sea_level": rng.randint(990, 1035),
+            "grnd_level": rng.randint(950, 1030),
+        },
+        "visibility": 10000,
+        "wind": {"speed": round(rng.uniform(0, 15), 2), "deg": rng.randint(0, 359), "gust": round(rng.uniform(0, 20), 2)},
+        "clouds": {"all": rng.randint(0, 100)},
+        "dt": now,
+        "sys": {"type": 2, "id": rng.randint(2000000, 2099999), "country": "XX",
+                "sunrise": now - 6 * 3600, "sunset": now + 6 * 3600},
+        "timezone": tz,
+        "id": rng.randint(100000, 9999999),
+        "name": city,
+        "cod": 200,
+    }
+
+
+def forecast_payload(lat, lon, now=None, name="Synthetic"):
+    """
+    Respuesta de `/data/2.5/forecast` (40 entradas cada 3 horas) para unas coordenadas.
+    """
+    now = int(now if now is not None else datetime.now(timezone.utc).timestamp())
+    inicio = now - now % 10800 + 10800
+    rng = _rng("forecast", round(lat, 2), round(lon, 2), inicio)
+    entradas = []
+    for i in range(40):
+        dt = inicio + i * 10800
+        cond_id, main, description, icon = rng.choice(CONDICIONES)
+        temp = round(rng.uniform(-10, 35), 2)
+        entradas.append({
+            "dt": dt,
+            "main": {
+                "temp": temp,
+                "feels_like": round(temp - rng.uniform(0, 3), 2),
+                "temp_min": round(temp - rng.uniform(0, 2), 2),
+                "temp_max": round(temp + rng.uniform(0, 2), 2),
+                "pressure": rng.randint(990, 1035),
+                "sea_level": rng.randint(990, 1035),
+                "grnd_level": rng.randint(950, 1030),
+                "humidity": rng.randint(20, 100),
+                "temp_kf": round(rng.uniform(-2, 2), 2),
+            },
+            "weather": [{"id": cond_id, "main": main, "description": description, "icon": icon + rng.choice("dn")}],
+            "clouds": {"all": rng.randint(0, 100)},
+            "wind": {"speed": round(rng.uniform(0, 15), 2), "deg": rng.randint(0, 359), "gust": round(rng.uniform(0, 20), 2)},
+            "visibility": 10000,
+            "pop": round(rng.random(), 2),
+            "sys": {"pod": rng.choice("dn")},
+            "dt_txt": datetime.fromtimestamp(dt, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+        })
+    return {
+        "cod": "200",
+        "message": 0,
+        "cnt": 40,
+        "list": entradas,
+        "city": {
+            "id": rng.randint(100000, 9999999),
+            "name": name,
+            "coord": {"lat": lat, "lon": lon},
+            "country": "XX",
+            "population": rng.randint(1000, 10000000),
+            "timezone": int(round(lon / 15)) * 3600,
+            "sunrise": now - 6 * 3600,
+            "sunset": now + 6 * 3600,
+        },
+    }
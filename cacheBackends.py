@@ -0,0 +1,407 @@
+"""
+Backends de caché compartidos entre procesos para el servicio del clima.
+
+Con varios workers de uvicorn/gunicorn cada proceso tiene su propia `TTLCache`; sin un nivel
+compartido, cada worker descarga por su cuenta las mismas ciudades y las llamadas a OpenWeather
+se multiplican por el número de workers. Un backend compartido hace de segundo nivel: una
+respuesta descargada por un worker queda disponible para los demás, y un candado con tiempo de
+expiración por clave hace que, ante un fallo simultáneo en varios workers, solo uno consulte el
+upstream mientras el resto espera su resultado.
+
+Backends disponibles (`crear_backend`):
+
+- memory: diccionario del proceso. No se comparte; sirve como referencia y para pruebas.
+- sqlite: archivo SQLite en modo WAL, para varios workers en un mismo servidor.
+- redis: cualquier servidor que hable el protocolo de Redis (RESP), con un cliente mínimo
+  sin dependencias.
+
+Todas las operaciones son corrutinas y usan el reloj de pared (`time.time`), que es común a
+todos los procesos.
+"""
+
+import asyncio
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from urllib.parse import urlparse
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: se usa json de la biblioteca estándar
+    orjson = None
+
+# Entrada guardada en un backend: valor, tamaño serializado y momentos de guardado y vencimiento
+Entry = namedtuple("Entry", "value size stored_at expires_at")
+
+
+class CacheBackendError(Exception):
+    """
+    El backend compartido no está disponible; la caché sigue funcionando sin él.
+    """
+
+
+def _serializar(value):
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def _deserializar(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+class MemoryBackend:
+    """
+    Backend en memoria del proceso, con la misma interfaz que los compartidos.
+
+    Métodos de la interfaz (todos corrutinas salvo `stats`):
+    - get(key) -> Entry o None: la entrada aunque esté vencida, mientras no se haya purgado.
+    - set(key, value, ttl, stale_ttl): guarda `value` fresco durante `ttl` segundos y lo
+        conserva `stale_ttl` segundos más.
+    - acquire(key, lease) -> token o None: candado de descarga que expira a los `lease` segundos.
+    - release(key, token): libera el candado si sigue siendo de `token`.
+    - close().
+    """
+
+    shared = False
+    name = "memory"
+
+    def __init__(self):
+        self._entries = {}
+        self._locks = {}
+        self.gets = 0
+        self.sets = 0
+
+    async def get(self, key):
+        self.gets += 1
+        registro = self._entries.get(key)
+        if registro is None:
+            return None
+        entry, purge_at = registro
+        if purge_at <= time.time():
+            del self._entries[key]
+            return None
+        return entry
+
+    async def set(self, key, value, ttl, stale_ttl=0.0):
+        self.sets += 1
+        now = time.time()
+        self._entries[key] = (Entry(value, 0, now, now + ttl), now + ttl + stale_ttl)
+
+    async def acquire(self, key, lease):
+        now = time.time()
+        actual = self._locks.get(key)
+        if actual is not None and actual[1] > now:
+            return None
+        token = secrets.token_hex(8)
+        self._locks[key] = (token, now + lease)
+        return token
+
+    async def release(self, key, token):
+        if self._locks.get(key, (None,))[0] == token:
+            del self._locks[key]
+
+    async def close(self):
+        self._entries.clear()
+
+    def stats(self):
+        return {"backend": self.name, "shared": self.shared, "entries": len(self._entries),
+                "gets": self.gets, "sets": self.sets}
+
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    purge_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS locks (
+    key TEXT PRIMARY KEY,
+    token TEXT NOT NULL,
+    until REAL NOT NULL
+);
+"""
+
+
+class SQLiteBackend:
+    """
+    Backend en un archivo SQLite en modo WAL, compartido por los procesos de un mismo servidor.
+
+    WAL permite que los workers lean mientras otro escribe; las escrituras son pequeñas
+    (una fila por respuesta) y se hacen fuera del bucle de eventos con `asyncio.to_thread`.
+
+    Parámetros:
+    - path (str): Ruta del archivo SQLite.
+    - purge_every (int): Escrituras entre purgas de las entradas ya fuera de `stale_ttl`.
+    - busy_timeout (float): Segundos que una escritura espera si otro proceso tiene el archivo
+        bloqueado.
+    """
+
+    shared = True
+    name = "sqlite"
+
+    def __init__(self, path, purge_every=256, busy_timeout=2.0):
+        self.path = path
+        self.purge_every = purge_every
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_ESQUEMA)
+        self.gets = 0
+        self.sets = 0
+        self.errors = 0
+
+    def _ejecutar(self, funcion, *args):
+        with self._lock:
+            try:
+                return funcion(*args)
+            except sqlite3.Error as exc:
+                self.errors += 1
+                raise CacheBackendError(str(exc)) from exc
+
+    def _get(self, key):
+        fila = self._conn.execute(
+            "SELECT value, stored_at, expires_at FROM cache WHERE key = ? AND purge_at > ?", (key, time.time())
+        ).fetchone()
+        if fila is None:
+            return None
+        return Entry(_deserializar(fila[0]), len(fila[0]), fila[1], fila[2])
+
+    def _set(self, key, data, ttl, stale_ttl):
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)", (key, data, now, now + ttl, now + ttl + stale_ttl)
+        )
+        if self.sets % self.purge_every == 0:
+            self._conn.execute("DELETE FROM cache WHERE purge_at <= ?", (now,))
+
+    def _acquire(self, key, token, lease):
+        now = time.time()
+        # Toma el candado si no existe o si expiró (el proceso que lo tenía pudo morir)
+        cursor = self._conn.execute(
+            "INSERT INTO locks VALUES (?, ?, ?) ON CONFLICT(key) DO UPDATE SET token = excluded.token, "
+            "until = excluded.until WHERE locks.until <= ?",
+            (key, token, now + lease, now),
+        )
+        return token if cursor.rowcount == 1 else None
+
+    def _release(self, key, token):
+        self._conn.execute("DELETE FROM locks WHERE key = ? AND token = ?", (key, token))
+
+    async def get(self, key):
+        self.gets += 1
+        return await asyncio.to_thread(self._ejecutar, self._get, key)
+
+    async def set(self, key, value, ttl, stale_ttl=0.0):
+        self.sets += 1
+        await asyncio.to_thread(self._ejecutar, self._set, key, _serializar(value), ttl, stale_ttl)
+
+    async def acquire(self, key, lease):
+        return await asyncio.to_thread(self._ejecutar, self._acquire, key, secrets.token_hex(8), lease)
+
+    async def release(self, key, token):
+        await asyncio.to_thread(self._ejecutar, self._release, key, token)
+
+    async def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def stats(self):
+        return {"backend": self.name, "shared": self.shared, "path": self.path,
+                "gets": self.gets, "sets": self.sets, "errors": self.errors}
+
+
+class RespError(Exception):
+    """
+    Respuesta de error (`-ERR ...`) del servidor Redis.
+    """
+
+
+def _comando(*partes):
+    salida = [b"*%d\r\n" % len(partes)]
+    for parte in partes:
+        if not isinstance(parte, bytes):
+            parte = str(parte).encode("utf-8")
+        salida.append(b"$%d\r\n%s\r\n" % (len(parte), parte))
+    return b"".join(salida)
+
+
+async def _leer_respuesta(reader):
+    linea = await reader.readline()
+    if not linea:
+        raise ConnectionError("Conexión cerrada por el servidor")
+    tipo, resto = linea[:1], linea[1:-2]
+    if tipo == b"+":
+        return resto.decode()
+    if tipo == b"-":
+        raise RespError(resto.decode())
+    if tipo == b":":
+        return int(resto)
+    if tipo == b"$":
+        largo = int(resto)
+        if largo < 0:
+            return None
+        datos = await reader.readexactly(largo + 2)
+        return datos[:-2]
+    if tipo == b"*":
+        largo = int(resto)
+        return None if largo < 0 else [await _leer_respuesta(reader) for _ in range(largo)]
+    raise ConnectionError(f"Respuesta RESP inválida: {linea!r}")
+
+
+class RespClient:
+    """
+    Cliente mínimo del protocolo de Redis (RESP2) sobre asyncio, con un pool de conexiones.
+
+    Parámetros:
+    - url (str): "redis://[:password@]host:port/db".
+    - max_connections (int): Conexiones abiertas como máximo.
+    - timeout (float): Segundos máximos por comando (incluida la conexión).
+    """
+
+    def __init__(self, url="redis://localhost:6379/0", max_connections=10, timeout=1.0):
+        partes = urlparse(url)
+        self.host = partes.hostname or "localhost"
+        self.port = partes.port or 6379
+        self.password = partes.password
+        self.db = int(partes.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._libres = []
+        self._cupos = asyncio.Semaphore(max_connections)
+
+    async def _conectar(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        inicial = []
+        if self.password:
+            inicial.append(("AUTH", self.password))
+        if self.db:
+            inicial.append(("SELECT", self.db))
+        for partes in inicial:
+            writer.write(_comando(*partes))
+            await writer.drain()
+            await _leer_respuesta(reader)
+        return reader, writer
+
+    async def execute(self, *partes):
+        """
+        Envía un comando y devuelve su respuesta (str, int, bytes, list o None).
+        """
+        async with self._cupos:
+            conexion = self._libres.pop() if self._libres else None
+            try:
+                if conexion is None:
+                    conexion = await asyncio.wait_for(self._conectar(), self.timeout)
+                reader, writer = conexion
+                writer.write(_comando(*partes))
+                respuesta = await asyncio.wait_for(_leer_respuesta(reader), self.timeout)
+            except RespError:
+                self._libres.append(conexion)
+                raise
+            except BaseException:
+                # Conexión en estado desconocido (timeout, cancelación, error de red): se descarta
+                if conexion is not None:
+                    conexion[1].close()
+                raise
+            self._libres.append(conexion)
+            return respuesta
+
+    async def close(self):
+        for _, writer in self._libres:
+            writer.close()
+        self._libres.clear()
+
+
+# Libera el candado solo si sigue siendo del mismo dueño (comparar y borrar de forma atómica)
+_LIBERAR = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+
+
+class RedisBackend:
+    """
+    Backend en un servidor Redis (o compatible: Valkey, KeyDB, Dragonfly).
+
+    Cada entrada es una clave con un sobre JSON {valor, guardado, vence} que Redis elimina al
+    pasar `stale_ttl`; el candado de descarga es `SET NX PX`.
+
+    Parámetros:
+    - url (str): URL del servidor, p. ej. "redis://localhost:6379/0".
+    - prefix (str): Prefijo de todas las claves.
+    - max_connections (int): Conexiones del pool.
+    - timeout (float): Segundos máximos por comando.
+    """
+
+    shared = True
+    name = "redis"
+
+    def __init__(self, url="redis://localhost:6379/0", prefix="clima:", max_connections=10, timeout=1.0):
+        self.url = url
+        self.prefix = prefix
+        self.client = RespClient(url, max_connections, timeout)
+        self.gets = 0
+        self.sets = 0
+        self.errors = 0
+
+    async def _ejecutar(self, *partes):
+        try:
+            return await self.client.execute(*partes)
+        except (OSError, ConnectionError, RespError, asyncio.TimeoutError) as exc:
+            self.errors += 1
+            raise CacheBackendError(str(exc) or type(exc).__name__) from exc
+
+    async def get(self, key):
+        self.gets += 1
+        data = await self._ejecutar("GET", self.prefix + key)
+        if data is None:
+            return None
+        sobre = _deserializar(data)
+        return Entry(sobre["v"], len(data), sobre["t"], sobre["e"])
+
+    async def set(self, key, value, ttl, stale_ttl=0.0):
+        self.sets += 1
+        now = time.time()
+        data = _serializar({"v": value, "t": now, "e": now + ttl})
+        await self._ejecutar("SET", self.prefix + key, data, "PX", max(1, int((ttl + stale_ttl) * 1000)))
+
+    async def acquire(self, key, lease):
+        token = secrets.token_hex(8)
+        ok = await self._ejecutar("SET", self.prefix + "lock:" + key, token, "NX", "PX", max(1, int(lease * 1000)))
+        return token if ok == "OK" else None
+
+    async def release(self, key, token):
+        await self._ejecutar("EVAL", _LIBERAR, 1, self.prefix + "lock:" + key, token)
+
+    async def close(self):
+        await self.client.close()
+
+    def stats(self):
+        return {"backend": self.name, "shared": self.shared, "url": self.url,
+                "gets": self.gets, "sets": self.sets, "errors": self.errors}
+
+
+def crear_backend(nombre, sqlite_path="cache.db", redis_url="redis://localhost:6379/0"):
+    """
+    Crea el backend de caché configurado.
+
+    Parámetros:
+    - nombre (str): "memory", "sqlite" o "redis".
+    - sqlite_path (str): Archivo del backend SQLite.
+    - redis_url (str): URL del backend Redis.
+
+    Devuelve:
+    - MemoryBackend, SQLiteBackend o RedisBackend.
+    """
+    if nombre == "memory":
+        return MemoryBackend()
+    if nombre == "sqlite":
+        directorio = os.path.dirname(os.path.abspath(sqlite_path))
+        os.makedirs(directorio, exist_ok=True)
+        return SQLiteBackend(sqlite_path)
+    if nombre == "redis":
+        return RedisBackend(redis_url)
+    raise ValueError(f"Backend de caché desconocido: {nombre}")
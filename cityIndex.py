@@ -0,0 +1,200 @@
+"""
+Índice local de ciudades para validar nombres y autocompletar sin consultar OpenWeather.
+
+El índice se carga desde una lista de ciudades empaquetada (`data/cities.csv`) o desde la
+lista completa de OpenWeather (`city.list.json` o `city.list.json.gz`, descargable de
+http://bulk.openweathermap.org/sample/). Se guarda en arreglos paralelos (`array`) más una
+lista ordenada de nombres normalizados, de modo que la búsqueda exacta y por prefijo son
+búsquedas binarias con `bisect`.
+"""
+
+import bisect
+import csv
+import gzip
+import json
+import sys
+import unicodedata
+from array import array
+from collections import namedtuple
+
+# Número máximo de nombres que se revisan por prefijo antes de ordenar las sugerencias
+SUGGEST_MAX_SCAN = 5000
+
+# Arreglos paralelos por ciudad (ids ... countries) y nombres normalizados ordenados (keys)
+# con la fila de su ciudad (key_rows)
+_Tabla = namedtuple("_Tabla", "ids lats lons population names countries keys key_rows")
+
+
+def normalizar_nombre(texto):
+    """
+    Normaliza un nombre de ciudad para compararlo: sin acentos, en minúsculas, con la
+    puntuación convertida en espacios y los espacios repetidos colapsados.
+
+    Parámetros:
+    - texto (str): Nombre tal como lo escribe el usuario, p. ej. "  Ciudad de México".
+
+    Devuelve:
+    - str: Nombre normalizado, p. ej. "ciudad de mexico".
+    """
+    texto = unicodedata.normalize("NFKD", texto)
+    texto = "".join(c for c in texto if not unicodedata.combining(c)).casefold()
+    return " ".join("".join(c if c.isalnum() else " " for c in texto).split())
+
+
+def separar_pais(consulta):
+    """
+    Separa una consulta del tipo "London,GB" en nombre y código de país.
+
+    Devuelve:
+    - tuple: (nombre, código de país en mayúsculas o None).
+    """
+    nombre, coma, pais = consulta.rpartition(",")
+    pais = pais.strip()
+    if coma and len(pais) == 2 and pais.isalpha():
+        return nombre, pais.upper()
+    return consulta, None
+
+
+def _filas_csv(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            aliases = [a for a in (row.get("aliases") or "").split("|") if a.strip()]
+            yield (int(row["id"] or 0), row["name"], row["country"], float(row["lat"]), float(row["lon"]),
+                   int(row.get("population") or 0), aliases)
+
+
+def _filas_openweather(path):
+    abrir = gzip.open if path.endswith(".gz") else open
+    with abrir(path, "rt", encoding="utf-8") as f:
+        ciudades = json.load(f)
+    for city in ciudades:
+        coord = city.get("coord") or {}
+        yield (int(city["id"]), city["name"], city.get("country", ""), float(coord.get("lat", 0)),
+               float(coord.get("lon", 0)), 0, [])
+
+
+class CityIndex:
+    """
+    Índice de ciudades en memoria con búsqueda exacta y por prefijo.
+
+    Cada ciudad ocupa una fila en arreglos paralelos (id, latitud, longitud, población) y
+    cada nombre o alias normalizado es una entrada de una lista ordenada que apunta a su fila.
+    """
+
+    def __init__(self):
+        self._tabla = _Tabla(array("q"), array("d"), array("d"), array("q"), [], [], [], array("l"))
+        self.path = None
+        # True cuando el índice proviene de la lista completa de OpenWeather: los ids son los
+        # del upstream y una ciudad que no está en el índice tampoco existe allí
+        self.complete = False
+
+    def load(self, path):
+        """
+        Carga (o recarga) el índice desde un archivo CSV o desde la lista de OpenWeather.
+
+        El índice nuevo se construye aparte y se publica al final, de modo que las búsquedas
+        concurrentes ven el índice anterior o el nuevo, nunca uno a medio construir.
+
+        Parámetros:
+        - path (str): Ruta a `*.csv` (id,name,country,lat,lon,population,aliases) o a
+            `city.list.json[.gz]`.
+
+        Devuelve:
+        - int: Número de ciudades cargadas.
+        """
+        completa = not path.endswith(".csv")
+        filas = _filas_openweather(path) if completa else _filas_csv(path)
+
+        ids, lats, lons, population = array("q"), array("d"), array("d"), array("q")
+        names, countries, entradas = [], [], []
+        for fila, (city_id, name, country, lat, lon, habitantes, aliases) in enumerate(filas):
+            ids.append(city_id)
+            lats.append(lat)
+            lons.append(lon)
+            population.append(habitantes)
+            names.append(name)
+            countries.append(sys.intern(country))
+            for alias in {normalizar_nombre(n) for n in [name, *aliases]}:
+                if alias:
+                    entradas.append((alias, fila))
+        entradas.sort()
+        keys = [sys.intern(k) for k, _ in entradas]
+        key_rows = array("l", (fila for _, fila in entradas))
+
+        self._tabla = _Tabla(ids, lats, lons, population, names, countries, keys, key_rows)
+        self.path = path
+        self.complete = completa
+        return len(names)
+
+    def __len__(self):
+        return len(self._tabla.names)
+
+    @staticmethod
+    def _registro(tabla, fila):
+        return {
+            "id": tabla.ids[fila],
+            "name": tabla.names[fila],
+            "country": tabla.countries[fila],
+            "lat": tabla.lats[fila],
+            "lon": tabla.lons[fila],
+        }
+
+    def resolve(self, consulta):
+        """
+        Busca una ciudad por nombre exacto o alias, opcionalmente con código de país ("Paris,FR").
+
+        Si varias ciudades comparten el nombre se elige la más poblada. Si no hay forma de elegir
+        (empatan en población, como en la lista de OpenWeather, que trae población 0 en todas),
+        el registro se marca como ambiguo: la ciudad existe, pero el índice no sabe cuál es.
+
+        Parámetros:
+        - consulta (str): Nombre de la ciudad.
+
+        Devuelve:
+        - dict: {"id", "name", "country", "lat", "lon", "ambiguous"}, o None si no está en el índice.
+        """
+        nombre, pais = separar_pais(consulta)
+        clave = normalizar_nombre(nombre)
+        tabla = self._tabla
+        mejor, empate = None, False
+        i = bisect.bisect_left(tabla.keys, clave)
+        while i < len(tabla.keys) and tabla.keys[i] == clave:
+            fila = tabla.key_rows[i]
+            if pais is None or tabla.countries[fila] == pais:
+                if mejor is None or tabla.population[fila] > tabla.population[mejor]:
+                    mejor, empate = fila, False
+                elif tabla.population[fila] == tabla.population[mejor]:
+                    empate = True
+            i += 1
+        if mejor is None:
+            return None
+        return {**self._registro(tabla, mejor), "ambiguous": empate}
+
+    def suggest(self, prefijo, limit=10):
+        """
+        Sugiere ciudades cuyo nombre o alias empieza por `prefijo`.
+
+        Las coincidencias exactas van primero, luego las ciudades más pobladas y los nombres
+        más cortos.
+
+        Parámetros:
+        - prefijo (str): Texto escrito hasta ahora, p. ej. "guada".
+        - limit (int): Máximo de sugerencias.
+
+        Devuelve:
+        - list: Registros {"id", "name", "country", "lat", "lon"}.
+        """
+        prefijo = normalizar_nombre(prefijo)
+        if not prefijo or limit <= 0:
+            return []
+        tabla = self._tabla
+        candidatas = {}
+        i = bisect.bisect_left(tabla.keys, prefijo)
+        fin = min(len(tabla.keys), i + SUGGEST_MAX_SCAN)
+        while i < fin and tabla.keys[i].startswith(prefijo):
+            fila = tabla.key_rows[i]
+            candidatas[fila] = candidatas.get(fila, False) or tabla.keys[i] == prefijo
+            i += 1
+        orden = sorted(candidatas, key=lambda f: (not candidatas[f], -tabla.population[f],
+                                                  len(tabla.names[f]), tabla.names[f]))
+        return [self._registro(tabla, fila) for fila in orden[:limit]]
@@ -0,0 +1,712 @@
+"""
+Generador de reportes climáticos por lote desde la línea de comandos.
+
+Consulta miles de ciudades con la misma lógica que `/weather` y `/forecast` (índice de ciudades,
+cachés, cuota y capa de resiliencia de `OpenWeather.py`, en el mismo proceso y con prioridad de
+lote), con un número acotado de consultas simultáneas. Cada resultado se escribe en CSV o Parquet
+a medida que llega, en lugar de acumular todo en memoria, y opcionalmente se genera una página
+HTML y/o PNG por ciudad con los mismos gráficos que `mostrar_info_climatica`, en un pool de
+procesos.
+
+El avance se guarda en `checkpoint.jsonl` dentro del directorio de salida: al volver a ejecutar
+el mismo comando tras una interrupción se omiten las ciudades ya escritas y sus reportes, y se
+descartan las filas que no llegaron a confirmarse.
+
+Uso:
+    python climateReports.py ciudades.txt --out reportes --format parquet --html --png
+"""
+
+import argparse
+import asyncio
+import csv
+import html
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException
+
+from forecastSummary import resumen_diario
+from weatherCache import normalizar_ciudad
+from weatherResponses import compactar_actual, compactar_pronostico
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow es opcional: sin él solo se puede escribir CSV
+    pa = pq = None
+
+# Columnas de la tabla de resultados y su tipo en Parquet
+COLUMNAS = (
+    ("city", "string"),
+    ("name", "string"),
+    ("country", "string"),
+    ("lat", "float64"),
+    ("lon", "float64"),
+    ("dt", "int64"),
+    ("timezone", "int64"),
+    ("temp", "float64"),
+    ("feels_like", "float64"),
+    ("temp_min", "float64"),
+    ("temp_max", "float64"),
+    ("pressure", "float64"),
+    ("humidity", "float64"),
+    ("wind_speed", "float64"),
+    ("wind_deg", "float64"),
+    ("condition_id", "int64"),
+    ("condition", "string"),
+    ("description", "string"),
+    ("icon", "string"),
+    ("forecast_temp_min", "float64"),
+    ("forecast_temp_max", "float64"),
+    ("stale_age", "int64"),
+)
+NOMBRES_COLUMNAS = [nombre for nombre, _ in COLUMNAS]
+
+# Errores que pueden resolverse reintentando más tarde (cuota agotada u OpenWeather caído)
+ESTADOS_TRANSITORIOS = {429, 500, 503, 504}
+
+ICON_URL = "https://openweathermap.org/img/wn/{}@2x.png"
+
+
+def fila(city, actual, pronostico):
+    """
+    Aplana el clima actual y el pronóstico de una ciudad en una fila de la tabla de resultados.
+
+    Parámetros:
+    - city (str): Nombre de la ciudad tal como se pidió.
+    - actual (dict): Respuesta del clima actual (completa o compacta).
+    - pronostico (dict): Respuesta del pronóstico de 5 días.
+
+    Devuelve:
+    - dict: Valores de `COLUMNAS`.
+    """
+    condicion = actual["weather"][0]
+    main, wind = actual["main"], actual.get("wind", {})
+    temperaturas = [entrada["main"]["temp"] for entrada in pronostico.get("list", [])]
+    return {
+        "city": city,
+        "name": actual["name"],
+        "country": actual["sys"].get("country"),
+        "lat": actual["coord"]["lat"],
+        "lon": actual["coord"]["lon"],
+        "dt": actual.get("dt"),
+        "timezone": actual.get("timezone"),
+        "temp": main["temp"],
+        "feels_like": main.get("feels_like"),
+        "temp_min": main.get("temp_min"),
+        "temp_max": main.get("temp_max"),
+        "pressure": main.get("pressure"),
+        "humidity": main.get("humidity"),
+        "wind_speed": wind.get("speed"),
+        "wind_deg": wind.get("deg"),
+        "condition_id": condicion["id"],
+        "condition": condicion["main"],
+        "description": condicion["description"],
+        "icon": condicion["icon"],
+        "forecast_temp_min": min(temperaturas) if temperaturas else None,
+        "forecast_temp_max": max(temperaturas) if temperaturas else None,
+        "stale_age": actual["stale"]["age"] if "stale" in actual else None,
+    }
+
+
+class Checkpoint:
+    """
+    Registro de avance de una ejecución, en un archivo JSON Lines de solo agregado.
+
+    Cada línea es una de:
+    - {"rows": [claves], "sink": estado}: filas confirmadas por el destino (con su estado,
+        p. ej. el tamaño del CSV o el nombre de la parte Parquet).
+    - {"report": clave}: reporte HTML/PNG generado.
+    - {"failed": clave, "status": int, "detail": str}: ciudad con un error definitivo (p. ej. 404);
+        `status` es None si no fue un error HTTP (p. ej. una respuesta incompleta).
+
+    Una última línea incompleta (interrupción a mitad de escritura) se descarta al cargar.
+
+    Parámetros:
+    - path (str): Ruta del archivo.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = set()
+        self.reports = set()
+        self.failed = {}
+        self.sink_states = []
+        valido = 0
+        if os.path.exists(path):
+            with open(path, "rb") as archivo:
+                for linea in archivo:
+                    try:
+                        registro = json.loads(linea)
+                    except ValueError:
+                        break
+                    valido += len(linea)
+                    self._aplicar(registro)
+        self._archivo = open(path, "a+b")
+        self._archivo.truncate(valido)
+
+    def _aplicar(self, registro):
+        if "rows" in registro:
+            self.rows.update(registro["rows"])
+            self.sink_states.append(registro["sink"])
+        elif "report" in registro:
+            self.reports.add(registro["report"])
+        elif "failed" in registro:
+            self.failed[registro["failed"]] = registro
+
+    def _escribir(self, registro):
+        self._archivo.write(json.dumps(registro, ensure_ascii=False).encode("utf-8") + b"\n")
+        self._archivo.flush()
+        self._aplicar(registro)
+
+    def mark_rows(self, keys, sink_state):
+        self._escribir({"rows": list(keys), "sink": sink_state})
+
+    def mark_report(self, key):
+        self._escribir({"report": key})
+
+    def mark_failed(self, key, status, detail):
+        self._escribir({"failed": key, "status": status, "detail": detail})
+
+    def close(self):
+        self._archivo.close()
+
+
+class CsvSink:
+    """
+    Escribe las filas en `results.csv` a medida que llegan.
+
+    Al reanudar, el archivo se recorta al tamaño de la última confirmación registrada en el
+    checkpoint, de modo que no quedan filas repetidas de ciudades que se vuelven a consultar.
+
+    Parámetros:
+    - directorio (str): Directorio de salida.
+    - estados (list): Estados de confirmaciones anteriores (`Checkpoint.sink_states`).
+    """
+
+    def __init__(self, directorio, estados=()):
+        self.path = os.path.join(directorio, "results.csv")
+        tamanos = [estado["offset"] for estado in estados if "offset" in estado]
+        self._archivo = open(self.path, "r+" if os.path.exists(self.path) else "w", newline="", encoding="utf-8")
+        self._archivo.truncate(tamanos[-1] if tamanos else 0)
+        self._archivo.seek(0, os.SEEK_END)
+        self._writer = csv.DictWriter(self._archivo, fieldnames=NOMBRES_COLUMNAS)
+        if not tamanos:
+            self._writer.writeheader()
+
+    def write(self, row):
+        self._writer.writerow(row)
+
+    def commit(self):
+        """
+        Vuelca las filas escritas y devuelve el estado a guardar en el checkpoint.
+        """
+        self._archivo.flush()
+        return {"offset": os.fstat(self._archivo.fileno()).st_size}
+
+    def close(self):
+        self._archivo.close()
+
+
+class ParquetSink:
+    """
+    Escribe las filas en partes Parquet dentro de `results/`, una por confirmación.
+
+    Las filas se acumulan solo hasta la siguiente confirmación; cada parte se escribe en un
+    archivo temporal y se renombra al terminar, así que nunca queda una parte a medio escribir.
+    El directorio se lee como una sola tabla con `pandas.read_parquet("reportes/results")`.
+    Al reanudar se borran las partes que no llegaron a registrarse en el checkpoint.
+
+    Parámetros:
+    - directorio (str): Directorio de salida.
+    - estados (list): Estados de confirmaciones anteriores (`Checkpoint.sink_states`).
+    """
+
+    def __init__(self, directorio, estados=()):
+        if pq is None:
+            raise RuntimeError("El formato Parquet requiere pyarrow (pip install pyarrow)")
+        self.path = os.path.join(directorio, "results")
+        os.makedirs(self.path, exist_ok=True)
+        confirmadas = {estado["part"] for estado in estados if "part" in estado}
+        for nombre in os.listdir(self.path):
+            if nombre not in confirmadas:
+                os.remove(os.path.join(self.path, nombre))
+        self._siguiente = len(confirmadas)
+        self._esquema = pa.schema([(nombre, getattr(pa, tipo)()) for nombre, tipo in COLUMNAS])
+        self._filas = []
+
+    def write(self, row):
+        self._filas.append(row)
+
+    def commit(self):
+        """
+        Escribe las filas acumuladas como una nueva parte y devuelve el estado a guardar en el
+        checkpoint.
+        """
+        nombre = f"part-{self._siguiente:05d}.parquet"
+        destino = os.path.join(self.path, nombre)
+        pq.write_table(pa.Table.from_pylist(self._filas, schema=self._esquema), destino + ".tmp")
+        os.replace(destino + ".tmp", destino)
+        self._siguiente += 1
+        self._filas = []
+        return {"part": nombre}
+
+    def close(self):
+        pass
+
+
+SINKS = {"csv": CsvSink, "parquet": ParquetSink}
+
+
+def leer_ciudades(path):
+    """
+    Lee los nombres de ciudades de un archivo sin cargarlo completo en memoria.
+
+    Acepta un CSV con encabezado y columna `name` (y opcionalmente `country`, como
+    `data/cities.csv`) o un texto con una ciudad por línea; las líneas vacías y las que empiezan
+    con `#` se ignoran. "-" lee de la entrada estándar.
+
+    Parámetros:
+    - path (str): Ruta del archivo.
+
+    Devuelve:
+    - generator: Nombres de ciudades ("Paris" o "Paris,FR").
+    """
+    archivo = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+    try:
+        if path.endswith(".csv"):
+            for registro in csv.DictReader(archivo):
+                if registro.get("name"):
+                    yield f"{registro['name']},{registro['country']}" if registro.get("country") else registro["name"]
+        else:
+            for linea in archivo:
+                linea = linea.strip()
+                if linea and not linea.startswith("#"):
+                    yield linea
+    finally:
+        if archivo is not sys.stdin:
+            archivo.close()
+
+
+def nombre_archivo(key):
+    """
+    Nombre de archivo seguro para el reporte de una ciudad ("são paulo,br" -> "são-paulo-br").
+    """
+    return re.sub(r"[^\w]+", "-", key).strip("-") or "ciudad"
+
+
+def _espera(exc):
+    try:
+        return float((exc.headers or {}).get("Retry-After", 1))
+    except ValueError:
+        return 1.0
+
+
+async def generar(ciudades, obtener, sink, checkpoint, concurrency=20, commit_every=500, renderizar=None,
+                  render_slots=4, retries=5, progreso=None):
+    """
+    Consulta las ciudades con concurrencia acotada y escribe cada resultado a medida que llega.
+
+    Las ciudades se leen del iterable a medida que hay lugar en la cola, por lo que la memoria no
+    depende del tamaño de la lista. Las filas se confirman en el destino y en el checkpoint cada
+    `commit_every` ciudades (y al terminar o interrumpirse). Los errores de cuota o de OpenWeather
+    caído se reintentan tras el `Retry-After`; si persisten, la ciudad queda pendiente para la
+    siguiente ejecución. Los errores definitivos (p. ej. ciudad inexistente) y cualquier otra
+    excepción al consultar o convertir una ciudad se registran en el checkpoint y no se vuelven a
+    consultar; el resto de las ciudades sigue su curso.
+
+    Parámetros:
+    - ciudades (iterable): Nombres de ciudades.
+    - obtener (callable): Corrutina `obtener(city)` que devuelve (clima actual, pronóstico).
+    - sink (CsvSink or ParquetSink): Destino de las filas.
+    - checkpoint (Checkpoint): Registro de avance.
+    - concurrency (int): Ciudades consultadas a la vez.
+    - commit_every (int): Filas entre confirmaciones.
+    - renderizar (callable): Corrutina `renderizar(key, actual, pronostico)` que genera el reporte
+        de una ciudad, o None para no generar reportes.
+    - render_slots (int): Reportes en curso como máximo; con el pool lleno, las consultas esperan.
+    - retries (int): Reintentos por ciudad ante errores transitorios.
+    - progreso (callable): Recibe el diccionario de contadores tras cada ciudad. Opcional.
+
+    Devuelve:
+    - dict: Ciudades consultadas, filas escritas, omitidas por el checkpoint, con error
+        definitivo, pendientes por errores transitorios, y reportes generados y fallidos.
+    """
+    stats = {"fetched": 0, "written": 0, "skipped": 0, "failed": 0, "pending": 0, "reports": 0, "report_errors": 0}
+    cola = asyncio.Queue(maxsize=2 * concurrency)
+    pendientes = []
+    vistas = set()
+    cupos = asyncio.Semaphore(render_slots)
+    reportes = set()
+
+    def confirmar():
+        if pendientes:
+            checkpoint.mark_rows(pendientes, sink.commit())
+            pendientes.clear()
+
+    def terminado(key):
+        return key in checkpoint.failed or (
+            key in checkpoint.rows and (renderizar is None or key in checkpoint.reports))
+
+    async def productor():
+        for city in ciudades:
+            key = normalizar_ciudad(city)
+            if key in vistas or terminado(key):
+                stats["skipped"] += 1
+                continue
+            vistas.add(key)
+            await cola.put((city, key))
+        for _ in range(concurrency):
+            await cola.put(None)
+
+    async def reportar(key, actual, pronostico):
+        try:
+            await renderizar(key, actual, pronostico)
+        except Exception as exc:
+            # El reporte queda pendiente para la siguiente ejecución; la fila ya está escrita
+            print(f"No se pudo generar el reporte de {key}: {exc!r}", file=sys.stderr)
+            stats["report_errors"] += 1
+        else:
+            checkpoint.mark_report(key)
+            stats["reports"] += 1
+        finally:
+            cupos.release()
+
+    def fallida(key, status, detail):
+        checkpoint.mark_failed(key, status, detail)
+        stats["failed"] += 1
+
+    async def procesar(city, key):
+        for intento in range(retries + 1):
+            try:
+                actual, pronostico = await obtener(city)
+                break
+            except HTTPException as exc:
+                if exc.status_code not in ESTADOS_TRANSITORIOS:
+                    fallida(key, exc.status_code, exc.detail)
+                    return
+                if intento == retries:
+                    stats["pending"] += 1
+                    return
+                await asyncio.sleep(_espera(exc))
+            except Exception as exc:
+                # Un error inesperado (transporte, JSON inválido, respuesta incompleta) no detiene
+                # el lote ni descarta las filas sin confirmar
+                print(f"No se pudo consultar {key}: {exc!r}", file=sys.stderr)
+                fallida(key, None, repr(exc))
+                return
+        stats["fetched"] += 1
+        if key not in checkpoint.rows:
+            try:
+                row = fila(city, actual, pronostico)
+            except Exception as exc:
+                print(f"No se pudo convertir {key}: {exc!r}", file=sys.stderr)
+                fallida(key, None, repr(exc))
+                return
+            sink.write(row)
+            pendientes.append(key)
+            stats["written"] += 1
+            if len(pendientes) >= commit_every:
+                confirmar()
+        if renderizar is not None and key not in checkpoint.reports:
+            await cupos.acquire()
+            tarea = asyncio.ensure_future(reportar(key, actual, pronostico))
+            reportes.add(tarea)
+            tarea.add_done_callback(reportes.discard)
+
+    async def trabajador():
+        while (item := await cola.get()) is not None:
+            await procesar(*item)
+            if progreso is not None:
+                progreso(stats)
+
+    try:
+        await asyncio.gather(productor(), *(trabajador() for _ in range(concurrency)))
+        await asyncio.gather(*reportes)
+    finally:
+        confirmar()
+    return stats
+
+
+def _tiempos_locales(actual, pronostico):
+    desfase = timedelta(seconds=(pronostico.get("city") or {}).get("timezone") or actual.get("timezone") or 0)
+    return [datetime.fromtimestamp(e["dt"], timezone.utc).replace(tzinfo=None) + desfase for e in pronostico["list"]]
+
+
+def figuras_reporte(actual, pronostico):
+    """
+    Crea los mismos gráficos que `mostrar_info_climatica` para un reporte estático.
+
+    En el reporte las series de temperatura, presión y humedad son las del pronóstico de 5 días
+    (cada 3 horas, en hora local de la ciudad), en lugar de las lecturas en vivo de la sesión.
+    Las figuras se arman como diccionarios de Plotly en lugar de con plotly.express, cuya
+    validación cuesta unos 300 ms por reporte.
+
+    Parámetros:
+    - actual (dict): Clima actual.
+    - pronostico (dict): Pronóstico de 5 días.
+
+    Devuelve:
+    - list: [(título de la sección, figura como dict)] en el orden de la página.
+    """
+    tiempos = [t.isoformat() for t in _tiempos_locales(actual, pronostico)]
+
+    def serie(campo, metrica, titulo):
+        valores = [entrada["main"][campo] for entrada in pronostico["list"]]
+        return {
+            "data": [{"type": "scatter", "mode": "lines", "x": tiempos, "y": valores}],
+            "layout": {"title": {"text": titulo}, "xaxis": {"title": {"text": "Tiempo"}},
+                       "yaxis": {"title": {"text": metrica}}},
+        }
+
+    min_max = {
+        "data": [
+            {"type": "bar", "name": tipo, "x": [tipo], "y": [valor], "text": [valor], "marker": {"color": color},
+             "texttemplate": "%{text} °C", "textposition": "outside"}
+            for tipo, valor, color in (("Temperatura Máxima", actual["main"]["temp_max"], "red"),
+                                       ("Temperatura Mínima", actual["main"]["temp_min"], "blue"))
+        ],
+        "layout": {"title": {"text": "Temperatura Mínima y Máxima"}, "xaxis": {"title": {"text": "Tipo"}},
+                   "yaxis": {"title": {"text": "Temperatura (°C)"}}, "legend": {"title": {"text": "Tipo"}}},
+    }
+    return [
+        ("Temperatura", serie("temp", "Temperatura", "Variación de Temperatura en el Tiempo")),
+        ("Temperatura Mínima y Máxima", min_max),
+        ("Presión Atmosférica", serie("pressure", "Presión Atmosférica", "Variación de Presión Atmosférica en el Tiempo")),
+        ("Humedad", serie("humidity", "Humedad", "Variación de Humedad en el Tiempo")),
+    ]
+
+
+def _tabla(filas):
+    encabezado = "".join(f"<th>{html.escape(str(c))}</th>" for c in filas[0])
+    cuerpo = "".join("<tr>" + "".join(f"<td>{html.escape(str(v))}</td>" for v in f.values()) + "</tr>" for f in filas)
+    return f"<table><tr>{encabezado}</tr>{cuerpo}</table>"
+
+
+def _condicion(actual):
+    # La respuesta compacta puede traer la lista `weather` vacía
+    return (actual.get("weather") or [{}])[0]
+
+
+def _hora_utc(segundos):
+    if segundos is None:
+        return "N/D"
+    return datetime.fromtimestamp(segundos, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _pagina_html(actual, pronostico, figuras, icon_url):
+    import plotly.io as pio
+
+    # Los campos opcionales de la respuesta compacta pueden venir en None
+    condicion = _condicion(actual)
+    hora_local = (datetime.fromtimestamp(actual.get("dt") or time.time(), timezone.utc).replace(tzinfo=None)
+                  + timedelta(seconds=actual.get("timezone") or 0))
+    datos = {
+        "País": actual["sys"]["country"],
+        "Longitud": actual["coord"]["lon"],
+        "Latitud": actual["coord"]["lat"],
+        "Descripción": condicion.get("description", ""),
+        "Velocidad del Viento(m/s)": actual["wind"]["speed"],
+        "Hora Amanecer(UTC)": _hora_utc(actual["sys"]["sunrise"]),
+        "Hora Atardecer(UTC)": _hora_utc(actual["sys"]["sunset"]),
+        "Temperatura Actual": actual["main"]["temp"],
+        "Temperatura Máxima": actual["main"]["temp_max"],
+        "Temperatura Mínima": actual["main"]["temp_min"],
+    }
+    dias = [{"Fecha": d["date"], "Mínima": d["temp_min"], "Máxima": d["temp_max"], "Condición": d["description"]}
+            for d in resumen_diario(pronostico)["days"]]
+    graficos = "".join(
+        f"<div class='grafico'><h3>{html.escape(titulo)}</h3>"
+        f"{pio.to_html(figura, full_html=False, include_plotlyjs=False, validate=False)}</div>"
+        for titulo, figura in figuras
+    )
+    aviso = ""
+    if "stale" in actual:
+        aviso = f"<p class='aviso'>Datos de hace {actual['stale']['age'] // 60} min: OpenWeather no respondió.</p>"
+    nombre = html.escape(actual["name"])
+    icono = ""
+    if condicion.get("icon"):
+        icono = f'<img src="{html.escape(icon_url.format(condicion["icon"]))}" style="width: 180px; height: 120px;">'
+    return f"""<!DOCTYPE html>
+<html lang="es">
+<head>
+<meta charset="utf-8">
+<title>Clima en {nombre}</title>
+<script src="plotly.min.js"></script>
+<style>
+body {{ font-family: sans-serif; margin: 2em; }}
+.kpis, .graficos {{ display: flex; flex-wrap: wrap; gap: 1em; }}
+.kpi {{ border: 1px solid #ddd; border-radius: 8px; padding: 0.5em 1em; }}
+.grafico {{ width: 48%; min-width: 420px; }}
+table {{ border-collapse: collapse; margin: 1em 0; }}
+td, th {{ border: 1px solid #ddd; padding: 4px 8px; }}
+.aviso {{ color: #a60; }}
+</style>
+</head>
+<body>
+<div style="display: flex; align-items: center;">
+<h1 style="margin-right: 10px;">Clima en {nombre}</h1>
+{icono}
+</div>
+{aviso}
+<div class="kpis">
+<div class="kpi">Descripción del clima<br><b>{html.escape(condicion.get('description', ''))}</b></div>
+<div class="kpi">Hora local<br><b>{hora_local.strftime('%Y-%m-%d %H:%M')}</b></div>
+<div class="kpi">Temperatura<br><b>{actual['main']['temp']} °C</b></div>
+</div>
+<h2>Datos adicionales</h2>
+{_tabla([datos])}
+<div class="graficos">{graficos}</div>
+<h2>Pronóstico de 5 días</h2>
+{_tabla(dias) if dias else ""}
+</body>
+</html>
+"""
+
+
+def _imagen_png(actual, pronostico, path):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    tiempos = _tiempos_locales(actual, pronostico)
+    figura, ejes = plt.subplots(2, 2, figsize=(12, 8))
+    figura.suptitle(f"Clima en {actual['name']}: {_condicion(actual).get('description', '')}, {actual['main']['temp']} °C")
+    series = (("temp", "Temperatura", "Variación de Temperatura en el Tiempo", ejes[0][0]),
+              ("pressure", "Presión Atmosférica", "Variación de Presión Atmosférica en el Tiempo", ejes[1][0]),
+              ("humidity", "Humedad", "Variación de Humedad en el Tiempo", ejes[1][1]))
+    for campo, metrica, titulo, eje in series:
+        eje.plot(tiempos, [entrada["main"][campo] for entrada in pronostico["list"]])
+        eje.set_title(titulo)
+        eje.set_ylabel(metrica)
+        eje.tick_params(axis="x", labelrotation=30)
+    eje = ejes[0][1]
+    valores = [actual["main"]["temp_max"], actual["main"]["temp_min"]]
+    barras = eje.bar(["Temperatura Máxima", "Temperatura Mínima"], valores, color=["red", "blue"])
+    eje.bar_label(barras, labels=[f"{v} °C" for v in valores])
+    eje.set_title("Temperatura Mínima y Máxima")
+    eje.set_ylabel("Temperatura (°C)")
+    # Márgenes fijos: tight_layout duplica el tiempo de cada imagen
+    figura.subplots_adjust(left=0.07, right=0.98, top=0.92, bottom=0.1, hspace=0.45, wspace=0.2)
+    figura.savefig(path, dpi=80)
+    plt.close(figura)
+
+
+def renderizar_reporte(directorio, key, actual, pronostico, formatos=("html",), icon_url=ICON_URL):
+    """
+    Genera el reporte de una ciudad. Pensada para ejecutarse en un proceso del pool.
+
+    El HTML usa plotly.js desde `plotly.min.js` en el mismo directorio (ver `escribir_plotlyjs`),
+    así que los reportes se pueden abrir sin conexión. El PNG se dibuja con matplotlib.
+
+    Parámetros:
+    - directorio (str): Directorio de los reportes.
+    - key (str): Clave normalizada de la ciudad (nombre de los archivos).
+    - actual (dict): Clima actual (compacto).
+    - pronostico (dict): Pronóstico de 5 días (compacto).
+    - formatos (tuple): "html" y/o "png".
+    - icon_url (str): Plantilla de la URL del ícono de la condición.
+
+    Devuelve:
+    - list: Rutas de los archivos escritos.
+    """
+    base = os.path.join(directorio, nombre_archivo(key))
+    rutas = []
+    if "html" in formatos:
+        with open(base + ".html", "w", encoding="utf-8") as archivo:
+            archivo.write(_pagina_html(actual, pronostico, figuras_reporte(actual, pronostico), icon_url))
+        rutas.append(base + ".html")
+    if "png" in formatos:
+        _imagen_png(actual, pronostico, base + ".png")
+        rutas.append(base + ".png")
+    return rutas
+
+
+def escribir_plotlyjs(directorio):
+    """
+    Copia plotly.js una sola vez al directorio de reportes, compartido por todas las páginas.
+    """
+    path = os.path.join(directorio, "plotly.min.js")
+    if not os.path.exists(path):
+        from plotly.offline import get_plotlyjs
+
+        with open(path, "w", encoding="utf-8") as archivo:
+            archivo.write(get_plotlyjs())
+
+
+async def ejecutar(args):
+    """
+    Ejecuta el generador con las opciones de la línea de comandos contra OpenWeather.
+    """
+    os.makedirs(args.out, exist_ok=True)
+    formatos = tuple(f for f in ("html", "png") if getattr(args, f))
+    directorio_reportes = os.path.join(args.out, "reports")
+    if formatos:
+        os.makedirs(directorio_reportes, exist_ok=True)
+        if "html" in formatos:
+            escribir_plotlyjs(directorio_reportes)
+
+    # El servicio se importa aquí para no exigir su configuración al usar el módulo como biblioteca
+    os.environ.setdefault("ASSETS_PRECOMPUTE", "0")
+    import OpenWeather as ow
+    from upstreamQuota import BATCH, prioridad
+
+    prioridad.set(BATCH)
+    checkpoint = Checkpoint(os.path.join(args.out, "checkpoint.jsonl"))
+    sink = SINKS[args.format](args.out, checkpoint.sink_states)
+    inicio = time.perf_counter()
+    ultimo = [0.0]
+
+    def progreso(stats):
+        ahora = time.perf_counter()
+        if ahora - ultimo[0] >= 5:
+            ultimo[0] = ahora
+            print(f"{ahora - inicio:7.0f} s  " + "  ".join(f"{k}={v}" for k, v in stats.items()), file=sys.stderr)
+
+    async def obtener(city):
+        actual = compactar_actual(await ow.obtener_clima_actual(city))
+        pronostico = await ow.obtener_pronostico(actual["coord"]["lat"], actual["coord"]["lon"])
+        return actual, compactar_pronostico(pronostico)
+
+    with ProcessPoolExecutor(args.render_workers) as pool:
+        loop = asyncio.get_running_loop()
+
+        async def renderizar(key, actual, pronostico):
+            await loop.run_in_executor(pool, renderizar_reporte, directorio_reportes, key, actual, pronostico,
+                                       formatos, ow.OPENWEATHER_ICON_URL)
+
+        try:
+            async with ow.lifespan(ow.app):
+                stats = await generar(leer_ciudades(args.cities), obtener, sink, checkpoint, args.concurrency,
+                                      args.commit_every, renderizar if formatos else None,
+                                      2 * args.render_workers, args.retries, progreso)
+        finally:
+            sink.close()
+            checkpoint.close()
+    print(f"{time.perf_counter() - inicio:.0f} s  " + "  ".join(f"{k}={v}" for k, v in stats.items()))
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cities", help="archivo con una ciudad por línea, o CSV con columna name (\"-\" lee stdin)")
+    parser.add_argument("--out", default="reportes", help="directorio de salida")
+    parser.add_argument("--format", choices=sorted(SINKS), default="csv")
+    parser.add_argument("--html", action="store_true", help="generar una página HTML por ciudad")
+    parser.add_argument("--png", action="store_true", help="generar una imagen PNG por ciudad (requiere matplotlib)")
+    parser.add_argument("--concurrency", type=int, default=20, help="ciudades consultadas a la vez")
+    parser.add_argument("--render-workers", type=int, default=os.cpu_count() or 1, help="procesos del pool de reportes")
+    parser.add_argument("--commit-every", type=int, default=500, help="filas entre confirmaciones del checkpoint")
+    parser.add_argument("--retries", type=int, default=5, help="reintentos por ciudad ante cuota agotada u OpenWeather caído")
+    args = parser.parse_args(argv)
+    stats = asyncio.run(ejecutar(args))
+    return 1 if stats["pending"] or stats["report_errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,275 @@
+"""
+Módulo con el modo tablero de la aplicación Streamlit: seguimiento de varias ciudades a la vez.
+
+En cada actualización se piden todas las ciudades en una sola solicitud a `GET /weather?cities=`
+y cada métrica se dibuja en un único gráfico con una traza WebGL (`Scattergl`) por ciudad.
+La memoria está acotada (un buffer circular por ciudad y métrica) y también el costo de dibujo:
+cada gráfico dibuja como máximo `DASHBOARD_POINT_BUDGET` puntos, repartidos entre las ciudades.
+"""
+
+import time
+from datetime import datetime, timezone
+
+import httpx
+import pandas as pd
+import plotly.graph_objects as go
+import regex
+import streamlit as st
+
+from ringBuffer import RingBuffer
+
+# Consulta por lote del servicio FastAPI
+BATCH_URL = "http://localhost:8000/weather"
+DEFAULT_CITIES = "London, Paris, Tokyo, New York, Mexico City"
+# Máximo de ciudades del tablero (el servicio acepta hasta BATCH_MAX_CITIES por solicitud)
+DASHBOARD_MAX_CITIES = 50
+# Puntos que se conservan por ciudad y métrica (720 = 1 hora con actualizaciones cada 5 segundos)
+DASHBOARD_CAPACITY = 720
+# Puntos dibujados por gráfico, repartidos entre todas las ciudades
+DASHBOARD_POINT_BUDGET = 20000
+
+# Métrica -> (sección, campo) en la respuesta compacta del clima actual
+METRICAS = {
+    "Temperatura (°C)": ("main", "temp"),
+    "Humedad (%)": ("main", "humidity"),
+    "Presión (hPa)": ("main", "pressure"),
+    "Viento (m/s)": ("wind", "speed"),
+}
+
+
+def separar_ciudades(texto, limite=DASHBOARD_MAX_CITIES):
+    """
+    Convierte el texto del usuario en la lista de ciudades del tablero.
+
+    Parámetros:
+    - texto (str): Nombres separados por comas.
+    - limite (int): Máximo de ciudades.
+
+    Devuelve:
+    - tuple(list, list): Ciudades válidas sin repetir (en el orden escrito, hasta `limite`)
+        y nombres descartados por no ser nombres de ciudad.
+    """
+    ciudades, invalidas, vistas = [], [], set()
+    for city in texto.split(","):
+        city = " ".join(city.split())
+        if not city:
+            continue
+        if not regex.match("^\\p{L}[\\p{L}\\s]*$", city):
+            invalidas.append(city)
+        elif city.casefold() not in vistas and len(ciudades) < limite:
+            vistas.add(city.casefold())
+            ciudades.append(city)
+    return ciudades, invalidas
+
+
+class DashboardSeries:
+    """
+    Series en vivo de varias ciudades: un `RingBuffer` por ciudad y métrica.
+
+    Parámetros:
+    - capacity (int): Puntos que se conservan por ciudad y métrica.
+    """
+
+    def __init__(self, capacity=DASHBOARD_CAPACITY):
+        self.capacity = capacity
+        self._series = {}
+
+    def __len__(self):
+        return len(self._series)
+
+    @property
+    def nbytes(self):
+        """
+        Memoria ocupada por todos los buffers (crece con el número de ciudades, no con el tiempo).
+        """
+        return sum(buffer.nbytes for buffers in self._series.values() for buffer in buffers.values())
+
+    def set_cities(self, ciudades):
+        """
+        Conserva solo las series de `ciudades`, liberando las de ciudades que ya no se siguen.
+        """
+        self._series = {city: self._series[city] for city in ciudades if city in self._series}
+
+    def update(self, results, timestamp):
+        """
+        Agrega a cada serie el valor actual de cada ciudad.
+
+        Parámetros:
+        - results (dict): {ciudad: datos compactos del clima actual}, como en `GET /weather?cities=`.
+        - timestamp (datetime): Momento de la actualización (el mismo para todas las ciudades).
+        """
+        for city, data in results.items():
+            buffers = self._series.get(city)
+            if buffers is None:
+                buffers = self._series[city] = {metrica: RingBuffer(self.capacity) for metrica in METRICAS}
+            for metrica, (seccion, campo) in METRICAS.items():
+                valor = (data.get(seccion) or {}).get(campo)
+                if valor is not None:
+                    buffers[metrica].append(timestamp, valor)
+
+    def points_per_trace(self, budget=DASHBOARD_POINT_BUDGET):
+        """
+        Puntos que puede dibujar cada traza para no superar `budget` puntos por gráfico.
+        """
+        return max(2, budget // max(1, len(self._series)))
+
+    def figure(self, metrica, budget=DASHBOARD_POINT_BUDGET):
+        """
+        Crea el gráfico de una métrica con una traza `Scattergl` por ciudad.
+
+        Las series que superan su parte del presupuesto de puntos se reducen conservando
+        mínimos y máximos (`RingBuffer.downsample`).
+
+        Parámetros:
+        - metrica (str): Una de las claves de `METRICAS`.
+        - budget (int): Máximo de puntos dibujados en el gráfico.
+
+        Devuelve:
+        - plotly.graph_objects.Figure: Gráfico de la métrica.
+        """
+        max_points = self.points_per_trace(budget)
+        trazas = []
+        for city, buffers in self._series.items():
+            buffer = buffers[metrica]
+            if not len(buffer):
+                continue
+            if len(buffer) > max_points:
+                tiempos, valores = buffer.downsample(max_points)
+            else:
+                tiempos, valores = buffer.times(), buffer.values()
+            trazas.append({"type": "scattergl", "x": tiempos, "y": valores, "mode": "lines", "name": city})
+        # Construir la figura de una sola vez (y no con add_trace por ciudad) valida las trazas una vez
+        return go.Figure(data=trazas, layout={
+            "title": metrica, "xaxis_title": "Hora (UTC)", "yaxis_title": metrica,
+            "margin": {"t": 40, "b": 40}, "legend": {"orientation": "h"},
+        })
+
+
+def fila_resumen(city, data):
+    """
+    Fila de la tabla del tablero para una ciudad.
+
+    Los campos opcionales de la respuesta compacta pueden faltar o venir en None (p. ej. una
+    lista `weather` vacía); en ese caso la celda queda vacía en lugar de fallar toda la vista.
+
+    Parámetros:
+    - city (str): Nombre de la ciudad tal como se pidió.
+    - data (dict): Clima actual en la forma compacta de `/weather/{city}`.
+
+    Devuelve:
+    - dict: Ciudad, país, descripción y una columna por métrica de `METRICAS`.
+    """
+    return {
+        "Ciudad": city,
+        "País": (data.get("sys") or {}).get("country"),
+        "Descripción": (data.get("weather") or [{}])[0].get("description", ""),
+        **{metrica: (data.get(seccion) or {}).get(campo) for metrica, (seccion, campo) in METRICAS.items()},
+    }
+
+
+def get_dashboard_data(ciudades):
+    """
+    Obtiene el clima actual de todas las ciudades del tablero en una sola solicitud.
+
+    El tablero lo está mirando un usuario, así que pide prioridad interactiva en la cuota de
+    OpenWeather (las consultas por lote tienen la prioridad más baja por defecto).
+
+    Parámetros:
+    - ciudades (list): Nombres de las ciudades.
+
+    Devuelve:
+    - dict or None: {"results": {...}, "errors": {...}} del servicio, o None si la solicitud falla.
+    """
+    try:
+        response = httpx.get(BATCH_URL, params={"cities": ",".join(ciudades), "compact": "true"},
+                             headers={"X-Priority": "interactive"})
+    except httpx.HTTPError:
+        return None
+    if response.status_code != 200:
+        return None
+    return response.json()
+
+
+def vista_tablero():
+    """
+    Dibuja la parte en vivo del tablero: tabla resumen y un gráfico por métrica.
+
+    Se ejecuta como fragmento de Streamlit con `run_every`, igual que la vista de una ciudad.
+    Muestra además la memoria de las series, los puntos dibujados y el tiempo de CPU del tick.
+
+    No devuelve nada.
+    """
+    if not st.session_state.get("dashboard_active"):
+        return
+    inicio = time.process_time()
+    ciudades = st.session_state.dashboard_cities
+    datos = get_dashboard_data(ciudades)
+    if datos is None:
+        st.error("Hubo un problema al obtener los datos del clima. Por favor, intenta nuevamente.")
+        return
+
+    series = st.session_state.dashboard_series
+    # Los datos obsoletos (OpenWeather sin responder) no se agregan a las series
+    frescos = {city: data for city, data in datos["results"].items() if "stale" not in data}
+    series.update(frescos, datetime.now(timezone.utc).replace(tzinfo=None))
+    if datos["errors"]:
+        st.warning("Sin datos para: " + ", ".join(datos["errors"]))
+    obsoletas = [city for city, data in datos["results"].items() if "stale" in data]
+    if obsoletas:
+        st.warning("OpenWeather no responde; últimos datos disponibles para: " + ", ".join(obsoletas))
+
+    resumen = pd.DataFrame([fila_resumen(city, data) for city, data in datos["results"].items()])
+    st.dataframe(resumen, hide_index=True)
+
+    columnas = st.columns(2)
+    for i, metrica in enumerate(METRICAS):
+        with columnas[i % 2]:
+            st.plotly_chart(series.figure(metrica))
+
+    st.session_state.dashboard_tick_cpu_ms = (time.process_time() - inicio) * 1000
+    st.caption(
+        f"{len(series)} ciudades · {series.nbytes / 1024:.0f} KiB en series · "
+        f"hasta {series.points_per_trace()} puntos por traza · "
+        f"{st.session_state.dashboard_tick_cpu_ms:.0f} ms de CPU por actualización"
+    )
+
+
+def pagina_tablero(refresh_seconds):
+    """
+    Dibuja el modo tablero: lista de ciudades, botones de inicio y detención y la vista en vivo.
+
+    Parámetros:
+    - refresh_seconds (float): Segundos entre actualizaciones de la vista en vivo.
+
+    No devuelve nada.
+    """
+    activo = st.session_state.get("dashboard_active", False)
+    texto = st.text_input("Ciudades (separadas por comas):", st.session_state.get("dashboard_text", DEFAULT_CITIES),
+                          disabled=activo)
+
+    col_iniciar, col_detener = st.columns(2)
+    with col_iniciar:
+        iniciar = st.button("Iniciar tablero", type="primary", disabled=activo)
+    with col_detener:
+        detener = st.button("Detener tablero", type="primary", disabled=not activo)
+
+    if iniciar:
+        ciudades, invalidas = separar_ciudades(texto)
+        if invalidas:
+            st.error("No son nombres de ciudad válidos: " + ", ".join(invalidas))
+        elif not ciudades:
+            st.error("Debes ingresar al menos una ciudad válida")
+        else:
+            st.session_state.dashboard_text = texto
+            st.session_state.dashboard_cities = ciudades
+            series = st.session_state.setdefault("dashboard_series", DashboardSeries())
+            series.set_cities(ciudades)
+            st.session_state.dashboard_active = True
+            st.rerun()
+
+    if detener:
+        st.session_state.dashboard_active = False
+        st.warning("Se ha detenido el seguimiento del tablero.")
+
+    intervalo = refresh_seconds if st.session_state.get("dashboard_active") else None
+    st.fragment(run_every=intervalo)(vista_tablero)()
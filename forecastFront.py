@@ -6,14 +6,18 @@ Utiliza datos obtenidos de la API de OpenWeather para mostrar el pronóstico de
 import streamlit as st
 import httpx
 import datetime
+import os
 
 # URL de tu FastAPI
 #BASE_URL = "http://localhost:8000/forecast_weather/"
+# URL pública de los íconos e imágenes que sirve el servicio (la usa el navegador)
+ASSETS_URL = os.getenv("CLIMA_ASSETS_URL", "http://localhost:8000/assets")
 
 """
 Asíncronamente recupera datos de pronóstico del clima basados en la latitud y longitud proporcionadas.
 
-    Esta función consulta una API local en `localhost:8000/forecast` para obtener el pronóstico del clima
+    Esta función consulta una API local en `localhost:8000/forecast/daily` para obtener el pronóstico del clima,
+    resumido por día, 
     para una ubicación específica (latitud y longitud). Antes de hacer la consulta, verifica si la 
     latitud y longitud ya están almacenadas en el `session_state` de Streamlit y, en caso afirmativo, 
     utiliza esos valores en lugar de los proporcionados.
@@ -31,7 +35,8 @@ async def fetch_forecast_data(lat, lon):
     if "lat" in st.session_state and "lon" in st.session_state:
         lat = st.session_state.lat
         lon = st.session_state.lon
-        response = httpx.get(f"http://localhost:8000/forecast?lat={lat}&lon={lon}")
+        async with httpx.AsyncClient() as client:
+            response = await client.get(f"http://localhost:8000/forecast/daily?lat={lat}&lon={lon}")
         data = response.json()
         return data
     return None
@@ -55,6 +60,35 @@ def get_forecast(lat, lon):
     import asyncio
     return asyncio.run(fetch_forecast_data(lat, lon))
 
+def prefetch_bundle(city):
+    """
+    Descarga en una sola solicitud el clima actual y el pronóstico diario de una ciudad.
+
+    El servicio consulta ambos datos de forma concurrente. El resultado se guarda en
+    `st.session_state` (`weather_data`, `lat`, `lon` y `forecast_data`), de modo que el botón
+    "Mostrar forecast" se dibuja de inmediato sin otra consulta.
+
+    Parámetros:
+    - city (str): Nombre de la ciudad que se empieza a seguir.
+
+    Devuelve:
+    - dict or None: Respuesta del servicio, o None si ocurre algún error (la vista en vivo
+                    mostrará el error correspondiente).
+    """
+    try:
+        response = httpx.get(f"http://localhost:8000/weather/{city}/bundle")
+    except httpx.HTTPError:
+        return None
+    if response.status_code != 200:
+        return None
+
+    bundle = response.json()
+    st.session_state.weather_data = bundle["current"]
+    st.session_state.lat = bundle["current"]["coord"]["lat"]
+    st.session_state.lon = bundle["current"]["coord"]["lon"]
+    st.session_state.forecast_data = bundle["forecast"]
+    return bundle
+
 # Lógica para Streamlit
     """
     show_forecast
@@ -77,27 +111,22 @@ def show_forecast(forecast_message_marker):
         return
 
     forecast_message_marker.success(f"Mostrando pronóstico de los próximos **5 días**")
-    
-    # Filtrar los datos para que solo se incluyan las entradas de "15:00:00" horas
-    filtered_data = [entry for entry in st.session_state.forecast_data["list"] if "15:00:00" in entry["dt_txt"]]
 
     if 'forecast_marker' not in st.session_state:
         st.session_state.forecast_marker = st.empty()
 
     forecast_container = st.session_state.forecast_marker.container()
     
-    # Iterar sobre los datos filtrados y mostrar en el contenedor general
-    for day_data in filtered_data:
-        
-        date_only = day_data["dt_txt"].split()[0]
-        temp = day_data["main"]["temp"]
-        description = day_data["weather"][0]["description"]
-        icon_url = f"https://openweathermap.org/img/wn/{day_data['weather'][0]['icon']}@2x.png"
+    # El servicio ya entrega una fila por día local de la ciudad
+    for day_data in st.session_state.forecast_data["days"]:
+
+        icon_url = f"{ASSETS_URL}/icons/{day_data['icon']}.png"
 
         col1, col2, col3, col4 = forecast_container.columns(4)
-        col1.metric(label="Fecha", value=date_only)
-        col2.metric(label="Temperatura Promedio", value=f"{temp} °C")
-        col3.metric(label="Pronóstico", value=description)
+        col1.metric(label="Fecha", value=day_data["date"])
+        col2.metric(label="Temperatura Promedio", value=f"{day_data['temp_mean']} °C")
+        col2.caption(f"Mín {day_data['temp_min']} °C / Máx {day_data['temp_max']} °C")
+        col3.metric(label="Pronóstico", value=day_data["description"])
         col4.image(icon_url, caption="Clima", width=60)
 
 # Para probarlo
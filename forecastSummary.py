@@ -0,0 +1,83 @@
+"""
+Resumen diario del pronóstico de 5 días de OpenWeather.
+
+Convierte las 40 entradas cada 3 horas de `/forecast` en una fila por día local de la ciudad,
+con temperatura mínima, máxima y media, la condición dominante y su ícono, calculado con
+NumPy en una sola pasada vectorizada.
+"""
+
+from datetime import datetime, timezone
+
+import numpy as np
+
+SEGUNDOS_POR_DIA = 86400
+
+
+def resumen_diario(forecast):
+    """
+    Agrega el pronóstico por día local de la ciudad.
+
+    Los días se calculan con el desfase horario de la ciudad (`city.timezone`), no con la hora
+    UTC de `dt_txt`. La condición dominante es la más frecuente del día; en caso de empate se
+    elige la de menor código de OpenWeather (tormenta < lluvia < nieve < despejado), que es la
+    más significativa. Si el pronóstico viene marcado como obsoleto (`stale`), el resumen
+    conserva la marca.
+
+    Parámetros:
+    - forecast (dict): Respuesta de OpenWeather para `/data/2.5/forecast`.
+
+    Devuelve:
+    - dict: {"city": {"name", "country", "timezone"}, "days": [{"date", "temp_min", "temp_max",
+            "temp_mean", "condition_id", "condition", "description", "icon", "samples"}, ...]}.
+    """
+    entries = forecast["list"]
+    city = forecast.get("city", {})
+    offset = city.get("timezone", 0)
+    n = len(entries)
+    resumen = {"city": {"name": city.get("name"), "country": city.get("country"), "timezone": offset}, "days": []}
+    if "stale" in forecast:
+        resumen["stale"] = forecast["stale"]
+    if n == 0:
+        return resumen
+
+    dt = np.fromiter((e["dt"] for e in entries), dtype=np.int64, count=n)
+    temp = np.fromiter((e["main"]["temp"] for e in entries), dtype=np.float64, count=n)
+    temp_min = np.fromiter((e["main"]["temp_min"] for e in entries), dtype=np.float64, count=n)
+    temp_max = np.fromiter((e["main"]["temp_max"] for e in entries), dtype=np.float64, count=n)
+    condition = np.fromiter((e["weather"][0]["id"] for e in entries), dtype=np.int64, count=n)
+
+    # Día local de cada entrada y agrupación por día
+    local_day = (dt + offset) // SEGUNDOS_POR_DIA
+    days, day_index, samples = np.unique(local_day, return_inverse=True, return_counts=True)
+    order = np.argsort(day_index, kind="stable")
+    starts = np.concatenate(([0], np.cumsum(samples)[:-1]))
+    day_min = np.minimum.reduceat(temp_min[order], starts)
+    day_max = np.maximum.reduceat(temp_max[order], starts)
+    day_mean = np.add.reduceat(temp[order], starts) / samples
+
+    # Condición dominante: frecuencia de cada par (día, condición) y la más frecuente por día
+    pair = day_index * 1000 + condition
+    pairs, first_entry, pair_counts = np.unique(pair, return_index=True, return_counts=True)
+    pair_day = pairs // 1000
+    best = np.lexsort((-pair_counts, pair_day))
+    is_first = np.concatenate(([True], pair_day[best][1:] != pair_day[best][:-1]))
+    dominant_entry = first_entry[best][is_first]
+
+    resultado = []
+    for i, day in enumerate(days):
+        weather = entries[dominant_entry[i]]["weather"][0]
+        resultado.append({
+            "date": datetime.fromtimestamp(int(day) * SEGUNDOS_POR_DIA, tz=timezone.utc).date().isoformat(),
+            "temp_min": round(float(day_min[i]), 1),
+            "temp_max": round(float(day_max[i]), 1),
+            "temp_mean": round(float(day_mean[i]), 1),
+            "condition_id": weather["id"],
+            "condition": weather["main"],
+            "description": weather["description"],
+            # Para el resumen del día se usa siempre la variante diurna del ícono
+            "icon": weather["icon"][:2] + "d",
+            "samples": int(samples[i]),
+        })
+
+    resumen["days"] = resultado
+    return resumen
@@ -0,0 +1,152 @@
+"""
+Almacén persistente de observaciones del clima actual, respaldado por SQLite.
+
+Cada observación descargada de OpenWeather se agrega (solo inserción) a una tabla indexada por
+ciudad y marca de tiempo. Las escrituras se agrupan en lotes, y las consultas de historial
+devuelven agregados por intervalo (mínimo, media y máximo) calculados en SQL.
+
+`add` se llama desde el bucle de eventos y solo encola la observación; las escrituras y consultas
+en disco se hacen en hilos (`run_flusher` y `asyncio.to_thread`), de modo que nunca bloquean el bucle.
+"""
+
+import asyncio
+import sqlite3
+import threading
+from collections import deque
+
+METRICAS = ("temp", "pressure", "humidity", "wind_speed")
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS observations (
+    city TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    name TEXT,
+    temp REAL,
+    pressure REAL,
+    humidity REAL,
+    wind_speed REAL,
+    PRIMARY KEY (city, ts)
+) WITHOUT ROWID
+"""
+
+
+def _fila(city, weather_data):
+    main = weather_data.get("main", {})
+    return (
+        city,
+        int(weather_data["dt"]),
+        weather_data.get("name"),
+        main.get("temp"),
+        main.get("pressure"),
+        main.get("humidity"),
+        weather_data.get("wind", {}).get("speed"),
+    )
+
+
+class ObservationStore:
+    """
+    Historial de observaciones con escrituras por lotes.
+
+    Parámetros:
+    - path (str): Ruta del archivo SQLite (":memory:" para pruebas).
+    - batch_size (int): Observaciones pendientes que adelantan la siguiente escritura de `run_flusher`.
+    - flush_interval (float): Segundos entre escrituras periódicas de lo pendiente.
+    """
+
+    def __init__(self, path, batch_size=100, flush_interval=5.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # Protege la conexión; solo lo toman los hilos que escriben o consultan, nunca `add`
+        self._lock = threading.Lock()
+        # deque: `append` y `popleft` son seguros entre hilos sin necesidad de lock
+        self._pending = deque()
+        self._lote_lleno = asyncio.Event()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_ESQUEMA)
+        self._conn.commit()
+
+    def add(self, city, weather_data):
+        """
+        Agrega una observación a la cola de escritura, sin tocar el disco.
+
+        Parámetros:
+        - city (str): Clave normalizada de la ciudad.
+        - weather_data (dict): Respuesta de OpenWeather para el clima actual (debe incluir "dt").
+        """
+        if "dt" not in weather_data:
+            return
+        self._pending.append(_fila(city, weather_data))
+        if len(self._pending) >= self.batch_size:
+            self._lote_lleno.set()
+
+    def flush(self):
+        """
+        Escribe en disco todas las observaciones pendientes en una sola transacción.
+        """
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        filas = [self._pending.popleft() for _ in range(len(self._pending))]
+        if not filas:
+            return
+        # Una misma observación (ciudad, dt) puede llegar varias veces: se ignora la repetida
+        self._conn.executemany("INSERT OR IGNORE INTO observations VALUES (?, ?, ?, ?, ?, ?, ?)", filas)
+        self._conn.commit()
+
+    def history(self, city, start, end, bucket):
+        """
+        Devuelve el historial de una ciudad agregado por intervalos de `bucket` segundos.
+
+        Parámetros:
+        - city (str): Clave normalizada de la ciudad.
+        - start (int): Inicio del rango (segundos Unix, inclusivo).
+        - end (int): Fin del rango (segundos Unix, exclusivo).
+        - bucket (int): Tamaño de cada intervalo en segundos.
+
+        Devuelve:
+        - dict: Formato columnar {"ts": [...], "count": [...], "temp": {"min": [...], "mean": [...],
+                "max": [...]}, ...}, con un elemento por intervalo que tenga observaciones.
+        """
+        columnas = ", ".join(f"MIN({m}), AVG({m}), MAX({m})" for m in METRICAS)
+        with self._lock:
+            self._flush_locked()
+            filas = self._conn.execute(
+                f"SELECT (ts / :bucket) * :bucket AS b, COUNT(*), {columnas} "
+                "FROM observations WHERE city = :city AND ts >= :start AND ts < :end "
+                "GROUP BY b ORDER BY b",
+                {"bucket": bucket, "city": city, "start": start, "end": end},
+            ).fetchall()
+
+        resultado = {"ts": [fila[0] for fila in filas], "count": [fila[1] for fila in filas]}
+        for i, metrica in enumerate(METRICAS):
+            base = 2 + 3 * i
+            resultado[metrica] = {
+                "min": [fila[base] for fila in filas],
+                "mean": [None if fila[base + 1] is None else round(fila[base + 1], 2) for fila in filas],
+                "max": [fila[base + 2] for fila in filas],
+            }
+        return resultado
+
+    async def run_flusher(self):
+        """
+        Escribe las observaciones pendientes en un hilo cada `flush_interval` segundos, o antes si
+        se acumulan `batch_size` (tarea de fondo del servicio).
+        """
+        while True:
+            try:
+                await asyncio.wait_for(self._lote_lleno.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._lote_lleno.clear()
+            await asyncio.to_thread(self.flush)
+
+    def close(self):
+        """
+        Escribe lo pendiente y cierra la conexión.
+        """
+        with self._lock:
+            self._flush_locked()
+            self._conn.close()
@@ -0,0 +1,100 @@
+"""
+Buffer circular de capacidad fija, respaldado por NumPy, para las series de tiempo en vivo.
+
+Cada métrica (temperatura, presión, humedad) guarda sus marcas de tiempo y valores en dos
+arreglos preasignados, de modo que agregar un punto es O(1) y la memoria por sesión no
+crece durante un seguimiento largo.
+"""
+
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Serie de tiempo acotada: al llenarse, cada punto nuevo reemplaza al más antiguo.
+
+    Parámetros:
+    - capacity (int): Número máximo de puntos que se conservan.
+    """
+
+    def __init__(self, capacity):
+        if capacity <= 0:
+            raise ValueError("capacity debe ser mayor que 0")
+        self.capacity = capacity
+        self._times = np.empty(capacity, dtype="datetime64[s]")
+        self._values = np.empty(capacity, dtype=np.float64)
+        self._start = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def full(self):
+        return self._size == self.capacity
+
+    @property
+    def nbytes(self):
+        """
+        Memoria ocupada por los arreglos del buffer (constante durante toda la sesión).
+        """
+        return self._times.nbytes + self._values.nbytes
+
+    def append(self, timestamp, value):
+        """
+        Agrega un punto al final de la serie, descartando el más antiguo si está lleno.
+
+        Parámetros:
+        - timestamp (datetime | numpy.datetime64): Momento de la observación.
+        - value (float): Valor observado.
+        """
+        end = (self._start + self._size) % self.capacity
+        self._times[end] = np.datetime64(timestamp, "s")
+        self._values[end] = value
+        if self.full:
+            self._start = (self._start + 1) % self.capacity
+        else:
+            self._size += 1
+
+    def _ordenar(self, arreglo):
+        end = self._start + self._size
+        if end <= self.capacity:
+            return arreglo[self._start:end].copy()
+        return np.concatenate((arreglo[self._start:], arreglo[:end - self.capacity]))
+
+    def times(self):
+        """
+        Devuelve las marcas de tiempo en orden cronológico (copia).
+        """
+        return self._ordenar(self._times)
+
+    def values(self):
+        """
+        Devuelve los valores en orden cronológico (copia).
+        """
+        return self._ordenar(self._values)
+
+    def downsample(self, max_points):
+        """
+        Reduce la serie a lo sumo a `max_points` puntos conservando mínimos y máximos.
+
+        La serie se divide en `max_points // 2` tramos y de cada uno se conservan el punto
+        mínimo y el máximo, en orden cronológico, de modo que los picos siguen visibles
+        en el gráfico.
+
+        Parámetros:
+        - max_points (int): Número máximo de puntos a devolver (al menos 2).
+
+        Devuelve:
+        - tuple(numpy.ndarray, numpy.ndarray): Marcas de tiempo y valores reducidos.
+        """
+        times, values = self.times(), self.values()
+        if len(values) <= max_points or max_points < 2:
+            return times, values
+
+        edges = np.linspace(0, len(values), max_points // 2 + 1).astype(int)
+        # Ordenar por (tramo, valor): en cada tramo el primer índice es el mínimo y el último el máximo
+        tramos = np.repeat(np.arange(len(edges) - 1), np.diff(edges))
+        orden = np.lexsort((values, tramos))
+        indices = np.unique(np.concatenate((orden[edges[:-1]], orden[edges[1:] - 1])))
+        return times[indices], values[indices]
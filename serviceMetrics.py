@@ -0,0 +1,216 @@
+"""
+Métricas del servicio en formato de exposición de texto de Prometheus.
+
+Implementación mínima (sin dependencias) de contadores, gauges e histogramas con etiquetas,
+suficiente para exponer latencias por ruta, llamadas al upstream y solicitudes en curso
+en un endpoint `/metrics`.
+"""
+
+import bisect
+import threading
+import time
+
+# Límites de los histogramas de latencia, en segundos
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _formatear_etiquetas(nombres, valores, extra=None):
+    pares = list(zip(nombres, valores))
+    if extra:
+        pares.append(extra)
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in pares) + "}"
+
+
+def _formatear_valor(valor):
+    if valor == float("inf"):
+        return "+Inf"
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _clave(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} espera las etiquetas {self.labelnames}")
+        return tuple(labels[name] for name in self.labelnames)
+
+    def render(self):
+        lineas = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.tipo}"]
+        with self._lock:
+            for clave, valor in sorted(self._values.items()):
+                lineas.append(f"{self.name}{_formatear_etiquetas(self.labelnames, clave)} {_formatear_valor(valor)}")
+        return lineas
+
+
+class Counter(_Metrica):
+    """
+    Contador monótono. Su nombre debe terminar en `_total`, como pide la convención de Prometheus.
+    """
+    tipo = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        if not name.endswith("_total"):
+            raise ValueError(f"El nombre del contador {name} debe terminar en _total")
+        super().__init__(name, documentation, labelnames)
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("Un contador no puede decrecer")
+        clave = self._clave(labels)
+        with self._lock:
+            self._values[clave] = self._values.get(clave, 0) + amount
+
+    def set_total(self, value, **labels):
+        """
+        Fija el valor acumulado, para reflejar desde un collector un contador que lleva otro
+        objeto (p. ej. los aciertos de una caché). Un valor menor que el anterior se expone tal
+        cual y Prometheus lo interpreta como un reinicio del contador.
+        """
+        clave = self._clave(labels)
+        with self._lock:
+            self._values[clave] = value
+
+
+class Gauge(_Metrica):
+    """
+    Valor que puede subir y bajar (p. ej. solicitudes en curso, tamaño de una cola).
+    """
+    tipo = "gauge"
+
+    def inc(self, amount=1, **labels):
+        clave = self._clave(labels)
+        with self._lock:
+            self._values[clave] = self._values.get(clave, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        clave = self._clave(labels)
+        with self._lock:
+            self._values[clave] = value
+
+
+class Histogram(_Metrica):
+    """
+    Histograma acumulativo con límites fijos, suma y conteo por combinación de etiquetas.
+    """
+    tipo = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        clave = self._clave(labels)
+        with self._lock:
+            serie = self._values.get(clave)
+            if serie is None:
+                serie = self._values[clave] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            serie[0][bisect.bisect_left(self.buckets, value)] += 1
+            serie[1] += value
+            serie[2] += 1
+
+    def render(self):
+        lineas = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for clave, (conteos, suma, total) in sorted(self._values.items()):
+                acumulado = 0
+                for limite, conteo in zip(self.buckets + (float("inf"),), conteos):
+                    acumulado += conteo
+                    etiquetas = _formatear_etiquetas(self.labelnames, clave, ("le", _formatear_valor(limite)))
+                    lineas.append(f"{self.name}_bucket{etiquetas} {acumulado}")
+                etiquetas = _formatear_etiquetas(self.labelnames, clave)
+                lineas.append(f"{self.name}_sum{etiquetas} {_formatear_valor(suma)}")
+                lineas.append(f"{self.name}_count{etiquetas} {total}")
+        return lineas
+
+
+def instrumentar(app, duration, in_flight):
+    """
+    Agrega a una aplicación FastAPI un middleware que mide cada solicitud.
+
+    La etiqueta `route` es la plantilla de la ruta (p. ej. "/weather/{city}") y no la ruta
+    concreta, para que el número de series no crezca con cada ciudad; las solicitudes que no
+    coinciden con ninguna ruta se agrupan en "unmatched".
+
+    Parámetros:
+    - app (fastapi.FastAPI): Aplicación a instrumentar.
+    - duration (Histogram): Histograma con etiquetas ("method", "route", "status").
+    - in_flight (Gauge): Gauge de solicitudes en curso, sin etiquetas.
+    """
+
+    @app.middleware("http")
+    async def medir_solicitudes(request, call_next):
+        in_flight.inc()
+        inicio = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            in_flight.dec()
+            route = request.scope.get("route")
+            duration.observe(
+                time.perf_counter() - inicio,
+                method=request.method,
+                route=route.path if route is not None else "unmatched",
+                status=str(status),
+            )
+
+
+class Registry:
+    """
+    Conjunto de métricas que se exponen juntas.
+
+    Además de las métricas registradas, acepta funciones `collector()` que actualizan
+    gauges y contadores justo antes de exponerlos (p. ej. el tamaño y los aciertos de una caché).
+    """
+
+    def __init__(self):
+        self._metricas = []
+        self._collectors = []
+
+    def register(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self):
+        """
+        Devuelve todas las métricas en formato de texto de Prometheus (versión 0.0.4).
+        """
+        for collector in self._collectors:
+            collector()
+        lineas = []
+        for metrica in self._metricas:
+            lineas.extend(metrica.render())
+        return "\n".join(lineas) + "\n"
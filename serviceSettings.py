@@ -0,0 +1,110 @@
+"""
+Configuración del servicio del clima, independiente del front end.
+
+Cada opción se busca, en este orden:
+
+1. La variable de entorno con su nombre (p. ej. `CACHE_CURRENT_TTL`).
+2. Un archivo indicado por la variable `<NOMBRE>_FILE` (p. ej. `OPENWEATHER_API_KEY_FILE`), como
+   los secretos de Docker o Kubernetes montados en archivos.
+3. El archivo de configuración TOML (`CLIMA_SETTINGS_FILE`, por defecto `settings.toml`).
+4. El archivo de secretos TOML (`CLIMA_SECRETS_FILE`, por defecto `.streamlit/secrets.toml`, el
+   mismo que usa la aplicación de Streamlit; su `api_key` equivale a `OPENWEATHER_API_KEY`).
+
+En los archivos TOML los nombres no distinguen mayúsculas y las tablas se aplanan con "_":
+`[cache] current_ttl = 60` equivale a `CACHE_CURRENT_TTL=60`. Los valores se devuelven como texto,
+igual que las variables de entorno (las listas unidas por comas y los booleanos como "1"/"0").
+"""
+
+import os
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11: se usa el paquete toml de requirements.txt
+    tomllib = None
+    import toml
+
+# Nombres heredados de los archivos de secretos de Streamlit
+ALIAS = {"API_KEY": "OPENWEATHER_API_KEY"}
+
+
+def _texto(valor):
+    if isinstance(valor, bool):
+        return "1" if valor else "0"
+    if isinstance(valor, (list, tuple)):
+        return ",".join(_texto(v) for v in valor)
+    return str(valor)
+
+
+def _aplanar(tabla, prefijo=""):
+    valores = {}
+    for clave, valor in tabla.items():
+        nombre = (prefijo + "_" + clave if prefijo else clave).upper()
+        if isinstance(valor, dict):
+            valores.update(_aplanar(valor, nombre))
+        else:
+            valores[ALIAS.get(nombre, nombre)] = _texto(valor)
+    return valores
+
+
+def leer_toml(path):
+    """
+    Lee un archivo TOML y aplana sus tablas en nombres de opción.
+
+    Parámetros:
+    - path (str): Ruta del archivo.
+
+    Devuelve:
+    - dict: {NOMBRE: valor como texto}, vacío si el archivo no existe.
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    if tomllib is None:
+        return _aplanar(toml.load(path))
+    with open(path, "rb") as archivo:
+        return _aplanar(tomllib.load(archivo))
+
+
+class Settings:
+    """
+    Opciones del servicio tomadas del entorno, de archivos de secretos y de archivos TOML.
+
+    Parámetros:
+    - files (list): Diccionarios de opciones de los archivos, en orden de prioridad.
+    - environ (Mapping): Variables de entorno; por defecto `os.environ`.
+    """
+
+    def __init__(self, files=(), environ=None):
+        self.files = list(files)
+        self.environ = os.environ if environ is None else environ
+
+    @classmethod
+    def load(cls, environ=None):
+        """
+        Carga el archivo de configuración y el de secretos indicados en el entorno.
+
+        Devuelve:
+        - Settings: Configuración lista para consultar.
+        """
+        environ = os.environ if environ is None else environ
+        archivos = [
+            leer_toml(environ.get("CLIMA_SETTINGS_FILE", "settings.toml")),
+            leer_toml(environ.get("CLIMA_SECRETS_FILE", os.path.join(".streamlit", "secrets.toml"))),
+        ]
+        return cls(archivos, environ)
+
+    def get(self, name, default=None):
+        """
+        Devuelve el valor de la opción `name` como texto, o `default` si no está definida.
+
+        Acepta los mismos argumentos que `os.getenv`, al que reemplaza en el servicio.
+        """
+        if name in self.environ:
+            return self.environ[name]
+        archivo = self.environ.get(name + "_FILE")
+        if archivo:
+            with open(archivo, encoding="utf-8") as secreto:
+                return secreto.read().strip()
+        for valores in self.files:
+            if name in valores:
+                return valores[name]
+        return default
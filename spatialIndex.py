@@ -0,0 +1,155 @@
+"""
+Índice espacial de celdas de una rejilla de latitud/longitud para la caché de pronósticos.
+
+Las coordenadas de cada solicitud se ajustan a una rejilla de resolución fija (en grados), de
+modo que los puntos que caen en la misma celda comparten un pronóstico. Las celdas con datos
+se guardan en un hash de rejilla (`set` de índices enteros), lo que permite buscar la celda
+con datos frescos más cercana revisando solo las celdas vecinas dentro de una tolerancia.
+"""
+
+import math
+
+RADIO_TIERRA_KM = 6371.0088
+KM_POR_GRADO = math.pi * RADIO_TIERRA_KM / 180
+
+
+def distancia_km(lat1, lon1, lat2, lon2):
+    """
+    Distancia de gran círculo (fórmula del haversine) entre dos puntos, en kilómetros.
+    """
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dlat = p2 - p1
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dlon / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GridIndex:
+    """
+    Rejilla regular de celdas de `resolution` grados con un registro de las celdas con datos.
+
+    Parámetros:
+    - resolution (float): Tamaño de la celda en grados (0.05° son unos 5.5 km de latitud). Debe
+        dividir 360 en un número entero de columnas, para que la última columna se una con la
+        primera en el antimeridiano.
+    - tolerance_km (float): Distancia máxima entre el punto pedido y el centro de una celda
+        vecina para reutilizar sus datos.
+    - is_fresh (callable): Recibe la clave de caché de una celda y devuelve si sus datos siguen
+        frescos (p. ej. `TTLCache.has`).
+    - max_cells (int): Celdas registradas antes de purgar las que ya no tienen datos frescos.
+    """
+
+    def __init__(self, resolution, tolerance_km=0.0, is_fresh=lambda key: True, max_cells=4096):
+        columnas = round(360 / resolution) if resolution > 0 else 0
+        if columnas < 1 or not math.isclose(columnas * resolution, 360, abs_tol=1e-9):
+            raise ValueError(f"La resolución de la rejilla ({resolution}°) debe dividir 360 grados")
+        self.resolution = resolution
+        self.tolerance_km = tolerance_km
+        self.is_fresh = is_fresh
+        self.max_cells = max_cells
+        self._columnas = columnas
+        self._celdas = set()
+        self.exact = 0
+        self.nearby = 0
+        self.misses = 0
+
+    def snap(self, lat, lon):
+        """
+        Devuelve la celda (fila, columna) cuyo centro está más cerca de (lat, lon).
+        """
+        fila = round(max(-90.0, min(90.0, lat)) / self.resolution)
+        columna = round(lon / self.resolution) % self._columnas
+        return fila, columna
+
+    def center(self, celda):
+        """
+        Devuelve las coordenadas (lat, lon) del centro de una celda, redondeadas a 4 decimales.
+        """
+        fila, columna = celda
+        lon = columna * self.resolution
+        if lon >= 180:
+            lon -= 360
+        return round(fila * self.resolution, 4), round(lon, 4)
+
+    def key(self, celda):
+        """
+        Clave de caché de una celda: las coordenadas de su centro, p. ej. "19.45,-99.15".
+        """
+        lat, lon = self.center(celda)
+        return f"{lat},{lon}"
+
+    def add(self, celda):
+        """
+        Registra que una celda tiene datos en la caché.
+        """
+        self._celdas.add(celda)
+        if len(self._celdas) > self.max_cells:
+            self.prune()
+
+    def _vecinas(self, lat, lon):
+        filas = math.ceil(self.tolerance_km / (KM_POR_GRADO * self.resolution))
+        cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+        columnas = min(self._columnas // 2, math.ceil(filas / cos_lat))
+        fila0, columna0 = self.snap(lat, lon)
+        for df in range(-filas, filas + 1):
+            for dc in range(-columnas, columnas + 1):
+                yield fila0 + df, (columna0 + dc) % self._columnas
+
+    def lookup(self, lat, lon):
+        """
+        Busca la celda con datos frescos más cercana a (lat, lon).
+
+        La celda propia del punto siempre se acepta; una celda vecina solo si su centro está a
+        `tolerance_km` o menos. Las celdas cuyos datos ya no son frescos se quitan del índice.
+
+        Parámetros:
+        - lat (float): Latitud pedida.
+        - lon (float): Longitud pedida.
+
+        Devuelve:
+        - tuple: Celda (fila, columna) más cercana con datos frescos, o None.
+        """
+        propia = self.snap(lat, lon)
+        if propia in self._celdas:
+            if self.is_fresh(self.key(propia)):
+                self.exact += 1
+                return propia
+            self._celdas.discard(propia)
+
+        mejor, mejor_distancia = None, self.tolerance_km
+        if self.tolerance_km > 0:
+            for celda in self._vecinas(lat, lon):
+                if celda == propia or celda not in self._celdas:
+                    continue
+                distancia = distancia_km(lat, lon, *self.center(celda))
+                if distancia > mejor_distancia:
+                    continue
+                if not self.is_fresh(self.key(celda)):
+                    self._celdas.discard(celda)
+                    continue
+                mejor, mejor_distancia = celda, distancia
+        if mejor is None:
+            self.misses += 1
+        else:
+            self.nearby += 1
+        return mejor
+
+    def prune(self):
+        """
+        Quita del índice las celdas cuyos datos ya no son frescos (expirados o desalojados).
+        """
+        self._celdas = {celda for celda in self._celdas if self.is_fresh(self.key(celda))}
+
+    def stats(self):
+        """
+        Devuelve la configuración de la rejilla y cuántas búsquedas se resolvieron en la
+        celda propia, en una celda vecina o sin datos.
+        """
+        return {
+            "resolution": self.resolution,
+            "tolerance_km": self.tolerance_km,
+            "cells": len(self._celdas),
+            "exact": self.exact,
+            "nearby": self.nearby,
+            "misses": self.misses,
+        }
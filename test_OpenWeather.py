@@ -0,0 +1,331 @@
+import importlib
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import httpx
+from fastapi.testclient import TestClient
+
+from upstreamQuota import QuotaScheduler
+
+
+# python -m unittest test_OpenWeather.py
+
+# El servicio se carga apuntado a un OpenWeather simulado, sin cuota, reintentos ni coberturas
+ENTORNO = {
+    "OPENWEATHER_API_KEY": "test",
+    "OPENWEATHER_BASE_URL": "http://upstream.test/data/2.5",
+    "OPENWEATHER_ICON_URL": "http://upstream.test/img/wn/{}@2x.png",
+    "OPENWEATHER_CALLS_PER_MINUTE": "0",
+    "UPSTREAM_RETRIES": "0",
+    "UPSTREAM_HEDGE_QUANTILE": "0",
+    "CACHE_BACKEND": "memory",
+    "CACHE_PREWARM_CITIES": "",
+    "ASSETS_CACHE_DIR": "",
+    "ASSETS_PRECOMPUTE": "0",
+}
+
+
+def cargar_servicio(**opciones):
+    """
+    Importa (o vuelve a importar) OpenWeather.py con las opciones dadas, con cachés, historial
+    y aplicación nuevos.
+    """
+    with mock.patch.dict(os.environ, {**ENTORNO, **opciones}):
+        if "OpenWeather" in sys.modules:
+            return importlib.reload(sys.modules["OpenWeather"])
+        return importlib.import_module("OpenWeather")
+
+
+def clima(name, temp=12.0, dt=None):
+    return {
+        "name": name,
+        "weather": [{"id": 500, "main": "Rain", "description": "lluvia ligera", "icon": "10d"}],
+        "main": {"temp": temp, "feels_like": temp - 1, "temp_min": temp - 2, "temp_max": temp + 2,
+                 "pressure": 1012, "humidity": 80},
+        "sys": {"country": "GB", "sunrise": 1697610000, "sunset": 1697648000},
+        "coord": {"lat": 51.5, "lon": -0.12},
+        "wind": {"speed": 4.1, "deg": 200},
+        "visibility": 10000,
+        "timezone": 3600,
+        "dt": int(time.time()) if dt is None else dt,
+    }
+
+
+def pronostico(inicio=1697670000, entradas=16):
+    # Entradas cada 3 horas desde las 00:00 locales (UTC+1) de un día
+    return {
+        "city": {"name": "London", "country": "GB", "timezone": 3600},
+        "list": [
+            {"dt": inicio + i * 10800, "main": {"temp": 10.0 + i, "temp_min": 10.0 + i, "temp_max": 10.0 + i,
+                                               "pressure": 1010, "humidity": 70},
+             "weather": [{"id": 500, "main": "Rain", "description": "lluvia ligera", "icon": "10d"}],
+             "wind": {"speed": 3.0, "deg": 180}}
+            for i in range(entradas)
+        ],
+    }
+
+
+class FakeOpenWeather:
+    """
+    OpenWeather simulado para `httpx.MockTransport`: cuenta las llamadas por endpoint.
+
+    "Atlantis" no existe (404) y "Roto" responde 200 con un cuerpo que no es JSON. Con `fallar`,
+    todas las llamadas responden 503.
+    """
+
+    def __init__(self):
+        self.llamadas = []
+        self.fallar = False
+
+    def contar(self, endpoint):
+        return sum(1 for url in self.llamadas if url.path.endswith("/" + endpoint))
+
+    def __call__(self, request):
+        self.llamadas.append(request.url)
+        if self.fallar:
+            return httpx.Response(503)
+        if request.url.path.startswith("/img/"):
+            return httpx.Response(200, content=b"\x89PNG icono", headers={"Content-Type": "image/png"})
+        ciudad = request.url.params.get("q", "").split(",")[0]
+        if ciudad == "Atlantis":
+            return httpx.Response(404, json={"cod": "404", "message": "city not found"})
+        if ciudad == "Roto":
+            return httpx.Response(200, content=b"<html>Bad gateway</html>")
+        if request.url.path.endswith("/forecast"):
+            return httpx.Response(200, json=pronostico())
+        return httpx.Response(200, json=clima(ciudad))
+
+
+class ServicioSimulado(unittest.TestCase):
+    # Opciones del entorno de cada clase de pruebas, además de ENTORNO
+    opciones = {}
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+        self.upstream = FakeOpenWeather()
+        self.servicio = cargar_servicio(HISTORY_DB_PATH=os.path.join(self.directorio.name, "observations.db"),
+                                        **self.opciones)
+        cliente = lambda: httpx.AsyncClient(transport=httpx.MockTransport(self.upstream))
+        parche = mock.patch.object(self.servicio, "crear_cliente_http", cliente)
+        parche.start()
+        self.addCleanup(parche.stop)
+        self.client = TestClient(self.servicio.app)
+        self.client.__enter__()
+        self.addCleanup(self.client.__exit__, None, None, None)
+
+
+class TestOpenWeather(ServicioSimulado):
+
+    def test_lote_agrupa_nombres_y_separa_errores(self):
+        respuesta = self.client.get("/weather", params={"cities": "London, london ,Londres,Paris,Atlantis"})
+        self.assertEqual(respuesta.status_code, 200)
+        datos = respuesta.json()
+        self.assertEqual(sorted(datos["results"]), ["London", "Londres", "Paris"])
+        self.assertEqual(datos["errors"], {"Atlantis": {"status": 404, "detail": "City not found"}})
+        # "London" y su alias "Londres" comparten una sola llamada
+        self.assertEqual(self.upstream.contar("weather"), 3)
+
+        # Un lote nunca hace más llamadas que las mismas solicitudes una por una
+        for city in ("London", "Paris"):
+            self.assertEqual(self.client.get(f"/weather/{city}").status_code, 200)
+        self.assertEqual(self.upstream.contar("weather"), 3)
+
+    def test_lote_sobrevive_a_una_respuesta_que_no_es_json(self):
+        respuesta = self.client.get("/weather", params={"cities": "London,Roto,Paris", "compact": "true"})
+        self.assertEqual(respuesta.status_code, 200)
+        datos = respuesta.json()
+        self.assertEqual(sorted(datos["results"]), ["London", "Paris"])
+        self.assertEqual(datos["results"]["Paris"]["name"], "Paris")
+        self.assertEqual(datos["errors"], {"Roto": {"status": 500, "detail": "API call failed"}})
+
+    def test_lote_vacio_o_demasiado_grande(self):
+        self.assertEqual(self.client.get("/weather", params={"cities": " , "}).status_code, 400)
+        ciudades = ",".join(f"Ciudad {i}" for i in range(self.servicio.BATCH_MAX_CITIES + 1))
+        self.assertEqual(self.client.get("/weather", params={"cities": ciudades}).status_code, 400)
+        self.assertEqual(self.upstream.llamadas, [])
+
+
+    def test_historial_por_intervalos(self):
+        store = self.servicio.observation_store
+        store.add("london,gb", clima("London", temp=10.0, dt=7200))
+        store.add("london,gb", clima("London", temp=14.0, dt=7300))
+        store.add("london,gb", clima("London", temp=20.0, dt=10800))
+
+        datos = self.client.get("/weather/London/history", params={"start": 3600, "end": 10800}).json()
+        self.assertEqual((datos["city"], datos["bucket"]), ("london,gb", 3600))
+        # `end` es exclusivo: la observación de las 10800 queda fuera
+        self.assertEqual((datos["ts"], datos["count"]), ([7200], [2]))
+        self.assertEqual(datos["temp"], {"min": [10.0], "mean": [12.0], "max": [14.0]})
+        datos = self.client.get("/weather/Londres/history", params={"start": 0, "end": 14400, "bucket": 7200}).json()
+        self.assertEqual((datos["ts"], datos["count"]), ([7200], [3]))
+        self.assertEqual(datos["temp"]["max"], [20.0])
+        # Fuera del rango no hay intervalos
+        datos = self.client.get("/weather/London/history", params={"start": 0, "end": 7200}).json()
+        self.assertEqual((datos["ts"], datos["count"]), ([], []))
+
+    def test_historial_incluye_la_ultima_observacion(self):
+        self.assertEqual(self.client.get("/weather/London").status_code, 200)
+        datos = self.client.get("/weather/London/history").json()
+        self.assertEqual(sum(datos["count"]), 1)
+        self.assertEqual(datos["temp"]["max"], [12.0])
+        self.assertGreater(datos["end"], time.time())
+
+    def test_historial_valida_el_rango_y_el_intervalo(self):
+        for params in ({"bucket": 0}, {"bucket": -60}, {"start": 100, "end": 100},
+                       {"start": 0, "end": 3600 * (self.servicio.HISTORY_MAX_BUCKETS + 1)}):
+            self.assertEqual(self.client.get("/weather/London/history", params=params).status_code, 400, params)
+
+
+    def test_pronostico_diario_por_dia_local(self):
+        datos = self.client.get("/forecast/daily", params={"lat": 51.5085, "lon": -0.1257}).json()
+        self.assertEqual(datos["city"], {"name": "London", "country": "GB", "timezone": 3600})
+        # La primera entrada es a las 23:00 UTC, ya las 00:00 del día siguiente en hora local
+        self.assertEqual([d["date"] for d in datos["days"]], ["2023-10-19", "2023-10-20"])
+        self.assertEqual([d["samples"] for d in datos["days"]], [8, 8])
+        self.assertEqual((datos["days"][0]["temp_min"], datos["days"][0]["temp_max"]), (10.0, 17.0))
+        self.assertEqual((datos["days"][1]["temp_mean"], datos["days"][1]["icon"]), (21.5, "10d"))
+        # Comparte la caché de /forecast
+        self.client.get("/forecast", params={"lat": 51.5085, "lon": -0.1257})
+        self.assertEqual(self.upstream.contar("forecast"), 1)
+
+
+    def test_paquete_con_una_llamada_por_endpoint(self):
+        datos = self.client.get("/weather/London/bundle").json()
+        self.assertEqual(datos["current"]["name"], "London")
+        self.assertEqual(len(datos["forecast"]["days"]), 2)
+        self.assertNotIn("forecast_error", datos)
+        self.assertEqual((self.upstream.contar("weather"), self.upstream.contar("forecast")), (1, 1))
+        # Las consultas siguientes salen de la caché
+        self.client.get("/weather/Londres/bundle")
+        self.assertEqual(len(self.upstream.llamadas), 2)
+
+    def test_paquete_de_ciudad_desconocida(self):
+        respuesta = self.client.get("/weather/Atlantis/bundle")
+        self.assertEqual((respuesta.status_code, respuesta.json()["detail"]), (404, "City not found"))
+
+    def test_paquete_compacto_y_por_campos(self):
+        datos = self.client.get("/weather/London/bundle", params={"compact": "true"}).json()
+        self.assertNotIn("visibility", datos["current"])
+        self.assertEqual(datos["current"]["weather"][0]["description"], "lluvia ligera")
+        datos = self.client.get("/weather/London/bundle", params={"fields": "name,main"}).json()
+        self.assertEqual(sorted(datos["current"]), ["main", "name"])
+        self.assertEqual(datos["forecast"]["city"]["name"], "London")
+
+
+    def test_pronostico_reutiliza_la_celda_vecina(self):
+        for lat in (19.45, 19.476):
+            respuesta = self.client.get("/forecast", params={"lat": lat, "lon": -99.15})
+            self.assertEqual(respuesta.status_code, 200)
+        # A unos 3 km de la primera celda: se reutiliza sin llamar a OpenWeather
+        self.assertEqual(self.upstream.contar("forecast"), 1)
+        self.client.get("/forecast/daily", params={"lat": 19.60, "lon": -99.15})
+        self.assertEqual(self.upstream.contar("forecast"), 2)
+        grid = self.client.get("/cache/stats").json()["forecast_grid"]
+        self.assertEqual((grid["nearby"], grid["cells"]), (1, 2))
+
+    def test_resolucion_de_rejilla_invalida(self):
+        with self.assertRaises(ValueError):
+            cargar_servicio(FORECAST_GRID_RESOLUTION="0.07")
+
+    def verificar_etag(self, ruta, tipo):
+        respuesta = self.client.get(ruta)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.headers["content-type"], tipo)
+        self.assertEqual(respuesta.headers["cache-control"], f"public, max-age={self.servicio.ASSETS_MAX_AGE}")
+        etag = respuesta.headers["etag"]
+        self.assertTrue(etag and respuesta.content)
+
+        respuesta = self.client.get(ruta, headers={"If-None-Match": f'"otro", {etag}'})
+        self.assertEqual((respuesta.status_code, respuesta.content), (304, b""))
+        self.assertEqual(respuesta.headers["etag"], etag)
+        self.assertEqual(self.client.get(ruta, headers={"If-None-Match": '"otro"'}).status_code, 200)
+
+    def test_fondos_con_etag_y_304(self):
+        self.verificar_etag("/assets/backgrounds/clear_n.webp?w=640", "image/webp")
+        self.verificar_etag("/assets/backgrounds/cloudy.jpg", "image/jpeg")
+        self.assertEqual(self.client.get("/assets/backgrounds/clear.gif").status_code, 404)
+        self.assertEqual(self.client.get("/assets/backgrounds/volcanic.jpg").status_code, 404)
+
+    def test_iconos_con_etag_y_304(self):
+        self.verificar_etag("/assets/icons/10n.png", "image/png")
+        # El ícono se descarga una sola vez
+        self.assertEqual(len(self.upstream.llamadas), 1)
+        self.assertEqual(self.client.get("/assets/icons/99x.png").status_code, 404)
+
+    def test_ciudad_desconocida_se_recuerda(self):
+        for _ in range(3):
+            respuesta = self.client.get("/weather/Atlantis")
+            self.assertEqual((respuesta.status_code, respuesta.json()["detail"]), (404, "City not found"))
+        self.assertEqual(self.client.get("/weather/ atlantis /bundle").status_code, 404)
+        self.assertEqual(self.upstream.contar("weather"), 1)
+        self.assertEqual(self.client.get("/cache/stats").json()["not_found"]["entries"], 1)
+
+
+class TestSinRecordarCiudadesDesconocidas(ServicioSimulado):
+    opciones = {"CITY_NOT_FOUND_TTL": "0"}
+
+    def test_cada_consulta_llega_al_upstream(self):
+        for _ in range(2):
+            self.assertEqual(self.client.get("/weather/Atlantis").status_code, 404)
+        self.assertEqual(self.upstream.contar("weather"), 2)
+
+
+class TestRespaldoConDatosObsoletos(ServicioSimulado):
+    # Las respuestas vencen enseguida y no se revalidan en segundo plano: cada solicitud consulta
+    # OpenWeather y, si falla, recurre a la última respuesta buena
+    opciones = {"CACHE_CURRENT_TTL": "0", "CACHE_CURRENT_REVALIDATE": "0"}
+
+    def agotar_cuota(self):
+        cuota = QuotaScheduler(calls_per_minute=60, burst=1, max_wait=(0.1, 0.1, 0.1))
+        cuota.pause(60)
+        self.servicio.upstream.quota = cuota
+
+    def test_upstream_caido_devuelve_la_ultima_respuesta(self):
+        self.assertNotIn("stale", self.client.get("/weather/London").json())
+        self.upstream.fallar = True
+        datos = self.client.get("/weather/London").json()
+        self.assertEqual(datos["name"], "London")
+        self.assertGreaterEqual(datos["stale"]["age"], 0)
+        datos = self.client.get("/weather/London", params={"compact": "true"}).json()
+        self.assertIn("age", datos["stale"])
+        self.assertEqual(self.upstream.contar("weather"), 3)
+
+    def test_sin_cuota_devuelve_la_ultima_respuesta(self):
+        self.client.get("/weather/London")
+        self.agotar_cuota()
+        datos = self.client.get("/weather/London").json()
+        self.assertEqual((datos["name"], "stale" in datos), ("London", True))
+        self.assertEqual(self.upstream.contar("weather"), 1)
+
+    def test_sin_respuesta_anterior_el_error_se_propaga(self):
+        self.upstream.fallar = True
+        respuesta = self.client.get("/weather/London")
+        self.assertEqual(respuesta.status_code, 503)
+        self.agotar_cuota()
+        respuesta = self.client.get("/weather/Paris")
+        self.assertEqual(respuesta.status_code, 429)
+        self.assertIn("retry-after", respuesta.headers)
+
+
+class TestPrecalentamiento(ServicioSimulado):
+    opciones = {"CACHE_PREWARM_CITIES": "London,Roto,Atlantis,Paris"}
+
+    def test_una_ciudad_que_falla_no_detiene_al_resto(self):
+        limite = time.monotonic() + 5
+        while self.servicio.prewarm_stats["seconds"] is None and time.monotonic() < limite:
+            time.sleep(0.01)
+        prewarm = self.client.get("/cache/stats").json()["prewarm"]
+        self.assertEqual((prewarm["cities"], prewarm["warmed"], prewarm["failed"]), (4, 2, 2))
+        # Las ciudades precalentadas ya están en caché
+        llamadas = len(self.upstream.llamadas)
+        self.client.get("/weather/Paris/bundle")
+        self.assertEqual(len(self.upstream.llamadas), llamadas)
+
+
+if __name__ == '__main__':
+    unittest.main()
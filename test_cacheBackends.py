@@ -0,0 +1,168 @@
+import asyncio
+import os
+import socket
+import tempfile
+import unittest
+from urllib.parse import urlparse
+
+from cacheBackends import CacheBackendError, MemoryBackend, RedisBackend, SQLiteBackend, crear_backend
+from weatherCache import TTLCache
+
+
+# python -m unittest test_cacheBackends.py
+
+REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/15")
+
+
+def redis_disponible():
+    partes = urlparse(REDIS_URL)
+    try:
+        socket.create_connection((partes.hostname or "localhost", partes.port or 6379), timeout=0.2).close()
+        return True
+    except OSError:
+        return False
+
+
+class ContratoBackend:
+    """
+    Pruebas comunes a todos los backends; cada subclase define `crear`.
+    """
+
+    async def asyncSetUp(self):
+        self.backend = self.crear()
+
+    async def asyncTearDown(self):
+        await self.backend.close()
+
+    async def test_guarda_y_vence(self):
+        await self.backend.set("t:london", {"name": "London", "temp": 12.5}, ttl=60, stale_ttl=600)
+        entry = await self.backend.get("t:london")
+        self.assertEqual(entry.value, {"name": "London", "temp": 12.5})
+        self.assertAlmostEqual(entry.expires_at - entry.stored_at, 60, places=3)
+        self.assertIsNone(await self.backend.get("t:paris"))
+
+    async def test_purga_despues_de_stale_ttl(self):
+        await self.backend.set("t:tokyo", {"name": "Tokyo"}, ttl=0.01, stale_ttl=0.04)
+        await asyncio.sleep(0.02)
+        entry = await self.backend.get("t:tokyo")
+        self.assertIsNotNone(entry)
+        self.assertLess(entry.expires_at, entry.stored_at + 0.02)
+        await asyncio.sleep(0.06)
+        self.assertIsNone(await self.backend.get("t:tokyo"))
+
+    async def test_candado_exclusivo_y_liberacion(self):
+        token = await self.backend.acquire("t:lima", lease=5)
+        self.assertIsNotNone(token)
+        self.assertIsNone(await self.backend.acquire("t:lima", lease=5))
+        # Solo el dueño puede liberarlo
+        await self.backend.release("t:lima", "otro")
+        self.assertIsNone(await self.backend.acquire("t:lima", lease=5))
+        await self.backend.release("t:lima", token)
+        otro = await self.backend.acquire("t:lima", lease=5)
+        self.assertIsNotNone(otro)
+        await self.backend.release("t:lima", otro)
+
+    async def test_candado_expira(self):
+        self.assertIsNotNone(await self.backend.acquire("t:quito", lease=0.02))
+        await asyncio.sleep(0.05)
+        token = await self.backend.acquire("t:quito", lease=5)
+        self.assertIsNotNone(token)
+        await self.backend.release("t:quito", token)
+
+
+class TestMemoryBackend(ContratoBackend, unittest.IsolatedAsyncioTestCase):
+
+    def crear(self):
+        return MemoryBackend()
+
+    def test_crear_backend(self):
+        self.assertIsInstance(crear_backend("memory"), MemoryBackend)
+        with self.assertRaises(ValueError):
+            crear_backend("memcached")
+
+
+class TestSQLiteBackend(ContratoBackend, unittest.IsolatedAsyncioTestCase):
+
+    def crear(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        return SQLiteBackend(os.path.join(self.directorio.name, "cache.db"))
+
+    async def asyncTearDown(self):
+        await super().asyncTearDown()
+        self.directorio.cleanup()
+
+    async def test_dos_conexiones_comparten_datos(self):
+        otro = SQLiteBackend(self.backend.path)
+        await self.backend.set("t:oslo", {"name": "Oslo"}, ttl=60)
+        self.assertEqual((await otro.get("t:oslo")).value, {"name": "Oslo"})
+        self.assertIsNotNone(await otro.acquire("t:oslo", lease=5))
+        self.assertIsNone(await self.backend.acquire("t:oslo", lease=5))
+        await otro.close()
+
+
+@unittest.skipUnless(redis_disponible(), "requiere un servidor Redis en CACHE_REDIS_URL")
+class TestRedisBackend(ContratoBackend, unittest.IsolatedAsyncioTestCase):
+
+    def crear(self):
+        return RedisBackend(REDIS_URL, prefix="test_clima:")
+
+
+class TestCacheConBackend(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directorio.name, "cache.db")
+
+    async def asyncTearDown(self):
+        self.directorio.cleanup()
+
+    async def test_un_solo_worker_descarga(self):
+        # Cuatro "workers": cachés locales independientes sobre el mismo archivo
+        backends = [SQLiteBackend(self.path) for _ in range(4)]
+        caches = [TTLCache(ttl=60, backend=b, namespace="current:", poll_interval=0.005) for b in backends]
+        llamadas = 0
+
+        async def fetch():
+            nonlocal llamadas
+            llamadas += 1
+            await asyncio.sleep(0.05)
+            return {"name": "London"}, 10
+
+        resultados = await asyncio.gather(*(c.get_or_fetch("london", fetch) for c in caches))
+        self.assertEqual(llamadas, 1)
+        self.assertTrue(all(r == {"name": "London"} for r in resultados))
+        self.assertEqual(sum(c.shared_hits for c in caches), 3)
+        self.assertEqual(sum(c.shared_waits for c in caches), 3)
+        # El valor copiado queda en el nivel local de cada worker
+        self.assertTrue(all(c.get("london") == {"name": "London"} for c in caches))
+        for backend in backends:
+            await backend.close()
+
+    async def test_recupera_respaldo_de_otro_worker(self):
+        backend = SQLiteBackend(self.path)
+        await backend.set("forecast:q:lima", {"name": "Lima"}, ttl=0.01, stale_ttl=600)
+        await asyncio.sleep(0.02)
+        cache = TTLCache(ttl=60, stale_ttl=600, backend=backend, namespace="forecast:")
+        valor, edad = await cache.recover("q:lima")
+        self.assertEqual(valor, {"name": "Lima"})
+        self.assertGreater(edad, 0)
+        self.assertEqual(cache.stale, 1)
+        await backend.close()
+
+    async def test_backend_caido_descarga_directo(self):
+        backend = RedisBackend("redis://127.0.0.1:1/0", timeout=0.2)
+        cache = TTLCache(ttl=60, backend=backend)
+
+        async def fetch():
+            return {"name": "London"}, 10
+
+        self.assertEqual(await cache.get_or_fetch("london", fetch), {"name": "London"})
+        self.assertEqual(cache.get("london"), {"name": "London"})
+        self.assertEqual(cache.backend_errors, 2)
+        self.assertIsNone(await cache.recover("paris"))
+        with self.assertRaises(CacheBackendError):
+            await backend.get("london")
+
+
+if __name__ == '__main__':
+    unittest.main()
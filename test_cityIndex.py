@@ -0,0 +1,87 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+
+from cityIndex import CityIndex, normalizar_nombre, separar_pais
+
+
+# python -m unittest test_cityIndex.py
+
+CITIES_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "cities.csv")
+
+
+class TestCityIndex(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.index = CityIndex()
+        cls.index.load(CITIES_CSV)
+
+    def test_normalizar_nombre(self):
+        self.assertEqual(normalizar_nombre("  Ciudad de  México"), "ciudad de mexico")
+        self.assertEqual(normalizar_nombre("São-Paulo"), "sao paulo")
+        self.assertEqual(separar_pais("London, gb"), ("London", "GB"))
+        self.assertEqual(separar_pais("Washington D C"), ("Washington D C", None))
+
+    def test_resuelve_nombres_y_alias_a_la_misma_ciudad(self):
+        cdmx = self.index.resolve("Mexico City")
+        self.assertEqual(cdmx["country"], "MX")
+        self.assertEqual(self.index.resolve("ciudad de mexico"), cdmx)
+        self.assertEqual(self.index.resolve("CDMX"), cdmx)
+        self.assertEqual(self.index.resolve("Londres")["name"], "London")
+
+    def test_filtra_por_pais_y_rechaza_desconocidas(self):
+        self.assertEqual(self.index.resolve("London,GB")["name"], "London")
+        self.assertIsNone(self.index.resolve("London,CA"))
+        self.assertIsNone(self.index.resolve("Cityabc"))
+        self.assertFalse(self.index.complete)
+
+    def test_nombres_repetidos(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cities.csv")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("id,name,country,lat,lon,population,aliases\n"
+                        "6058560,London,CA,42.98,-81.23,0,\n"
+                        "2643743,London,GB,51.51,-0.13,8961989,\n"
+                        "4517009,London,US,39.89,-83.45,0,\n"
+                        "4119617,London,US,35.33,-93.25,0,\n")
+            index = CityIndex()
+            index.load(path)
+        # La población desempata; sin ella (dos London en US con población 0) es ambigua
+        self.assertEqual((index.resolve("London")["country"], index.resolve("London")["ambiguous"]), ("GB", False))
+        self.assertFalse(index.resolve("London,CA")["ambiguous"])
+        self.assertTrue(index.resolve("London,US")["ambiguous"])
+
+    def test_sugerencias_por_prefijo(self):
+        nombres = [c["name"] for c in self.index.suggest("guada")]
+        self.assertEqual(nombres, ["Guadalajara"])
+        # La coincidencia exacta va antes que las ciudades más pobladas con el mismo prefijo
+        self.assertEqual(self.index.suggest("salvador")[0]["name"], "Salvador")
+        self.assertEqual(len(self.index.suggest("s", limit=3)), 3)
+        self.assertEqual(self.index.suggest("   "), [])
+
+    def test_lista_de_openweather(self):
+        ciudades = [
+            {"id": 1, "name": "Springfield", "state": "IL", "country": "US", "coord": {"lon": -89.6, "lat": 39.8}},
+            {"id": 2, "name": "Springfield", "state": "MO", "country": "US", "coord": {"lon": -93.3, "lat": 37.2}},
+            {"id": 3, "name": "Spring", "state": "", "country": "US", "coord": {"lon": -95.4, "lat": 30.1}},
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "city.list.json.gz")
+            with gzip.open(path, "wt", encoding="utf-8") as f:
+                json.dump(ciudades, f)
+            index = CityIndex()
+            self.assertEqual(index.load(path), 3)
+        self.assertTrue(index.complete)
+        # Población 0 en toda la lista: ninguna Springfield es preferible a la otra
+        self.assertTrue(index.resolve("springfield")["ambiguous"])
+        self.assertTrue(index.resolve("Springfield,US")["ambiguous"])
+        self.assertEqual(index.resolve("spring"), {"id": 3, "name": "Spring", "country": "US", "lat": 30.1,
+                                                   "lon": -95.4, "ambiguous": False})
+        self.assertEqual([c["id"] for c in index.suggest("spring")], [3, 1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,212 @@
+import asyncio
+import csv
+import os
+import tempfile
+import unittest
+
+from fastapi import HTTPException
+
+from climateReports import Checkpoint, CsvSink, ParquetSink, fila, generar, leer_ciudades, pq, renderizar_reporte
+from weatherResponses import compactar_actual
+
+
+# python -m unittest test_climateReports.py
+
+def actual(name, temp=12.0):
+    return {
+        "name": name,
+        "weather": [{"id": 500, "main": "Rain", "description": "lluvia ligera", "icon": "10d"}],
+        "main": {"temp": temp, "feels_like": temp - 1, "temp_min": temp - 2, "temp_max": temp + 2,
+                 "pressure": 1012, "humidity": 80},
+        "sys": {"country": "GB", "sunrise": 1697610000, "sunset": 1697648000},
+        "coord": {"lat": 51.5, "lon": -0.12},
+        "wind": {"speed": 4.1, "deg": 200},
+        "timezone": 3600,
+        "dt": 1697630000,
+    }
+
+
+def pronostico(temps=(10.0, 14.0, 11.0)):
+    base = 1697630400
+    return {
+        "city": {"name": "London", "timezone": 3600},
+        "list": [
+            {"dt": base + i * 10800, "main": {"temp": t, "temp_min": t, "temp_max": t, "pressure": 1010 + i, "humidity": 70},
+             "weather": [{"id": 500, "main": "Rain", "description": "lluvia ligera", "icon": "10d"}]}
+            for i, t in enumerate(temps)
+        ],
+    }
+
+
+class FakeUpstream:
+    def __init__(self, desconocidas=(), caidas=()):
+        self.desconocidas = set(desconocidas)
+        self.caidas = set(caidas)
+        self.llamadas = []
+
+    async def __call__(self, city):
+        self.llamadas.append(city)
+        await asyncio.sleep(0)
+        if city in self.desconocidas:
+            raise HTTPException(status_code=404, detail="City not found")
+        if city in self.caidas:
+            raise HTTPException(status_code=503, detail="Upstream unavailable", headers={"Retry-After": "0"})
+        return actual(city), pronostico()
+
+
+class TestClimateReports(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.out = self.directorio.name
+
+    def tearDown(self):
+        self.directorio.cleanup()
+
+    def leer_csv(self):
+        with open(os.path.join(self.out, "results.csv"), newline="", encoding="utf-8") as archivo:
+            return list(csv.DictReader(archivo))
+
+    async def correr(self, ciudades, upstream, sink_cls=CsvSink, **kwargs):
+        checkpoint = Checkpoint(os.path.join(self.out, "checkpoint.jsonl"))
+        sink = sink_cls(self.out, checkpoint.sink_states)
+        try:
+            return await generar(ciudades, upstream, sink, checkpoint, concurrency=3, commit_every=2, **kwargs)
+        finally:
+            sink.close()
+            checkpoint.close()
+
+    def test_fila(self):
+        datos = {**actual("London"), "stale": {"age": 300}}
+        row = fila("Londres", datos, pronostico())
+        self.assertEqual((row["city"], row["name"], row["condition"]), ("Londres", "London", "Rain"))
+        self.assertEqual((row["forecast_temp_min"], row["forecast_temp_max"], row["stale_age"]), (10.0, 14.0, 300))
+
+    def test_leer_ciudades(self):
+        path = os.path.join(self.out, "ciudades.txt")
+        with open(path, "w", encoding="utf-8") as archivo:
+            archivo.write("London\n\n# comentario\n  Paris  \n")
+        self.assertEqual(list(leer_ciudades(path)), ["London", "Paris"])
+        self.assertEqual(next(leer_ciudades("data/cities.csv")), "London,GB")
+
+    async def test_escribe_y_reanuda_sin_repetir(self):
+        upstream = FakeUpstream(desconocidas={"Atlantis"}, caidas={"Lima"})
+        stats = await self.correr(["London", "Paris", "Atlantis", "Lima", "london "], upstream, retries=0)
+        self.assertEqual((stats["written"], stats["failed"], stats["pending"], stats["skipped"]), (2, 1, 1, 1))
+        self.assertEqual([r["city"] for r in self.leer_csv()], ["London", "Paris"])
+
+        # Segunda ejecución: solo se consultan la ciudad pendiente y las nuevas
+        upstream = FakeUpstream()
+        stats = await self.correr(["London", "Paris", "Atlantis", "Lima", "Tokyo"], upstream)
+        self.assertEqual(sorted(upstream.llamadas), ["Lima", "Tokyo"])
+        self.assertEqual(sorted(r["city"] for r in self.leer_csv()), ["Lima", "London", "Paris", "Tokyo"])
+
+    async def test_reintenta_errores_transitorios(self):
+        intentos = []
+
+        async def inestable(city):
+            intentos.append(city)
+            if len(intentos) < 3:
+                raise HTTPException(status_code=429, detail="Upstream quota exceeded", headers={"Retry-After": "0"})
+            return actual(city), pronostico()
+
+        stats = await self.correr(["London"], inestable, retries=5)
+        self.assertEqual((len(intentos), stats["written"]), (3, 1))
+
+    async def test_error_inesperado_no_detiene_el_lote(self):
+        async def upstream(city):
+            await asyncio.sleep(0)
+            if city == "Roto":
+                raise KeyError("main")
+            if city == "Sin datos":
+                return {"name": city}, {"list": []}
+            return actual(city), pronostico()
+
+        ciudades = ["London", "Roto", "Paris", "Sin datos", "Tokyo"]
+        stats = await self.correr(ciudades, upstream, retries=0)
+        self.assertEqual((stats["written"], stats["failed"]), (3, 2))
+        self.assertEqual(sorted(r["city"] for r in self.leer_csv()), ["London", "Paris", "Tokyo"])
+
+        checkpoint = Checkpoint(os.path.join(self.out, "checkpoint.jsonl"))
+        self.assertEqual(checkpoint.failed["roto"]["status"], None)
+        self.assertIn("KeyError", checkpoint.failed["roto"]["detail"])
+        checkpoint.close()
+
+    def test_csv_descarta_filas_sin_confirmar(self):
+        checkpoint = Checkpoint(os.path.join(self.out, "checkpoint.jsonl"))
+        sink = CsvSink(self.out)
+        sink.write(fila("London", actual("London"), pronostico()))
+        checkpoint.mark_rows(["london"], sink.commit())
+        # Fila escrita pero no confirmada antes de una interrupción
+        sink.write(fila("Paris", actual("Paris"), pronostico()))
+        sink.close()
+        checkpoint.close()
+
+        checkpoint = Checkpoint(os.path.join(self.out, "checkpoint.jsonl"))
+        CsvSink(self.out, checkpoint.sink_states).close()
+        checkpoint.close()
+        self.assertEqual([r["city"] for r in self.leer_csv()], ["London"])
+
+    def test_checkpoint_descarta_linea_incompleta(self):
+        path = os.path.join(self.out, "checkpoint.jsonl")
+        with open(path, "w", encoding="utf-8") as archivo:
+            archivo.write('{"report": "london,gb"}\n{"report": "par')
+        checkpoint = Checkpoint(path)
+        checkpoint.mark_report("tokyo,jp")
+        checkpoint.close()
+        self.assertEqual(Checkpoint(path).reports, {"london,gb", "tokyo,jp"})
+
+    @unittest.skipIf(pq is None, "requiere pyarrow")
+    async def test_parquet_por_partes(self):
+        ciudades = ["London", "Paris", "Tokyo", "Lima", "Quito"]
+        stats = await self.correr(ciudades, FakeUpstream(), sink_cls=ParquetSink)
+        self.assertEqual(stats["written"], 5)
+        partes = sorted(os.listdir(os.path.join(self.out, "results")))
+        self.assertEqual(partes, ["part-00000.parquet", "part-00001.parquet", "part-00002.parquet"])
+        tabla = pq.read_table(os.path.join(self.out, "results"))
+        self.assertEqual(sorted(tabla.column("city").to_pylist()), sorted(ciudades))
+
+        # Una parte que no llegó al checkpoint se descarta al reanudar
+        with open(os.path.join(self.out, "results", "part-00003.parquet.tmp"), "wb") as archivo:
+            archivo.write(b"PAR1")
+        await self.correr(ciudades + ["Oslo"], FakeUpstream(), sink_cls=ParquetSink)
+        self.assertEqual(pq.read_table(os.path.join(self.out, "results")).num_rows, 6)
+
+    async def test_reportes_y_reanudacion(self):
+        generados = []
+
+        async def renderizar(key, datos, prono):
+            await asyncio.sleep(0.01)
+            generados.append(key)
+
+        stats = await self.correr(["London", "Paris"], FakeUpstream(), renderizar=renderizar)
+        self.assertEqual((stats["reports"], sorted(generados)), (2, ["london", "paris"]))
+
+        # Con las filas y los reportes hechos no se vuelve a consultar nada
+        upstream = FakeUpstream()
+        await self.correr(["London", "Paris"], upstream, renderizar=renderizar)
+        self.assertEqual(upstream.llamadas, [])
+
+    def test_renderizar_reporte_html(self):
+        rutas = renderizar_reporte(self.out, "são paulo,br", actual("São Paulo"), pronostico())
+        self.assertEqual(rutas, [os.path.join(self.out, "são-paulo-br.html")])
+        with open(rutas[0], encoding="utf-8") as archivo:
+            pagina = archivo.read()
+        self.assertIn("Clima en São Paulo", pagina)
+        self.assertEqual(pagina.count('class="plotly-graph-div"'), 4)
+        self.assertIn("Variación de Presión Atmosférica en el Tiempo", pagina)
+
+    def test_renderizar_reporte_compacto_sin_campos_opcionales(self):
+        incompleto = compactar_actual({**actual("Lima"), "weather": [], "timezone": None,
+                                      "sys": {"country": "PE"}})
+        sin_zona = {**pronostico(), "city": {"name": "Lima"}}
+        rutas = renderizar_reporte(self.out, "lima", incompleto, sin_zona)
+        with open(rutas[0], encoding="utf-8") as archivo:
+            pagina = archivo.read()
+        self.assertIn("Clima en Lima", pagina)
+        self.assertEqual(pagina.count("<td>N/D</td>"), 2)
+        self.assertNotIn("<img", pagina)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+from datetime import datetime, timedelta
+
+from dashboardFront import METRICAS, DashboardSeries, fila_resumen, separar_ciudades
+
+
+# python -m unittest test_dashboardFront.py
+
+def clima(temp):
+    return {"main": {"temp": temp, "humidity": 50, "pressure": 1013}, "wind": {"speed": 3.5}}
+
+
+class TestDashboard(unittest.TestCase):
+
+    def test_separar_ciudades(self):
+        ciudades, invalidas = separar_ciudades(" London, paris ,London,, Ciudad de México, R2D2", limite=10)
+        self.assertEqual(ciudades, ["London", "paris", "Ciudad de México"])
+        self.assertEqual(invalidas, ["R2D2"])
+        self.assertEqual(len(separar_ciudades(",".join(f"City {chr(65 + i)}" for i in range(26)), limite=5)[0]), 5)
+
+    def test_memoria_acotada_por_ciudad(self):
+        series = DashboardSeries(capacity=10)
+        inicio = datetime(2023, 10, 18)
+        for i in range(50):
+            series.update({"London": clima(i), "Paris": clima(-i)}, inicio + timedelta(seconds=5 * i))
+        por_ciudad = series.nbytes // 2
+        self.assertEqual(por_ciudad, len(METRICAS) * 10 * 16)
+        series.set_cities(["Paris"])
+        self.assertEqual(len(series), 1)
+        self.assertEqual(series.nbytes, por_ciudad)
+
+    def test_una_traza_webgl_por_ciudad_dentro_del_presupuesto(self):
+        series = DashboardSeries(capacity=500)
+        inicio = datetime(2023, 10, 18)
+        ciudades = [f"City {chr(65 + i)}" for i in range(10)]
+        for i in range(500):
+            series.update({city: clima(i % 17) for city in ciudades}, inicio + timedelta(seconds=5 * i))
+        fig = series.figure("Temperatura (°C)", budget=1000)
+        self.assertEqual([t.name for t in fig.data], ciudades)
+        self.assertTrue(all(t.type == "scattergl" for t in fig.data))
+        self.assertLessEqual(sum(len(t.x) for t in fig.data), 1000)
+
+    def test_fila_resumen_sin_campos_opcionales(self):
+        completa = {**clima(12.5), "sys": {"country": "GB"}, "weather": [{"description": "lluvia ligera"}]}
+        fila = fila_resumen("London", completa)
+        self.assertEqual((fila["País"], fila["Descripción"], fila["Temperatura (°C)"]), ("GB", "lluvia ligera", 12.5))
+
+        incompleta = {"name": "London", "weather": [], "sys": None, "main": None, "wind": {"speed": None}}
+        fila = fila_resumen("London", incompleta)
+        self.assertEqual((fila["País"], fila["Descripción"]), (None, ""))
+        self.assertTrue(all(fila[metrica] is None for metrica in METRICAS))
+        series = DashboardSeries(capacity=10)
+        series.update({"London": incompleta}, datetime(2023, 10, 18))
+        self.assertEqual(len(series), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+
+from forecastSummary import resumen_diario
+
+
+# python -m unittest test_forecastSummary.py
+
+def entrada(dt, temp, weather_id, main, icon):
+    return {
+        "dt": dt,
+        "main": {"temp": temp, "temp_min": temp - 1, "temp_max": temp + 1},
+        "weather": [{"id": weather_id, "main": main, "description": main.lower(), "icon": icon}],
+    }
+
+
+class TestResumenDiario(unittest.TestCase):
+
+    def test_agrupa_por_dia_local(self):
+        # 2023-10-18 00:00 UTC; con UTC-6 las primeras dos entradas pertenecen al 17 de octubre
+        base = 1697587200
+        entries = [entrada(base + i * 10800, 10.0 + i, 800, "Clear", "01n") for i in range(8)]
+        resumen = resumen_diario({"list": entries, "city": {"name": "Mexico City", "timezone": -21600}})
+        self.assertEqual([d["date"] for d in resumen["days"]], ["2023-10-17", "2023-10-18"])
+        self.assertEqual([d["samples"] for d in resumen["days"]], [2, 6])
+        primero = resumen["days"][0]
+        self.assertEqual((primero["temp_min"], primero["temp_max"], primero["temp_mean"]), (9.0, 12.0, 10.5))
+        self.assertEqual(primero["icon"], "01d")
+
+    def test_condicion_dominante(self):
+        base = 1697587200
+        condiciones = [(500, "Rain", "10d")] * 3 + [(803, "Clouds", "04d")] * 5
+        entries = [entrada(base + i * 10800, 15.0, *c) for i, c in enumerate(condiciones)]
+        resumen = resumen_diario({"list": entries, "city": {"timezone": 0}})
+        self.assertEqual(len(resumen["days"]), 1)
+        self.assertEqual(resumen["days"][0]["condition"], "Clouds")
+
+    def test_empate_elige_la_condicion_mas_significativa(self):
+        base = 1697587200
+        condiciones = [(800, "Clear", "01d")] * 2 + [(500, "Rain", "10d")] * 2
+        entries = [entrada(base + i * 10800, 15.0, *c) for i, c in enumerate(condiciones)]
+        resumen = resumen_diario({"list": entries, "city": {"timezone": 0}})
+        self.assertEqual(resumen["days"][0]["condition_id"], 500)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import asyncio
+import unittest
+
+from observationStore import ObservationStore
+
+
+# python -m unittest test_observationStore.py
+
+def observacion(dt, temp, pressure=1012, humidity=70):
+    return {
+        "dt": dt,
+        "name": "London",
+        "main": {"temp": temp, "pressure": pressure, "humidity": humidity},
+        "wind": {"speed": 3.0},
+    }
+
+
+class TestObservationStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store = ObservationStore(":memory:", batch_size=2)
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_agrega_por_intervalo(self):
+        for dt, temp in [(0, 10.0), (600, 14.0), (3599, 12.0), (3600, 20.0)]:
+            self.store.add("london", observacion(dt, temp))
+        historial = self.store.history("london", 0, 7200, 3600)
+        self.assertEqual(historial["ts"], [0, 3600])
+        self.assertEqual(historial["count"], [3, 1])
+        self.assertEqual(historial["temp"], {"min": [10.0, 20.0], "mean": [12.0, 20.0], "max": [14.0, 20.0]})
+
+    def test_ignora_observaciones_repetidas_y_otras_ciudades(self):
+        self.store.add("london", observacion(100, 10.0))
+        self.store.add("london", observacion(100, 10.0))
+        self.store.add("paris", observacion(100, 18.0))
+        historial = self.store.history("london", 0, 3600, 3600)
+        self.assertEqual(historial["count"], [1])
+
+    def test_rango_de_tiempo(self):
+        for dt in range(0, 10000, 1000):
+            self.store.add("london", observacion(dt, 10.0))
+        historial = self.store.history("london", 2000, 5000, 1000)
+        self.assertEqual(historial["ts"], [2000, 3000, 4000])
+
+
+class TestObservationFlusher(unittest.IsolatedAsyncioTestCase):
+
+    async def test_add_no_escribe_y_el_flusher_adelanta_los_lotes_llenos(self):
+        store = ObservationStore(":memory:", batch_size=3, flush_interval=60)
+        contar = "SELECT COUNT(*) FROM observations"
+        flusher = asyncio.create_task(store.run_flusher())
+        try:
+            store.add("london", observacion(0, 10.0))
+            store.add("london", observacion(1, 10.0))
+            await asyncio.sleep(0.05)
+            self.assertEqual(store._conn.execute(contar).fetchone()[0], 0)
+            store.add("london", observacion(2, 10.0))
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if store._conn.execute(contar).fetchone()[0] == 3:
+                    break
+            self.assertEqual(store._conn.execute(contar).fetchone()[0], 3)
+        finally:
+            flusher.cancel()
+            store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from ringBuffer import RingBuffer
+
+
+# python -m unittest test_ringBuffer.py
+
+INICIO = datetime(2023, 10, 18, 12, 0, 0)
+
+
+class TestRingBuffer(unittest.TestCase):
+
+    def test_conserva_los_ultimos_puntos_en_orden(self):
+        buffer = RingBuffer(3)
+        for i in range(5):
+            buffer.append(INICIO + timedelta(seconds=5 * i), float(i))
+        self.assertTrue(buffer.full)
+        np.testing.assert_array_equal(buffer.values(), [2.0, 3.0, 4.0])
+        self.assertEqual(buffer.times()[0], np.datetime64(INICIO + timedelta(seconds=10), "s"))
+
+    def test_memoria_constante(self):
+        buffer = RingBuffer(100)
+        nbytes = buffer.nbytes
+        for i in range(1000):
+            buffer.append(INICIO + timedelta(seconds=i), i)
+        self.assertEqual(buffer.nbytes, nbytes)
+        self.assertEqual(len(buffer), 100)
+
+    def test_downsample_conserva_minimos_y_maximos(self):
+        buffer = RingBuffer(1000)
+        valores = np.sin(np.linspace(0, 20, 1000))
+        valores[500] = 5.0
+        valores[700] = -5.0
+        for i, valor in enumerate(valores):
+            buffer.append(INICIO + timedelta(seconds=i), valor)
+        tiempos, reducidos = buffer.downsample(100)
+        self.assertLessEqual(len(reducidos), 100)
+        self.assertEqual(reducidos.max(), 5.0)
+        self.assertEqual(reducidos.min(), -5.0)
+        self.assertTrue(np.all(np.diff(tiempos.astype(np.int64)) > 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
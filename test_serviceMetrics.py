@@ -0,0 +1,82 @@
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from serviceMetrics import Registry, instrumentar
+
+
+# python -m unittest test_serviceMetrics.py
+
+class TestServiceMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_contador_con_etiquetas(self):
+        contador = self.registry.counter("cache_events_total", "Eventos de la caché", ("cache", "event"))
+        contador.inc(cache="current", event="hits")
+        contador.inc(2, cache="current", event="hits")
+        contador.set_total(7, cache="forecast", event="misses")
+        self.assertEqual(self.registry.render(), (
+            "# HELP cache_events_total Eventos de la caché\n"
+            "# TYPE cache_events_total counter\n"
+            'cache_events_total{cache="current",event="hits"} 3\n'
+            'cache_events_total{cache="forecast",event="misses"} 7\n'
+        ))
+        with self.assertRaises(ValueError):
+            contador.inc(-1, cache="current", event="hits")
+        with self.assertRaises(ValueError):
+            contador.inc(cache="current")
+        with self.assertRaises(ValueError):
+            self.registry.counter("cache_events", "Sin sufijo _total")
+
+    def test_escapa_valores_de_etiquetas(self):
+        gauge = self.registry.gauge("tracked", "Ciudades seguidas", ("city",))
+        gauge.set(1.5, city='Saint "Louis"\\\nMO')
+        self.assertIn('tracked{city="Saint \\"Louis\\"\\\\\\nMO"} 1.5\n', self.registry.render())
+
+    def test_histograma_buckets_suma_y_conteo(self):
+        histograma = self.registry.histogram("latency_seconds", "Latencia", ("route",), buckets=(0.1, 1.0))
+        for valor in (0.05, 0.1, 0.5, 3.0):
+            histograma.observe(valor, route="/weather")
+        lineas = self.registry.render().splitlines()
+        self.assertEqual(lineas[1], "# TYPE latency_seconds histogram")
+        self.assertEqual(lineas[2:], [
+            'latency_seconds_bucket{route="/weather",le="0.1"} 2',
+            'latency_seconds_bucket{route="/weather",le="1"} 3',
+            'latency_seconds_bucket{route="/weather",le="+Inf"} 4',
+            'latency_seconds_sum{route="/weather"} 3.65',
+            'latency_seconds_count{route="/weather"} 4',
+        ])
+
+    def test_collectors_se_ejecutan_al_exponer(self):
+        contador = self.registry.counter("hits_total", "Aciertos")
+        estado = {"hits": 0}
+        self.registry.add_collector(lambda: contador.set_total(estado["hits"]))
+        estado["hits"] = 5
+        self.assertIn("hits_total 5\n", self.registry.render())
+
+    def test_etiqueta_route_usa_la_plantilla(self):
+        app = FastAPI()
+        duracion = self.registry.histogram("http_seconds", "Latencia", ("method", "route", "status"), buckets=(1.0,))
+        en_curso = self.registry.gauge("http_in_flight", "En curso")
+        instrumentar(app, duracion, en_curso)
+
+        @app.get("/weather/{city}")
+        async def clima(city: str):
+            return {"name": city}
+
+        with TestClient(app) as cliente:
+            cliente.get("/weather/London")
+            cliente.get("/weather/Paris")
+            cliente.get("/no-existe")
+        texto = self.registry.render()
+        self.assertIn('http_seconds_count{method="GET",route="/weather/{city}",status="200"} 2\n', texto)
+        self.assertIn('http_seconds_count{method="GET",route="unmatched",status="404"} 1\n', texto)
+        self.assertNotIn("London", texto)
+        self.assertIn("http_in_flight 0\n", texto)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from serviceSettings import Settings, leer_toml
+
+
+# python -m unittest test_serviceSettings.py
+
+class TestServiceSettings(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.settings_path = self.escribir("settings.toml", """
+OPENWEATHER_TIMEOUT = 4.5
+CACHE_PREWARM_CITIES = ["London,GB", "Paris"]
+
+[cache]
+current_ttl = 90
+backend = "sqlite"
+
+[metrics]
+enabled = false
+""")
+        self.secrets_path = self.escribir("secrets.toml", 'api_key = "de-secrets"\ncache_current_ttl = 30\n')
+
+    def tearDown(self):
+        self.directorio.cleanup()
+
+    def escribir(self, nombre, contenido):
+        path = os.path.join(self.directorio.name, nombre)
+        with open(path, "w", encoding="utf-8") as archivo:
+            archivo.write(contenido)
+        return path
+
+    def cargar(self, **environ):
+        return Settings.load({"CLIMA_SETTINGS_FILE": self.settings_path, "CLIMA_SECRETS_FILE": self.secrets_path,
+                              **environ})
+
+    def test_aplana_tablas_y_convierte_a_texto(self):
+        valores = leer_toml(self.settings_path)
+        self.assertEqual(valores["CACHE_CURRENT_TTL"], "90")
+        self.assertEqual(valores["OPENWEATHER_TIMEOUT"], "4.5")
+        self.assertEqual(valores["CACHE_PREWARM_CITIES"], "London,GB,Paris")
+        self.assertEqual(valores["METRICS_ENABLED"], "0")
+        self.assertEqual(leer_toml(os.path.join(self.directorio.name, "no-existe.toml")), {})
+
+    def test_orden_de_prioridad(self):
+        settings = self.cargar()
+        # El archivo de configuración tiene prioridad sobre el de secretos
+        self.assertEqual(settings.get("CACHE_CURRENT_TTL"), "90")
+        self.assertEqual(settings.get("CACHE_BACKEND", "memory"), "sqlite")
+        self.assertEqual(settings.get("CACHE_FORECAST_TTL", "600"), "600")
+        self.assertIsNone(settings.get("CACHE_REDIS_URL"))
+
+        clave = self.escribir("api_key", "de-archivo\n")
+        settings = self.cargar(OPENWEATHER_API_KEY_FILE=clave)
+        self.assertEqual(settings.get("OPENWEATHER_API_KEY"), "de-archivo")
+        settings = self.cargar(OPENWEATHER_API_KEY_FILE=clave, OPENWEATHER_API_KEY="de-entorno", CACHE_CURRENT_TTL="5")
+        self.assertEqual((settings.get("OPENWEATHER_API_KEY"), settings.get("CACHE_CURRENT_TTL")), ("de-entorno", "5"))
+
+    def test_api_key_de_secretos_de_streamlit(self):
+        self.assertEqual(self.cargar().get("OPENWEATHER_API_KEY"), "de-secrets")
+        self.assertIsNone(Settings.load({"CLIMA_SECRETS_FILE": self.settings_path,
+                                         "CLIMA_SETTINGS_FILE": ""}).get("OPENWEATHER_API_KEY"))
+
+    def test_servicio_no_importa_el_front_end(self):
+        codigo = ("import sys, OpenWeather; "
+                  "print(','.join(m for m in ('streamlit', 'plotly', 'matplotlib', 'pandas') if m in sys.modules))")
+        entorno = {**os.environ, "OPENWEATHER_API_KEY": "test", "CLIMA_SECRETS_FILE": self.secrets_path,
+                   "HISTORY_DB_PATH": os.path.join(self.directorio.name, "observations.db"), "ASSETS_PRECOMPUTE": "0"}
+        salida = subprocess.run([sys.executable, "-c", codigo], env=entorno, capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+        self.assertEqual(salida.stdout.strip(), "")
+
+
+if __name__ == '__main__':
+    unittest.main()
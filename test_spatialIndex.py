@@ -0,0 +1,50 @@
+import unittest
+
+from spatialIndex import GridIndex, distancia_km
+
+
+# python -m unittest test_spatialIndex.py
+
+class TestGridIndex(unittest.TestCase):
+
+    def test_puntos_cercanos_comparten_celda(self):
+        grid = GridIndex(resolution=0.05)
+        self.assertEqual(grid.snap(19.4326, -99.1332), grid.snap(19.43, -99.13))
+        self.assertEqual(grid.center(grid.snap(19.4326, -99.1332)), (19.45, -99.15))
+        self.assertEqual(grid.key(grid.snap(19.4326, -99.1332)), "19.45,-99.15")
+        # La longitud da la vuelta en el antimeridiano
+        self.assertEqual(grid.snap(0, 179.99), grid.snap(0, -179.99))
+
+    def test_reutiliza_la_celda_fresca_mas_cercana_dentro_de_la_tolerancia(self):
+        frescas = set()
+        grid = GridIndex(resolution=0.05, tolerance_km=5, is_fresh=frescas.__contains__)
+        vecina = grid.snap(19.45, -99.15)
+        grid.add(vecina)
+        frescas.add(grid.key(vecina))
+
+        # A unos 3 km del centro de la celda vecina
+        celda = grid.lookup(19.476, -99.15)
+        self.assertEqual(celda, vecina)
+        self.assertLessEqual(distancia_km(19.476, -99.15, *grid.center(celda)), 5)
+        # Demasiado lejos
+        self.assertIsNone(grid.lookup(19.60, -99.15))
+        self.assertEqual(grid.stats()["nearby"], 1)
+
+    def test_olvida_las_celdas_que_ya_no_estan_frescas(self):
+        frescas = set()
+        grid = GridIndex(resolution=0.05, tolerance_km=5, is_fresh=frescas.__contains__)
+        celda = grid.snap(40.0, -3.7)
+        grid.add(celda)
+        self.assertIsNone(grid.lookup(40.0, -3.7))
+        self.assertEqual(grid.stats()["cells"], 0)
+
+    def test_la_resolucion_debe_dividir_360(self):
+        for resolucion in (0.05, 0.1, 0.25, 1, 7.5):
+            GridIndex(resolution=resolucion)
+        for resolucion in (0.07, 7, 0, -1, 400):
+            with self.assertRaises(ValueError):
+                GridIndex(resolution=resolucion)
+
+
+if __name__ == "__main__":
+    unittest.main()
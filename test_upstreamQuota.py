@@ -0,0 +1,103 @@
+import asyncio
+import unittest
+
+from upstreamQuota import (BACKGROUND, BATCH, INTERACTIVE, QuotaExceeded, QuotaScheduler, compartir_prioridad,
+                           con_prioridad, prioridad)
+from weatherCache import TTLCache
+
+
+# python -m unittest test_upstreamQuota.py
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestQuotaScheduler(unittest.IsolatedAsyncioTestCase):
+
+    async def test_rafaga_y_ritmo_respetan_la_cuota(self):
+        clock = FakeClock()
+        quota = QuotaScheduler(calls_per_minute=60, burst=10, clock=clock)
+        self.assertAlmostEqual(quota.rate, 50 / 60)
+        for _ in range(10):
+            await quota.acquire(INTERACTIVE)
+        self.assertFalse(quota.try_acquire())
+        # Sin fichas, una llamada por lote con espera estimada mayor que su máximo se rechaza
+        quota.max_wait = (2.0, 10.0, 0.5)
+        with self.assertRaises(QuotaExceeded) as ctx:
+            await quota.acquire(BATCH)
+        self.assertEqual(ctx.exception.status_code, 429)
+        self.assertEqual(ctx.exception.headers["Retry-After"], "1")
+        clock.now = 60
+        self.assertEqual(quota.stats()["tokens"], 10)  # el bucket no supera la ráfaga
+
+    async def test_interactivas_antes_que_segundo_plano_y_lote(self):
+        quota = QuotaScheduler(calls_per_minute=1210, burst=1, max_wait=(5, 5, 5))
+        await quota.acquire(INTERACTIVE)  # vacía el bucket (20 fichas por segundo)
+        orden = []
+
+        async def llamar(clase, nombre):
+            await quota.acquire(clase)
+            orden.append(nombre)
+
+        tareas = [asyncio.ensure_future(llamar(BATCH, "lote"))]
+        await asyncio.sleep(0)
+        tareas.append(asyncio.ensure_future(llamar(BACKGROUND, "fondo")))
+        tareas.append(asyncio.ensure_future(llamar(INTERACTIVE, "usuario")))
+        await asyncio.gather(*tareas)
+        self.assertEqual(orden, ["usuario", "fondo", "lote"])
+        stats = quota.stats()["classes"]
+        self.assertEqual((stats["batch"]["queued"], stats["interactive"]["granted"]), (1, 2))
+
+    async def test_descarga_compartida_sube_a_la_prioridad_de_quien_se_une(self):
+        quota = QuotaScheduler(calls_per_minute=1210, burst=1, max_wait=(0.5, 5, 30))
+        await quota.acquire(INTERACTIVE)  # vacía el bucket (20 fichas por segundo)
+        cache = TTLCache(ttl=60, coalesce=compartir_prioridad)
+        orden = []
+
+        async def fetch():
+            await quota.acquire()
+            orden.append("descarga")
+            return {"name": "London"}, 10
+
+        async def fondo():
+            await quota.acquire(BACKGROUND)
+            orden.append("fondo")
+
+        tareas = [asyncio.ensure_future(fondo())]
+        await asyncio.sleep(0)
+        # Un trabajo por lote empieza la descarga, que queda en la cola detrás de la de segundo plano
+        tareas.append(asyncio.ensure_future(con_prioridad(BATCH, cache.get_or_fetch)("london", fetch)))
+        while not quota.depth(BATCH):
+            await asyncio.sleep(0)
+        # Un usuario pide la misma ciudad: la descarga pasa a la clase interactiva y se adelanta
+        resultado = await cache.get_or_fetch("london", fetch)
+        self.assertEqual(resultado, {"name": "London"})
+        await asyncio.gather(*tareas)
+        self.assertEqual(orden, ["descarga", "fondo"])
+        stats = quota.stats()["classes"]
+        self.assertEqual((stats["interactive"]["granted"], stats["batch"]["granted"]), (2, 0))
+        self.assertEqual(cache.stats()["coalesced"], 1)
+
+    async def test_pausa_tras_429_del_upstream(self):
+        clock = FakeClock()
+        quota = QuotaScheduler(calls_per_minute=60, burst=10, clock=clock)
+        quota.pause(30)
+        self.assertFalse(quota.try_acquire())
+        self.assertGreaterEqual(quota.estimated_wait(INTERACTIVE), 30)
+        clock.now = 32
+        self.assertTrue(quota.try_acquire())
+
+    async def test_con_prioridad_usa_la_variable_de_contexto(self):
+        async def fetch():
+            return prioridad.get()
+
+        self.assertEqual(await con_prioridad(BACKGROUND, fetch)(), BACKGROUND)
+        self.assertEqual(prioridad.get(), INTERACTIVE)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+import asyncio
+import time
+import unittest
+
+import httpx
+
+from upstreamQuota import QuotaExceeded, QuotaScheduler
+from upstreamResilience import CircuitBreaker, ResilientUpstream, UpstreamUnavailable
+
+
+# python -m unittest test_upstreamResilience.py
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def respuesta(status):
+    return httpx.Response(status, json={"cod": status})
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def test_abre_tras_fallos_y_prueba_despues_del_reset(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=clock)
+        for _ in range(3):
+            self.assertTrue(breaker.allow())
+            breaker.record_failure()
+        self.assertFalse(breaker.allow())
+        self.assertEqual(breaker.retry_after(), 30)
+
+        clock.now = 31
+        self.assertTrue(breaker.allow())  # llamada de prueba
+        self.assertFalse(breaker.allow())  # solo una a la vez
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        clock.now = 62
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(breaker.allow())
+
+
+class TestResilientUpstream(unittest.IsolatedAsyncioTestCase):
+
+    async def test_reintenta_errores_5xx(self):
+        estados = [500, 503, 200]
+
+        async def send(url, endpoint):
+            return respuesta(estados.pop(0))
+
+        upstream = ResilientUpstream(send, retries=2, rng=lambda: 0.0, hedge_quantile=None)
+        response = await upstream.get("http://x", "weather")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(upstream.retried, 2)
+
+    async def test_no_reintenta_errores_del_cliente(self):
+        llamadas = 0
+
+        async def send(url, endpoint):
+            nonlocal llamadas
+            llamadas += 1
+            return respuesta(404)
+
+        upstream = ResilientUpstream(send, retries=2, rng=lambda: 0.0)
+        self.assertEqual((await upstream.get("http://x", "weather")).status_code, 404)
+        self.assertEqual(llamadas, 1)
+
+    async def test_plazo_acota_la_latencia(self):
+        async def send(url, endpoint):
+            await asyncio.sleep(10)
+
+        upstream = ResilientUpstream(send, deadline=0.2, attempt_timeout=0.15, retries=5, rng=lambda: 0.0)
+        inicio = time.perf_counter()
+        with self.assertRaises(UpstreamUnavailable) as ctx:
+            await upstream.get("http://x", "weather")
+        self.assertLess(time.perf_counter() - inicio, 0.5)
+        self.assertEqual(ctx.exception.status_code, 504)
+
+    async def test_circuito_abierto_no_llama_al_upstream(self):
+        llamadas = 0
+
+        async def send(url, endpoint):
+            nonlocal llamadas
+            llamadas += 1
+            raise httpx.ConnectError("caído")
+
+        upstream = ResilientUpstream(send, retries=0, failure_threshold=2, reset_timeout=30)
+        for _ in range(4):
+            with self.assertRaises(UpstreamUnavailable) as ctx:
+                await upstream.get("http://x", "weather")
+        self.assertEqual(llamadas, 2)
+        self.assertEqual(upstream.rejected, 2)
+        self.assertEqual(ctx.exception.status_code, 503)
+        self.assertIn("Retry-After", ctx.exception.headers)
+        # Cada endpoint tiene su propio circuito
+        with self.assertRaises(UpstreamUnavailable):
+            await upstream.get("http://x", "forecast")
+        self.assertEqual(llamadas, 3)
+
+    async def test_cobertura_tras_el_p95(self):
+        lentas = 0
+
+        async def send(url, endpoint):
+            nonlocal lentas
+            if url == "http://lento" and lentas == 0:
+                lentas += 1
+                await asyncio.sleep(1)
+            return respuesta(200)
+
+        upstream = ResilientUpstream(send, hedge_min_delay=0.02, hedge_budget=0.5)
+        for _ in range(20):
+            await upstream.get("http://rapido", "weather")
+        inicio = time.perf_counter()
+        response = await upstream.get("http://lento", "weather")
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(time.perf_counter() - inicio, 0.5)
+        self.assertEqual((upstream.hedged, upstream.hedge_wins), (1, 1))
+
+    async def test_cuota_limita_reintentos_y_429_pausa(self):
+        estados = [500, 500, 429]
+
+        async def send(url, endpoint):
+            response = respuesta(estados.pop(0))
+            if response.status_code == 429:
+                response.headers["Retry-After"] = "20"
+            return response
+
+        quota = QuotaScheduler(calls_per_minute=60, burst=2)
+        upstream = ResilientUpstream(send, retries=2, rng=lambda: 0.0, hedge_quantile=None, quota=quota)
+        # Dos fichas: el primer intento y un reintento; el segundo reintento no tiene cuota
+        with self.assertRaises(UpstreamUnavailable):
+            await upstream.get("http://x", "weather")
+        self.assertEqual((upstream.retried, len(estados)), (1, 1))
+
+        quota.tokens = 1
+        with self.assertRaises(QuotaExceeded) as ctx:
+            await upstream.get("http://x", "weather")
+        self.assertEqual(ctx.exception.headers["Retry-After"], "20")
+        self.assertGreater(quota.stats()["paused_for"], 19)
+        # Los íconos no cuentan para la cuota
+        estados.append(200)
+        self.assertEqual((await upstream.get("http://x", "icon", metered=False)).status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import io
+import os
+import tempfile
+import unittest
+
+from PIL import Image
+
+from weatherAssets import CONDICIONES, AssetStore, recurso_para
+
+
+# python -m unittest test_weatherAssets.py
+
+class TestRecursos(unittest.TestCase):
+
+    def test_cada_codigo_tiene_icono_y_fondo(self):
+        for codigo in CONDICIONES:
+            recurso = recurso_para(codigo, "01d", fondos={"clear", "cloudy", "rainy", "snowy"})
+            self.assertRegex(recurso["icon"], r"^\d\dd$")
+            self.assertIn(recurso["background"], {"clear", "cloudy", "rainy", "snowy"})
+
+    def test_variante_nocturna_con_respaldo_diurno(self):
+        fondos = {"clear", "clear_n", "rainy", "snowy", "snowy_n"}
+        self.assertEqual(recurso_para(800, "01n", fondos)["background"], "clear_n")
+        self.assertEqual(recurso_para(601, "13n", fondos)["background"], "snowy_n")
+        # No hay rainy_n: se usa el fondo diurno
+        lluvia = recurso_para(500, "10n", fondos)
+        self.assertEqual((lluvia["icon"], lluvia["background"], lluvia["caption"]),
+                         ("10n", "rainy", "Noche con lluvia"))
+
+    def test_codigo_desconocido(self):
+        recurso = recurso_para(999, "04d", {"cloudy"})
+        self.assertEqual(recurso["background"], "cloudy")
+        self.assertEqual(recurso["caption"], "Estado del tiempo desconocido")
+
+
+class TestAssetStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        ruta = os.path.join(self.tmp.name, "clear.png")
+        Image.new("RGB", (2000, 1000), (30, 120, 200)).save(ruta)
+        self.store = AssetStore({"clear": ruta}, widths=(320, 640))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_redimensiona_y_guarda_cada_variante_una_vez(self):
+        asset = self.store.background("clear", 500, "jpg")
+        self.assertEqual(asset.media_type, "image/jpeg")
+        with Image.open(io.BytesIO(asset.body)) as imagen:
+            self.assertEqual(imagen.size, (640, 320))
+        self.assertIs(self.store.background("clear", 640, "jpg"), asset)
+        self.assertIsNone(self.store.background("missing"))
+        self.assertEqual(self.store.precompute(), 2 * len(self.store.formats))
+
+    def test_cache_en_disco_compartida_entre_procesos(self):
+        cache_dir = os.path.join(self.tmp.name, "cache")
+        fondos = self.store.fondos
+        primero = AssetStore(fondos, widths=(320,), cache_dir=cache_dir).background("clear", 320, "jpg")
+        # Otro worker con la misma caché en disco no vuelve a generar la variante
+        otro = AssetStore(fondos, widths=(320,), cache_dir=cache_dir)
+        self.assertEqual(otro.background("clear", 320, "jpg").etag, primero.etag)
+        self.assertEqual((otro.stats()["generated"], otro.stats()["disk_hits"]), (0, 1))
+        # Con otra calidad es otra variante
+        distinta = AssetStore(fondos, widths=(320,), jpeg_quality=40, cache_dir=cache_dir)
+        distinta.background("clear", 320, "jpg")
+        self.assertEqual(distinta.stats()["generated"], 1)
+        self.assertEqual(len(os.listdir(os.path.join(cache_dir, "backgrounds"))), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
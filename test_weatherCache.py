@@ -0,0 +1,114 @@
+import asyncio
+import unittest
+
+from weatherCache import TTLCache, normalizar_ciudad
+
+
+# python -m unittest test_weatherCache.py
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache(unittest.IsolatedAsyncioTestCase):
+
+    def test_normalizar_ciudad(self):
+        self.assertEqual(normalizar_ciudad("london"), normalizar_ciudad("London "))
+        self.assertEqual(normalizar_ciudad("  New   York"), "new york")
+
+    def test_expira_despues_del_ttl(self):
+        clock = FakeClock()
+        cache = TTLCache(ttl=60, clock=clock)
+        cache.set("london", {"name": "London"}, 10)
+        clock.now = 59
+        self.assertIsNotNone(cache.get("london"))
+        clock.now = 61
+        self.assertIsNone(cache.get("london"))
+        self.assertEqual(cache.bytes, 0)
+
+    def test_has_no_cuenta_como_acceso(self):
+        clock = FakeClock()
+        cache = TTLCache(ttl=60, clock=clock)
+        cache.set("london", {"name": "London"}, 10)
+        self.assertTrue(cache.has("london"))
+        self.assertFalse(cache.has("paris"))
+        clock.now = 61
+        self.assertFalse(cache.has("london"))
+        self.assertEqual((cache.hits, cache.misses, cache.expirations), (0, 0, 0))
+
+    def test_desalojo_lru_por_entradas_y_bytes(self):
+        cache = TTLCache(ttl=60, max_entries=2, max_bytes=100)
+        cache.set("a", 1, 10)
+        cache.set("b", 2, 10)
+        cache.get("a")
+        cache.set("c", 3, 10)
+        self.assertIsNone(cache.get("b"))
+        cache.set("d", 4, 95)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.stats()["evictions"], 3)
+
+    async def test_agrupa_fallos_concurrentes(self):
+        cache = TTLCache(ttl=60)
+        llamadas = 0
+
+        async def fetch():
+            nonlocal llamadas
+            llamadas += 1
+            await asyncio.sleep(0.01)
+            return {"name": "London"}, 10
+
+        resultados = await asyncio.gather(*(cache.get_or_fetch("london", fetch) for _ in range(10)))
+        self.assertEqual(llamadas, 1)
+        self.assertTrue(all(r == {"name": "London"} for r in resultados))
+        stats = cache.stats()
+        self.assertEqual((stats["misses"], stats["coalesced"]), (1, 9))
+
+    async def test_error_se_propaga_y_no_se_guarda(self):
+        cache = TTLCache(ttl=60)
+
+        async def fetch():
+            raise LookupError("City not found")
+
+        with self.assertRaises(LookupError):
+            await cache.get_or_fetch("cityabc", fetch)
+        self.assertEqual(len(cache), 0)
+
+    def test_conserva_vencidas_para_get_stale(self):
+        clock = FakeClock()
+        cache = TTLCache(ttl=60, clock=clock, stale_ttl=600)
+        cache.set("london", {"name": "London"}, 10)
+        clock.now = 120
+        self.assertIsNone(cache.get("london"))
+        self.assertEqual(cache.get_stale("london"), ({"name": "London"}, 120))
+        clock.now = 661
+        self.assertIsNone(cache.get("london"))
+        self.assertIsNone(cache.get_stale("london"))
+        self.assertEqual((cache.stale, cache.expirations, cache.bytes), (1, 1, 0))
+
+    async def test_revalida_en_segundo_plano(self):
+        clock = FakeClock()
+        cache = TTLCache(ttl=60, clock=clock, revalidate=30)
+        cache.set("london", {"temp": 10}, 10)
+        clock.now = 70
+
+        async def fetch():
+            await asyncio.sleep(0.01)
+            return {"temp": 12}, 10
+
+        self.assertEqual(await cache.get_or_fetch("london", fetch), {"temp": 10})
+        await asyncio.sleep(0.02)
+        self.assertEqual(cache.get("london"), {"temp": 12})
+        self.assertEqual((cache.revalidations, cache.misses), (1, 1))
+
+        # Fuera de la ventana de revalidación se espera la descarga
+        clock.now = 200
+        self.assertEqual(await cache.get_or_fetch("london", fetch), {"temp": 12})
+        self.assertEqual(cache.revalidations, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+
+from weatherResponses import CompactWeather, compactar_actual, compactar_pronostico, proyectar
+
+
+# python -m unittest test_weatherResponses.py
+
+COMPLETO = {
+    "coord": {"lon": -0.1257, "lat": 51.5085},
+    "weather": [{"id": 803, "main": "Clouds", "description": "broken clouds", "icon": "04d"},
+                {"id": 701, "main": "Mist", "description": "mist", "icon": "50d"}],
+    "base": "stations",
+    "main": {"temp": 14.2, "feels_like": 13.6, "temp_min": 12.9, "temp_max": 15.4, "pressure": 1012,
+             "humidity": 77, "sea_level": 1012},
+    "visibility": 10000,
+    "wind": {"speed": 4.6, "deg": 240, "gust": 9.1},
+    "clouds": {"all": 75},
+    "dt": 1697630000,
+    "sys": {"type": 2, "id": 2075535, "country": "GB", "sunrise": 1697610000, "sunset": 1697648000},
+    "timezone": 3600,
+    "id": 2643743,
+    "name": "London",
+    "cod": 200,
+}
+
+
+class TestWeatherResponses(unittest.TestCase):
+
+    def test_compactar_actual(self):
+        compacto = compactar_actual({**COMPLETO, "stale": {"age": 120}})
+        self.assertEqual(compacto["weather"], COMPLETO["weather"][:1])
+        self.assertEqual(compacto["wind"], {"speed": 4.6, "deg": 240})
+        self.assertNotIn("sea_level", compacto["main"])
+        self.assertEqual(compacto["stale"], {"age": 120})
+        CompactWeather.model_validate(compacto)
+
+    def test_compactar_actual_con_respuesta_minima(self):
+        # Sin los bloques opcionales (sys, wind, coord...) no falla: sus campos quedan en None
+        compacto = compactar_actual({"name": "Atlantis", "main": {"temp": 20.0}})
+        self.assertEqual(compacto["weather"], [])
+        self.assertEqual(compacto["main"]["temp"], 20.0)
+        self.assertIsNone(compacto["main"]["humidity"])
+        self.assertEqual(compacto["sys"], {"country": None, "sunrise": None, "sunset": None})
+        self.assertEqual(compacto["wind"], {"speed": None, "deg": None})
+        self.assertIsNone(compacto["timezone"])
+        CompactWeather.model_validate(compacto)
+
+    def test_compactar_pronostico_con_entradas_incompletas(self):
+        compacto = compactar_pronostico({"list": [{"dt": 1, "main": {"temp": 3.0, "sea_level": 1}}]})
+        self.assertEqual(compacto, {"city": {}, "list": [
+            {"dt": 1, "dt_txt": None, "main": {"temp": 3.0}, "weather": [], "wind": {}}]})
+
+    def test_proyectar(self):
+        self.assertEqual(proyectar(COMPLETO, "name, dt,inexistente"), {"name": "London", "dt": 1697630000})
+        self.assertIs(proyectar(COMPLETO, None), COMPLETO)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import asyncio
+import unittest
+
+from weatherScheduler import PollScheduler
+
+
+# python -m unittest test_weatherScheduler.py
+
+class TestPollScheduler(unittest.IsolatedAsyncioTestCase):
+
+    async def test_una_consulta_por_ciudad_sin_importar_suscriptores(self):
+        llamadas = []
+
+        async def fetch(city):
+            llamadas.append(city)
+            return {"name": city, "tick": len(llamadas)}
+
+        scheduler = PollScheduler(fetch, interval=0.05)
+        colas = [scheduler.subscribe("London"), scheduler.subscribe("london "), scheduler.subscribe("LONDON")]
+        mensajes = await asyncio.gather(*(cola.get() for cola in colas))
+        self.assertEqual(len(llamadas), 1)
+        self.assertTrue(all(m["event"] == "weather" for m in mensajes))
+        self.assertEqual(scheduler.tracked(), {"London": 3})
+        await scheduler.close()
+
+    async def test_ciudad_sale_con_el_ultimo_suscriptor(self):
+        async def fetch(city):
+            return {"name": city}
+
+        scheduler = PollScheduler(fetch, interval=0.01)
+        cola1 = scheduler.subscribe("Paris")
+        cola2 = scheduler.subscribe("Paris")
+        scheduler.unsubscribe("Paris", cola1)
+        self.assertEqual(scheduler.tracked(), {"Paris": 1})
+        scheduler.unsubscribe("Paris", cola2)
+        self.assertEqual(scheduler.tracked(), {})
+
+    async def test_errores_se_publican(self):
+        class NotFound(Exception):
+            status_code = 404
+            detail = "City not found"
+
+        async def fetch(city):
+            raise NotFound()
+
+        scheduler = PollScheduler(fetch, interval=0.01)
+        mensaje = await scheduler.subscribe("CityABC").get()
+        self.assertEqual(mensaje, {"event": "error", "data": {"status": 404, "detail": "City not found"}})
+        await scheduler.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import time
+import unittest
+
+import httpx
+
+from weatherStreamClient import SuscripcionClima, parsear_sse, suscripcion
+
+
+# python -m unittest test_weatherStreamClient.py
+
+def esperar(condicion, timeout=2.0):
+    limite = time.monotonic() + timeout
+    while not condicion() and time.monotonic() < limite:
+        time.sleep(0.01)
+    return condicion()
+
+
+class TestWeatherStreamClient(unittest.TestCase):
+
+    def test_parsear_sse(self):
+        lineas = [": keep-alive", "", "event: weather", 'data: {"name": "London"}', "",
+                  "event: error", 'data: {"status": 404, "detail": "City not found"}', ""]
+        self.assertEqual(list(parsear_sse(lineas)), [
+            ("weather", {"name": "London"}),
+            ("error", {"status": 404, "detail": "City not found"}),
+        ])
+
+    def test_guarda_el_ultimo_evento_y_se_cierra_sin_lecturas(self):
+        conexiones = []
+
+        def handler(request):
+            conexiones.append(request.url.path)
+            cuerpo = b'event: weather\ndata: {"tick": 1}\n\nevent: weather\ndata: {"tick": 2}\n\n'
+            return httpx.Response(200, content=cuerpo, headers={"Content-Type": "text/event-stream"})
+
+        cliente = httpx.Client(transport=httpx.MockTransport(handler))
+        sub = SuscripcionClima("http://svc/weather/London/stream", idle_timeout=0.2, retry=0.01, client=cliente)
+        self.assertTrue(esperar(lambda: sub.ultimo_evento() is not None))
+        self.assertEqual(sub.ultimo_evento(), ("weather", {"tick": 2}))
+        self.assertIsNone(sub.ultimo_evento(max_age=-1))
+        # Sin nadie que lea la ciudad, el hilo deja de reconectar
+        self.assertTrue(esperar(lambda: not sub.activa))
+        self.assertEqual(conexiones[0], "/weather/London/stream")
+
+    def test_suscripcion_compartida_por_url(self):
+        cliente = httpx.Client(transport=httpx.MockTransport(lambda request: httpx.Response(503)))
+        url = "http://svc/weather/Paris/stream"
+        primera = suscripcion(url, idle_timeout=5, retry=0.01, client=cliente)
+        self.assertIs(suscripcion(url), primera)
+        self.assertTrue(esperar(lambda: primera.ultimo_evento() is not None))
+        self.assertEqual(primera.ultimo_evento()[1]["status"], 503)
+        primera.cerrar()
+        self.assertTrue(esperar(lambda: not primera.activa))
+        self.assertIsNot(suscripcion(url, idle_timeout=0.01, client=cliente), primera)
+
+
+if __name__ == '__main__':
+    unittest.main()
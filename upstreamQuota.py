@@ -0,0 +1,310 @@
+"""
+Planificador de llamadas a OpenWeather que respeta la cuota de llamadas por minuto del plan.
+
+Cada llamada al upstream toma una ficha de un token bucket. Cuando no quedan fichas, las
+llamadas esperan en una cola de prioridad: primero las solicitudes interactivas de los usuarios,
+después las actualizaciones en segundo plano (planificador SSE, revalidaciones de la caché) y
+por último los trabajos por lote. Si la espera estimada supera el máximo de su clase, la
+llamada se rechaza de inmediato con `QuotaExceeded` (429 con `Retry-After`), que el servicio
+convierte en la última respuesta de la caché cuando existe.
+
+La clase de prioridad viaja en la variable de contexto `prioridad`, de modo que no hace falta
+pasarla por todas las funciones entre la ruta y la llamada al upstream. Una descarga que comparten
+varias solicitudes (la de un fallo de caché agrupado) usa una `PrioridadCompartida`: la clase más
+alta entre quienes la esperan, que sube también la llamada que ya está en la cola.
+"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import time
+
+from fastapi import HTTPException
+
+INTERACTIVE, BACKGROUND, BATCH = 0, 1, 2
+PRIORIDADES = {"interactive": INTERACTIVE, "background": BACKGROUND, "batch": BATCH}
+NOMBRES = {valor: nombre for nombre, valor in PRIORIDADES.items()}
+
+# Clase de prioridad de las llamadas al upstream hechas desde el contexto actual
+prioridad = contextvars.ContextVar("prioridad_upstream", default=INTERACTIVE)
+
+
+def con_prioridad(clase, fetch):
+    """
+    Envuelve una corrutina para que sus llamadas al upstream usen la clase de prioridad `clase`.
+
+    Parámetros:
+    - clase (int): INTERACTIVE, BACKGROUND o BATCH.
+    - fetch (callable): Corrutina a envolver.
+
+    Devuelve:
+    - callable: Corrutina con los mismos argumentos que `fetch`.
+    """
+    async def envuelta(*args, **kwargs):
+        token = prioridad.set(clase)
+        try:
+            return await fetch(*args, **kwargs)
+        finally:
+            prioridad.reset(token)
+
+    return envuelta
+
+
+class PrioridadCompartida:
+    """
+    Clase de prioridad de una descarga compartida: la más alta entre quienes la esperan.
+
+    Se guarda en la variable de contexto `prioridad` de la descarga. Si mientras espera cuota se
+    une una solicitud de mayor prioridad, la llamada encolada pasa a la clase de esta y a su
+    espera máxima, en lugar de seguir detrás de la cola de la clase con la que empezó.
+    """
+
+    def __init__(self):
+        self.clase = None
+        self._avisos = set()
+
+    def elevar(self, clase):
+        """
+        Sube la clase a `clase` si es de mayor prioridad que la actual.
+        """
+        if self.clase is not None and clase >= self.clase:
+            return
+        self.clase = clase
+        for aviso in list(self._avisos):
+            aviso()
+
+
+def clase_actual():
+    """
+    Devuelve la clase de prioridad (int) del contexto actual.
+    """
+    actual = prioridad.get()
+    return actual.clase if isinstance(actual, PrioridadCompartida) else actual
+
+
+def compartir_prioridad(fetch):
+    """
+    Prepara una descarga que van a compartir varias solicitudes (ver `TTLCache`).
+
+    La descarga empieza con la clase de su contexto y sube a la de cada solicitud que se une.
+
+    Parámetros:
+    - fetch (callable): Corrutina sin argumentos de la descarga.
+
+    Devuelve:
+    - tuple: (corrutina a ejecutar en lugar de `fetch`, función que llama cada solicitud que se
+        une a la descarga, desde su propio contexto).
+    """
+    compartida = PrioridadCompartida()
+
+    async def envuelta():
+        # Las solicitudes que se unieron antes de que la descarga empezara ya pudieron subirla
+        compartida.elevar(clase_actual())
+        token = prioridad.set(compartida)
+        try:
+            return await fetch()
+        finally:
+            prioridad.reset(token)
+
+    return envuelta, lambda: compartida.elevar(clase_actual())
+
+
+class QuotaExceeded(HTTPException):
+    """
+    No hay cuota de llamadas a OpenWeather disponible dentro de la espera máxima.
+
+    Parámetros:
+    - retry_after (float): Segundos estimados hasta que haya cuota.
+    """
+
+    def __init__(self, retry_after):
+        super().__init__(status_code=429, detail="Upstream quota exceeded",
+                         headers={"Retry-After": str(max(1, round(retry_after)))})
+        self.retry_after = retry_after
+
+
+class QuotaScheduler:
+    """
+    Token bucket con cola de prioridad para las llamadas al upstream.
+
+    El bucket admite ráfagas de hasta `burst` llamadas y se rellena a
+    `(calls_per_minute - burst) / 60` fichas por segundo, de modo que ninguna ventana de
+    60 segundos supera `calls_per_minute` llamadas.
+
+    Parámetros:
+    - calls_per_minute (int): Cuota del plan de OpenWeather.
+    - burst (int): Llamadas que se pueden hacer seguidas con el bucket lleno.
+    - max_wait (tuple): Espera máxima en segundos por clase (interactiva, segundo plano, lote).
+    - clock (callable): Reloj monotónico; se puede reemplazar en pruebas.
+    """
+
+    def __init__(self, calls_per_minute, burst=10, max_wait=(2.0, 10.0, 30.0), clock=time.monotonic):
+        self.calls_per_minute = calls_per_minute
+        self.burst = max(1, min(burst, calls_per_minute - 1))
+        self.rate = (calls_per_minute - self.burst) / 60
+        self.max_wait = tuple(max_wait)
+        self._clock = clock
+        self.tokens = float(self.burst)
+        self._actualizado = clock()
+        self._pausa_hasta = 0.0
+        # (clase, orden de llegada, futuro); los futuros cancelados se descartan al despachar
+        self._cola = []
+        self._orden = itertools.count()
+        self._despachador = None
+        self.granted = [0, 0, 0]
+        self.queued = [0, 0, 0]
+        self.throttled = [0, 0, 0]
+
+    def _rellenar(self):
+        now = self._clock()
+        desde = max(self._actualizado, self._pausa_hasta)
+        if now > desde:
+            self.tokens = min(float(self.burst), self.tokens + (now - desde) * self.rate)
+        self._actualizado = max(now, self._actualizado)
+
+    def depth(self, clase=None):
+        """
+        Número de llamadas esperando en la cola (de una clase o de todas).
+        """
+        return sum(1 for c, _, futuro in self._cola if not futuro.done() and (clase is None or c == clase))
+
+    def estimated_wait(self, clase):
+        """
+        Segundos estimados hasta que una nueva llamada de la clase `clase` obtenga ficha.
+        """
+        self._rellenar()
+        delante = sum(1 for c, _, futuro in self._cola if c <= clase and not futuro.done())
+        faltan = delante + 1 - self.tokens
+        pausa = max(0.0, self._pausa_hasta - self._clock())
+        return pausa + (max(0.0, faltan) / self.rate if self.rate > 0 else float("inf"))
+
+    def try_acquire(self):
+        """
+        Toma una ficha solo si hay una disponible sin esperar y nadie está en la cola.
+
+        Pensado para intentos extra (reintentos y coberturas) que no deben quitar cuota a
+        las llamadas en espera.
+
+        Devuelve:
+        - bool: True si se tomó la ficha.
+        """
+        self._rellenar()
+        if self.depth() or self.tokens < 1 or self._clock() < self._pausa_hasta:
+            return False
+        self.tokens -= 1
+        return True
+
+    async def acquire(self, clase=None):
+        """
+        Espera una ficha del bucket respetando la prioridad.
+
+        Parámetros:
+        - clase (int): Clase de prioridad; por defecto, la de la variable de contexto `prioridad`.
+
+        Si la clase viene de una `PrioridadCompartida` y esta sube mientras la llamada espera,
+        la llamada pasa a la nueva clase y a su espera máxima, contada desde ese momento.
+
+        Lanza:
+        - QuotaExceeded: Si la espera estimada o la real superan el máximo de la clase.
+        """
+        compartida = None
+        if clase is None:
+            clase = prioridad.get()
+            if isinstance(clase, PrioridadCompartida):
+                compartida, clase = clase, clase.clase
+        espera = self.estimated_wait(clase)
+        if espera <= 0 and not self.depth():
+            self.tokens -= 1
+            self.granted[clase] += 1
+            return
+        if espera > self.max_wait[clase]:
+            self.throttled[clase] += 1
+            raise QuotaExceeded(espera)
+
+        futuro = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._cola, (clase, next(self._orden), futuro))
+        self.queued[clase] += 1
+        if self._despachador is None or self._despachador.done():
+            self._despachador = asyncio.ensure_future(self._despachar())
+        loop = asyncio.get_running_loop()
+        limite = loop.time() + self.max_wait[clase]
+        elevada = asyncio.Event()
+        if compartida is not None:
+            compartida._avisos.add(elevada.set)
+        try:
+            while not futuro.done():
+                aviso = asyncio.ensure_future(elevada.wait())
+                try:
+                    await asyncio.wait((futuro, aviso), timeout=max(0.0, limite - loop.time()),
+                                       return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    aviso.cancel()
+                if futuro.done():
+                    break
+                if not elevada.is_set():
+                    # Llegaron llamadas de mayor prioridad por delante
+                    futuro.cancel()
+                    self.throttled[clase] += 1
+                    raise QuotaExceeded(self.estimated_wait(clase))
+                elevada.clear()
+                if compartida.clase < clase:
+                    # La llamada pasa a la cola de la nueva clase, detrás de las que ya esperaban en ella
+                    clase = compartida.clase
+                    self._cola = [item for item in self._cola if item[2] is not futuro]
+                    self._cola.append((clase, next(self._orden), futuro))
+                    heapq.heapify(self._cola)
+                    limite = loop.time() + self.max_wait[clase]
+        except asyncio.CancelledError:
+            futuro.cancel()
+            raise
+        finally:
+            if compartida is not None:
+                compartida._avisos.discard(elevada.set)
+        self.granted[clase] += 1
+
+    async def _despachar(self):
+        while self._cola:
+            self._rellenar()
+            while self._cola and self._cola[0][2].done():
+                heapq.heappop(self._cola)
+            if not self._cola:
+                break
+            if self.tokens >= 1 and self._clock() >= self._pausa_hasta:
+                self.tokens -= 1
+                heapq.heappop(self._cola)[2].set_result(None)
+                continue
+            pausa = max(0.0, self._pausa_hasta - self._clock())
+            await asyncio.sleep(pausa + max(0.0, 1 - self.tokens) / self.rate)
+
+    def pause(self, seconds):
+        """
+        Deja de entregar fichas durante `seconds` segundos (p. ej. tras un 429 del upstream,
+        que indica que la cuota real se agotó antes de lo previsto).
+        """
+        self._rellenar()
+        self.tokens = min(self.tokens, 0.0)
+        self._pausa_hasta = max(self._pausa_hasta, self._clock() + seconds)
+
+    def stats(self):
+        """
+        Devuelve la configuración, las fichas disponibles y, por clase, la profundidad de la cola
+        y las llamadas concedidas, encoladas y rechazadas.
+        """
+        self._rellenar()
+        return {
+            "calls_per_minute": self.calls_per_minute,
+            "burst": self.burst,
+            "tokens": round(self.tokens, 2),
+            "paused_for": round(max(0.0, self._pausa_hasta - self._clock()), 2),
+            "classes": {
+                nombre: {
+                    "queue_depth": self.depth(clase),
+                    "granted": self.granted[clase],
+                    "queued": self.queued[clase],
+                    "throttled": self.throttled[clase],
+                    "max_wait": self.max_wait[clase],
+                }
+                for clase, nombre in NOMBRES.items()
+            },
+        }
@@ -0,0 +1,367 @@
+"""
+Capa de resiliencia para las llamadas a OpenWeather.
+
+Envuelve cada GET al upstream con:
+
+- un plazo máximo por llamada (incluidos reintentos) y un timeout por intento;
+- reintentos con backoff exponencial y jitter completo ante errores de red, timeouts y
+  respuestas 5xx (solo para GET, que son idempotentes);
+- solicitudes de cobertura (hedging): si un intento tarda más que el percentil p95 reciente
+  del endpoint, se lanza una segunda solicitud y se usa la primera que responda bien;
+- un circuit breaker por endpoint que deja de llamar al upstream tras varios fallos seguidos
+  y prueba de nuevo pasado un tiempo.
+
+Cuando la llamada no se puede completar se lanza `UpstreamUnavailable`, que el servicio
+convierte en el último dato bueno de la caché (marcado como obsoleto) o en un 503/504.
+Con un `upstreamQuota.QuotaScheduler`, el primer intento espera su ficha de cuota y los
+reintentos y coberturas solo se hacen si hay cuota libre.
+"""
+
+import asyncio
+import random
+import time
+from collections import deque
+
+import httpx
+from fastapi import HTTPException
+
+from upstreamQuota import QuotaExceeded
+
+# Respuestas del upstream que se consideran fallos transitorios y se reintentan
+RETRY_STATUSES = frozenset((500, 502, 503, 504))
+
+
+class UpstreamUnavailable(HTTPException):
+    """
+    El upstream no respondió a tiempo, falló tras los reintentos o tiene el circuito abierto.
+
+    Parámetros:
+    - status_code (int): 503 (error o circuito abierto) o 504 (plazo agotado).
+    - detail (str): Descripción del error para el cliente.
+    - retry_after (float): Segundos sugeridos antes de reintentar (encabezado `Retry-After`).
+    """
+
+    def __init__(self, status_code, detail, retry_after=None):
+        headers = {"Retry-After": str(max(1, round(retry_after)))} if retry_after is not None else None
+        super().__init__(status_code=status_code, detail=detail, headers=headers)
+
+
+def _segundos(valor, por_defecto):
+    try:
+        return max(0.0, float(valor))
+    except (TypeError, ValueError):
+        return por_defecto
+
+
+class LatencyWindow:
+    """
+    Ventana de las latencias más recientes de un endpoint para estimar sus percentiles.
+
+    Parámetros:
+    - size (int): Número de muestras conservadas.
+    - min_samples (int): Muestras necesarias antes de estimar un percentil.
+    """
+
+    def __init__(self, size=200, min_samples=20):
+        self._muestras = deque(maxlen=size)
+        self.min_samples = min_samples
+
+    def __len__(self):
+        return len(self._muestras)
+
+    def add(self, seconds):
+        self._muestras.append(seconds)
+
+    def quantile(self, q):
+        """
+        Devuelve el percentil `q` (entre 0 y 1) de las muestras, o None si aún hay pocas.
+        """
+        if len(self._muestras) < self.min_samples:
+            return None
+        ordenadas = sorted(self._muestras)
+        return ordenadas[min(len(ordenadas) - 1, int(q * len(ordenadas)))]
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por fallos consecutivos.
+
+    Cerrado deja pasar todas las llamadas; tras `failure_threshold` fallos seguidos se abre y
+    las rechaza durante `reset_timeout` segundos; después pasa a semiabierto y deja pasar una
+    sola llamada de prueba, que lo cierra si tiene éxito o lo vuelve a abrir si falla.
+
+    Parámetros:
+    - failure_threshold (int): Fallos consecutivos que abren el circuito.
+    - reset_timeout (float): Segundos que el circuito permanece abierto.
+    - clock (callable): Reloj monotónico; se puede reemplazar en pruebas.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probando = False
+
+    def allow(self):
+        """
+        Indica si se puede llamar al upstream ahora.
+        """
+        if self.state == self.OPEN and self._clock() >= self.opened_at + self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._probando = False
+        if self.state == self.HALF_OPEN:
+            if self._probando:
+                return False
+            self._probando = True
+            return True
+        return self.state == self.CLOSED
+
+    def retry_after(self):
+        """
+        Segundos que faltan para que el circuito deje pasar una llamada de prueba.
+        """
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - self._clock())
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probando = False
+
+    def release(self):
+        """
+        Libera la llamada de prueba sin resultado (p. ej. si se canceló).
+        """
+        self._probando = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = self._clock()
+            self._probando = False
+
+
+class ResilientUpstream:
+    """
+    Ejecuta GET al upstream con plazo, reintentos, hedging y circuit breaker por endpoint.
+
+    Parámetros:
+    - send (callable): Corrutina `send(url, endpoint)` que hace un solo intento y devuelve
+        un `httpx.Response`.
+    - deadline (float): Segundos máximos por llamada, sumando todos los intentos y esperas.
+    - attempt_timeout (float): Segundos máximos por intento.
+    - retries (int): Reintentos tras el primer intento.
+    - backoff_base (float): Espera base del backoff exponencial en segundos.
+    - backoff_max (float): Espera máxima entre intentos.
+    - hedge_quantile (float): Percentil de latencia tras el cual se lanza la solicitud de
+        cobertura, o None para no usar hedging.
+    - hedge_budget (float): Fracción máxima de llamadas que pueden lanzar una cobertura,
+        para no duplicar la carga cuando todo el upstream está lento.
+    - hedge_min_delay (float): Espera mínima antes de lanzar una cobertura.
+    - failure_threshold (int): Fallos consecutivos que abren el circuito de un endpoint.
+    - reset_timeout (float): Segundos que el circuito permanece abierto.
+    - clock (callable): Reloj monotónico; se puede reemplazar en pruebas.
+    - rng (callable): Generador de números en [0, 1) para el jitter.
+    - quota (QuotaScheduler): Cuota de llamadas del upstream, o None para no limitarlas.
+    """
+
+    def __init__(self, send, deadline=4.0, attempt_timeout=2.0, retries=2, backoff_base=0.1, backoff_max=1.0,
+                 hedge_quantile=0.95, hedge_budget=0.1, hedge_min_delay=0.05, failure_threshold=5,
+                 reset_timeout=30.0, clock=time.monotonic, rng=random.random, quota=None):
+        self._send = send
+        self.quota = quota
+        self.deadline = deadline
+        self.attempt_timeout = attempt_timeout
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_quantile = hedge_quantile
+        self.hedge_budget = hedge_budget
+        self.hedge_min_delay = hedge_min_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._rng = rng
+        self.breakers = {}
+        self.latencies = {}
+        self.calls = 0
+        self.retried = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.rejected = 0
+        self.rate_limited = 0
+
+    def breaker(self, endpoint):
+        """
+        Devuelve el circuit breaker de un endpoint, creándolo la primera vez.
+        """
+        breaker = self.breakers.get(endpoint)
+        if breaker is None:
+            breaker = self.breakers[endpoint] = CircuitBreaker(self.failure_threshold, self.reset_timeout, self._clock)
+        return breaker
+
+    def _latencias(self, endpoint):
+        window = self.latencies.get(endpoint)
+        if window is None:
+            window = self.latencies[endpoint] = LatencyWindow()
+        return window
+
+    def backoff(self, intento):
+        """
+        Espera antes del reintento número `intento` (1, 2, ...): jitter completo sobre un
+        backoff exponencial, para que los clientes no reintenten todos a la vez.
+        """
+        return self._rng() * min(self.backoff_max, self.backoff_base * 2 ** (intento - 1))
+
+    def hedge_delay(self, endpoint):
+        """
+        Segundos tras los cuales un intento lento recibe una solicitud de cobertura, o None si
+        el hedging está desactivado, aún no hay muestras suficientes o se agotó el presupuesto.
+        """
+        if self.hedge_quantile is None or self.hedged >= self.hedge_budget * max(1, self.calls):
+            return None
+        percentil = self._latencias(endpoint).quantile(self.hedge_quantile)
+        return None if percentil is None else max(self.hedge_min_delay, percentil)
+
+    async def get(self, url, endpoint, metered=True):
+        """
+        Hace un GET resiliente al upstream.
+
+        Parámetros:
+        - url (str): URL completa a consultar.
+        - endpoint (str): Nombre del endpoint ("weather", "forecast", "icon"); cada uno tiene
+            su propio circuit breaker y su propia ventana de latencias.
+        - metered (bool): Si la llamada cuenta para la cuota (los íconos no cuentan).
+
+        Devuelve:
+        - httpx.Response: Primera respuesta que no es un fallo transitorio (puede ser 4xx).
+
+        Lanza:
+        - UpstreamUnavailable: 503 si el circuito está abierto o fallaron todos los intentos,
+            504 si se agotó el plazo.
+        - QuotaExceeded: 429 si no hay cuota dentro de la espera máxima o si el upstream
+            respondió 429.
+        """
+        breaker = self.breaker(endpoint)
+        if not breaker.allow():
+            self.rejected += 1
+            raise UpstreamUnavailable(503, "Upstream unavailable", retry_after=breaker.retry_after())
+        quota = self.quota if metered else None
+        if quota is not None:
+            try:
+                await quota.acquire()
+            except BaseException:
+                breaker.release()
+                raise
+
+        self.calls += 1
+        try:
+            response = await asyncio.wait_for(self._intentos(url, endpoint, quota), self.deadline)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            breaker.record_failure()
+            raise UpstreamUnavailable(504, "Upstream timeout", retry_after=breaker.retry_after() or None)
+        except (httpx.HTTPError, UpstreamUnavailable):
+            self.failures += 1
+            breaker.record_failure()
+            raise UpstreamUnavailable(503, "API call failed", retry_after=breaker.retry_after() or None)
+        except BaseException:
+            breaker.release()
+            raise
+        # Un 429 indica que el upstream responde, pero que la cuota real se agotó
+        breaker.record_success()
+        if response.status_code == 429:
+            self.rate_limited += 1
+            retry_after = _segundos(response.headers.get("retry-after"), 60.0)
+            if quota is not None:
+                quota.pause(retry_after)
+            raise QuotaExceeded(retry_after)
+        return response
+
+    async def _intentos(self, url, endpoint, quota):
+        for intento in range(self.retries + 1):
+            if intento:
+                if quota is not None and not quota.try_acquire():
+                    break
+                self.retried += 1
+                await asyncio.sleep(self.backoff(intento))
+            try:
+                response = await self._con_cobertura(url, endpoint, quota)
+            except (httpx.TransportError, asyncio.TimeoutError):
+                continue
+            if response.status_code not in RETRY_STATUSES:
+                return response
+        raise UpstreamUnavailable(503, "API call failed")
+
+    async def _intento(self, url, endpoint):
+        inicio = self._clock()
+        response = await asyncio.wait_for(self._send(url, endpoint), self.attempt_timeout)
+        if response.status_code not in RETRY_STATUSES:
+            self._latencias(endpoint).add(self._clock() - inicio)
+        return response
+
+    async def _con_cobertura(self, url, endpoint, quota):
+        delay = self.hedge_delay(endpoint)
+        if delay is None:
+            return await self._intento(url, endpoint)
+
+        primero = asyncio.ensure_future(self._intento(url, endpoint))
+        pendientes = {primero}
+        try:
+            hechos, pendientes = await asyncio.wait(pendientes, timeout=delay)
+            if not hechos and (quota is None or quota.try_acquire()):
+                self.hedged += 1
+                pendientes.add(asyncio.ensure_future(self._intento(url, endpoint)))
+            resultado = None
+            while hechos or pendientes:
+                for tarea in hechos:
+                    if tarea.exception() is None and tarea.result().status_code not in RETRY_STATUSES:
+                        if tarea is not primero:
+                            self.hedge_wins += 1
+                        return tarea.result()
+                    resultado = tarea
+                if not pendientes:
+                    break
+                hechos, pendientes = await asyncio.wait(pendientes, return_when=asyncio.FIRST_COMPLETED)
+            # Ningún intento respondió bien: se propaga el último resultado
+            return resultado.result()
+        finally:
+            for tarea in pendientes:
+                tarea.cancel()
+
+    def stats(self):
+        """
+        Devuelve los contadores de la capa de resiliencia y el estado de cada circuito.
+
+        Devuelve:
+        - dict: Llamadas, reintentos, coberturas (y cuántas ganaron), timeouts, fallos, llamadas
+            rechazadas por circuito abierto, respuestas 429 del upstream y, por endpoint, el
+            estado del circuito y el p95.
+        """
+        return {
+            "calls": self.calls,
+            "retried": self.retried,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "timeouts": self.timeouts,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "rate_limited": self.rate_limited,
+            "endpoints": {
+                endpoint: {
+                    "state": breaker.state,
+                    "consecutive_failures": breaker.failures,
+                    "p95": self._latencias(endpoint).quantile(0.95),
+                }
+                for endpoint, breaker in self.breakers.items()
+            },
+        }
@@ -0,0 +1,254 @@
+"""
+Recursos gráficos del servicio: íconos de condición e imágenes de fondo.
+
+Las imágenes de `images/` se redimensionan y recomprimen (JPEG progresivo y WebP) a unos
+pocos anchos fijos, y cada variante se genera una sola vez; el servicio guarda además en
+memoria los íconos de OpenWeather (ver `OpenWeather.obtener_icono`). Con un directorio de caché,
+variantes e íconos se guardan también en disco, de modo que los workers del servicio (y sus
+reinicios) los comparten en lugar de generarlos o descargarlos cada uno. Las respuestas llevan
+ETag y Cache-Control de larga duración, de modo que el navegador no vuelve a descargarlas
+en cada actualización.
+
+También relaciona cada código de condición de OpenWeather con su ícono, su imagen de fondo
+(con variante nocturna cuando existe) y una leyenda.
+"""
+
+import hashlib
+import io
+import os
+import threading
+
+from PIL import Image, features
+
+# Íconos de OpenWeather: https://openweathermap.org/weather-conditions
+ICONOS = tuple(f"{codigo}{momento}" for codigo in ("01", "02", "03", "04", "09", "10", "11", "13", "50")
+               for momento in "dn")
+
+# Grupos de condiciones: (ícono, fondo, leyenda de día, leyenda de noche)
+_GRUPOS = {
+    "thunderstorm": ("11", "rainy", "Día con tormenta", "Noche con tormenta"),
+    "drizzle": ("09", "rainy", "Día con llovizna", "Noche con llovizna"),
+    "rain": ("10", "rainy", "Día con lluvia", "Noche con lluvia"),
+    "shower": ("09", "rainy", "Día con chubascos", "Noche con chubascos"),
+    "freezing": ("13", "snowy", "Día con lluvia helada", "Noche con lluvia helada"),
+    "snow": ("13", "snowy", "Día con nieve", "Noche con nieve"),
+    "atmosphere": ("50", "cloudy", "Día con visibilidad reducida", "Noche con visibilidad reducida"),
+    "clear": ("01", "clear", "Día despejado", "Noche despejada"),
+    "few_clouds": ("02", "cloudy", "Día parcialmente nublado", "Noche parcialmente nublada"),
+    "scattered_clouds": ("03", "cloudy", "Día nublado", "Noche nublada"),
+    "broken_clouds": ("04", "cloudy", "Día muy nublado", "Noche muy nublada"),
+}
+
+_CODIGOS = {
+    "thunderstorm": (200, 201, 202, 210, 211, 212, 221, 230, 231, 232),
+    "drizzle": (300, 301, 302, 310, 311, 312, 313, 314, 321),
+    "rain": (500, 501, 502, 503, 504),
+    "freezing": (511,),
+    "shower": (520, 521, 522, 531),
+    "snow": (600, 601, 602, 611, 612, 613, 615, 616, 620, 621, 622),
+    "atmosphere": (701, 711, 721, 731, 741, 751, 761, 762, 771, 781),
+    "clear": (800,),
+    "few_clouds": (801,),
+    "scattered_clouds": (802,),
+    "broken_clouds": (803, 804),
+}
+
+# Código de condición de OpenWeather -> grupo
+CONDICIONES = {codigo: grupo for grupo, codigos in _CODIGOS.items() for codigo in codigos}
+
+FONDO_DESCONOCIDO = "cloudy"
+LEYENDA_DESCONOCIDA = "Estado del tiempo desconocido"
+
+MEDIA_TYPES = {"jpg": "image/jpeg", "webp": "image/webp", "png": "image/png"}
+
+
+def _fondos_disponibles(directorio):
+    if not os.path.isdir(directorio):
+        return {}
+    return {os.path.splitext(nombre)[0]: os.path.join(directorio, nombre) for nombre in sorted(os.listdir(directorio))
+            if os.path.splitext(nombre)[1].lower() in (".jpg", ".jpeg", ".png")}
+
+
+IMAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "images")
+# Nombre del fondo (sin extensión) -> ruta del archivo original
+FONDOS = _fondos_disponibles(IMAGES_DIR)
+
+
+def leer_archivo(ruta):
+    """
+    Devuelve el contenido de un archivo de la caché en disco, o None si no existe.
+    """
+    try:
+        with open(ruta, "rb") as archivo:
+            return archivo.read()
+    except FileNotFoundError:
+        return None
+
+
+def guardar_archivo(ruta, datos):
+    """
+    Escribe un archivo de la caché en disco de forma atómica (archivo temporal + `os.replace`),
+    para que otro worker nunca lea uno a medio escribir.
+    """
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporal, "wb") as archivo:
+        archivo.write(datos)
+    os.replace(temporal, ruta)
+
+
+def recurso_para(condition_id, icon=None, fondos=None):
+    """
+    Devuelve el ícono, la imagen de fondo y la leyenda de una condición de OpenWeather.
+
+    De noche se usa la variante nocturna del fondo (`<fondo>_n`) si existe; si no, la diurna.
+
+    Parámetros:
+    - condition_id (int): Código de condición (`weather[0].id`), p. ej. 500.
+    - icon (str): Ícono que envía OpenWeather (p. ej. "10n"); su última letra indica día o noche.
+    - fondos (collection): Nombres de fondos disponibles (sin extensión). Por defecto, los de `images/`.
+
+    Devuelve:
+    - dict: {"icon": "10n", "background": "rainy", "caption": "Noche con lluvia"}.
+    """
+    noche = bool(icon) and icon.endswith("n")
+    grupo = _GRUPOS.get(CONDICIONES.get(condition_id))
+    if grupo is None:
+        codigo = icon[:2] if icon else "03"
+        return {"icon": codigo + ("n" if noche else "d"), "background": FONDO_DESCONOCIDO,
+                "caption": LEYENDA_DESCONOCIDA}
+
+    codigo, fondo, leyenda_dia, leyenda_noche = grupo
+    fondos = FONDOS if fondos is None else fondos
+    if noche and f"{fondo}_n" in fondos:
+        fondo = f"{fondo}_n"
+    return {"icon": codigo + ("n" if noche else "d"), "background": fondo,
+            "caption": leyenda_noche if noche else leyenda_dia}
+
+
+class Asset:
+    """
+    Contenido binario de un recurso con su tipo y su ETag.
+    """
+
+    __slots__ = ("body", "media_type", "etag")
+
+    def __init__(self, body, media_type):
+        self.body = body
+        self.media_type = media_type
+        self.etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+
+
+class AssetStore:
+    """
+    Caché en memoria de las variantes redimensionadas y recomprimidas de las imágenes de fondo.
+
+    Parámetros:
+    - fondos (dict): Nombre del fondo -> ruta del archivo original.
+    - widths (tuple): Anchos (px) permitidos para las variantes de fondo.
+    - jpeg_quality (int): Calidad de las variantes JPEG.
+    - webp_quality (int): Calidad de las variantes WebP.
+    - cache_dir (str): Directorio donde guardar las variantes generadas, compartido entre procesos.
+        Por defecto (None) solo se guardan en memoria.
+    """
+
+    def __init__(self, fondos=None, widths=(640, 1280, 1920), jpeg_quality=80, webp_quality=75, cache_dir=None):
+        self.fondos = FONDOS if fondos is None else fondos
+        self.cache_dir = cache_dir
+        self.widths = tuple(sorted(widths))
+        self.jpeg_quality = jpeg_quality
+        self.webp_quality = webp_quality
+        self.formats = ("jpg", "webp") if features.check("webp") else ("jpg",)
+        self._lock = threading.Lock()
+        self._variantes = {}
+        self.generated = 0
+        self.disk_hits = 0
+
+    def background(self, nombre, width=None, formato="jpg"):
+        """
+        Devuelve una variante redimensionada y recomprimida de un fondo, generándola una sola vez.
+
+        Es trabajo de CPU: desde el servicio conviene llamarla con `asyncio.to_thread`.
+
+        Parámetros:
+        - nombre (str): Fondo sin extensión, p. ej. "clear_n".
+        - width (int): Ancho deseado; se usa el menor ancho permitido que sea mayor o igual
+            (por defecto, el mayor).
+        - formato (str): "jpg" o "webp"; si Pillow no tiene soporte para WebP se usa JPEG.
+
+        Devuelve:
+        - Asset: La variante, o None si el fondo no existe.
+        """
+        if nombre not in self.fondos:
+            return None
+        if formato not in self.formats:
+            formato = "jpg"
+        ancho = next((w for w in self.widths if width is not None and w >= width), self.widths[-1])
+        clave = (nombre, ancho, formato)
+        asset = self._variantes.get(clave)
+        if asset is None:
+            asset = self._cargar_o_generar(nombre, ancho, formato)
+            with self._lock:
+                asset = self._variantes.setdefault(clave, asset)
+        return asset
+
+    def _ruta_en_disco(self, nombre, ancho, formato):
+        # El nombre incluye la calidad y la versión del original: si cambian, la variante se regenera
+        ruta = self.fondos[nombre]
+        estado = os.stat(ruta)
+        calidad = self.webp_quality if formato == "webp" else self.jpeg_quality
+        version = hashlib.sha1(f"{ruta}:{estado.st_size}:{estado.st_mtime_ns}".encode()).hexdigest()[:12]
+        return os.path.join(self.cache_dir, "backgrounds", f"{nombre}-{ancho}w-q{calidad}-{version}.{formato}")
+
+    def _cargar_o_generar(self, nombre, ancho, formato):
+        ruta = self._ruta_en_disco(nombre, ancho, formato) if self.cache_dir else None
+        if ruta is not None:
+            body = leer_archivo(ruta)
+            if body is not None:
+                self.disk_hits += 1
+                return Asset(body, MEDIA_TYPES[formato])
+        asset = self._generar(self.fondos[nombre], ancho, formato)
+        self.generated += 1
+        if ruta is not None:
+            guardar_archivo(ruta, asset.body)
+        return asset
+
+    def _generar(self, ruta, ancho, formato):
+        with Image.open(ruta) as imagen:
+            imagen = imagen.convert("RGB")
+            if imagen.width > ancho:
+                alto = round(imagen.height * ancho / imagen.width)
+                imagen = imagen.resize((ancho, alto), Image.Resampling.LANCZOS)
+            salida = io.BytesIO()
+            if formato == "webp":
+                imagen.save(salida, "WEBP", quality=self.webp_quality, method=6)
+            else:
+                imagen.save(salida, "JPEG", quality=self.jpeg_quality, optimize=True, progressive=True)
+        return Asset(salida.getvalue(), MEDIA_TYPES[formato])
+
+    def precompute(self):
+        """
+        Genera todas las variantes de todos los fondos (p. ej. al iniciar el servicio).
+
+        Devuelve:
+        - int: Número de variantes en caché.
+        """
+        for nombre in self.fondos:
+            for ancho in self.widths:
+                for formato in self.formats:
+                    self.background(nombre, ancho, formato)
+        return len(self._variantes)
+
+    def stats(self):
+        """
+        Devuelve cuántas variantes de fondo hay en memoria, cuántas se generaron y cuántas se
+        leyeron de la caché en disco, y cuántos bytes ocupan frente al tamaño de los originales.
+        """
+        variantes = list(self._variantes.values())
+        return {
+            "backgrounds": len(variantes),
+            "generated": self.generated,
+            "disk_hits": self.disk_hits,
+            "background_bytes": sum(len(a.body) for a in variantes),
+            "original_background_bytes": sum(os.path.getsize(r) for r in self.fondos.values()),
+        }
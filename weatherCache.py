@@ -0,0 +1,333 @@
+"""
+Caché en memoria con expiración (TTL) y desalojo LRU para las respuestas de OpenWeather.
+
+La caché limita tanto el número de entradas como el total de bytes almacenados, y agrupa
+las solicitudes concurrentes para una misma clave en una sola llamada al upstream. Las entradas
+vencidas pueden conservarse un tiempo más para responder mientras se revalidan en segundo plano
+o cuando el upstream no está disponible.
+
+Con varios workers, un backend compartido (`cacheBackends`) hace de segundo nivel: los fallos
+del nivel local se buscan primero en el backend, y un candado por clave hace que solo un worker
+descargue cada respuesta.
+"""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict
+
+from cacheBackends import CacheBackendError
+
+
+def normalizar_ciudad(city):
+    """
+    Normaliza el nombre de una ciudad para usarlo como clave de caché.
+
+    Elimina espacios sobrantes y diferencias de mayúsculas, de modo que "london" y "London "
+    comparten la misma entrada.
+
+    Parámetros:
+    - city (str): Nombre de la ciudad tal como llega en la solicitud.
+
+    Devuelve:
+    - str: Clave normalizada.
+    """
+    return " ".join(city.split()).casefold()
+
+
+class TTLCache:
+    """
+    Caché LRU con expiración por tiempo y límites por número de entradas y por bytes.
+
+    Parámetros:
+    - ttl (float): Segundos que una entrada se considera fresca.
+    - max_entries (int): Número máximo de entradas antes de desalojar la menos usada.
+    - max_bytes (int): Tamaño total máximo (suma de los tamaños declarados de cada entrada).
+    - clock (callable): Reloj monotónico; se puede reemplazar en pruebas.
+    - stale_ttl (float): Segundos que una entrada vencida se conserva para `get_stale`.
+    - revalidate (float): Segundos tras el vencimiento durante los que `get_or_fetch` devuelve
+        la entrada vencida de inmediato y la renueva en segundo plano (stale-while-revalidate).
+        No puede superar `stale_ttl`.
+    - background (callable): Recibe la corrutina `fetch` de una revalidación en segundo plano y
+        devuelve la que se ejecuta en su lugar (p. ej. para bajarle la prioridad). Opcional.
+    - coalesce (callable): Recibe la corrutina `fetch` de cada descarga y devuelve una tupla
+        (corrutina a ejecutar en su lugar, función sin argumentos que se llama desde el contexto
+        de cada solicitud que se une a la descarga), p. ej. `upstreamQuota.compartir_prioridad`
+        para que la descarga compartida tenga la prioridad más alta entre quienes la esperan.
+        Opcional.
+    - backend: Backend compartido entre procesos (ver `cacheBackends`) usado como segundo nivel.
+        Opcional; si falla, la caché descarga directamente.
+    - namespace (str): Prefijo de las claves en el backend, para que varias cachés lo compartan.
+    - lease (float): Segundos máximos que un worker espera a que otro termine la descarga de una
+        clave antes de descargarla él mismo (duración del candado en el backend).
+    - poll_interval (float): Segundos entre consultas al backend mientras se espera a otro worker.
+    """
+
+    def __init__(self, ttl, max_entries=1024, max_bytes=16 * 1024 * 1024, clock=time.monotonic,
+                 stale_ttl=0.0, revalidate=0.0, background=None, coalesce=None, backend=None, namespace="",
+                 lease=5.0, poll_interval=0.025):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self.stale_ttl = max(stale_ttl, revalidate)
+        self.revalidate = revalidate
+        self.background = background
+        self.coalesce = coalesce
+        self.backend = backend
+        self.namespace = namespace
+        self.lease = lease
+        self.poll_interval = poll_interval
+        # clave -> (expira_en, tamaño, valor); el orden refleja el uso (LRU al inicio)
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._al_unirse = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.revalidations = 0
+        self.stale = 0
+        self.shared_hits = 0
+        self.shared_waits = 0
+        self.backend_errors = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Devuelve el valor fresco asociado a `key`, o None si no existe o ya expiró.
+
+        Las entradas vencidas se quitan al pasar `stale_ttl` segundos de su vencimiento.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, _, value = entry
+        now = self._clock()
+        if expires_at <= now:
+            if expires_at + self.stale_ttl <= now:
+                self._remove(key)
+                self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def get_stale(self, key):
+        """
+        Devuelve la última entrada de `key` aunque esté vencida, si sigue dentro de `stale_ttl`.
+
+        Pensado para responder con el último dato bueno cuando el upstream no está disponible.
+
+        Devuelve:
+        - tuple or None: (valor, segundos desde que se guardó), o None si no hay entrada.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, _, value = entry
+        now = self._clock()
+        if expires_at + self.stale_ttl <= now:
+            return None
+        if expires_at <= now:
+            self.stale += 1
+        return value, now - (expires_at - self.ttl)
+
+    def has(self, key):
+        """
+        Indica si `key` tiene una entrada fresca o una descarga en curso.
+
+        A diferencia de `get`, no cuenta como acceso: no cambia el orden LRU ni los contadores.
+        """
+        if key in self._inflight:
+            return True
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] > self._clock()
+
+    def set(self, key, value, size=0, ttl=None):
+        """
+        Guarda `value` bajo `key` y desaloja entradas LRU hasta respetar los límites.
+
+        Las entradas más grandes que `max_bytes` no se almacenan. `ttl` permite guardar una
+        entrada con menos vida que la de la caché (p. ej. lo que le queda a una entrada copiada
+        del backend compartido).
+        """
+        if key in self._entries:
+            self._remove(key)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (self._clock() + (self.ttl if ttl is None else ttl), size, value)
+        self.bytes += size
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.bytes -= size
+
+    async def get_or_fetch(self, key, fetch):
+        """
+        Devuelve el valor en caché o lo obtiene con `fetch`, agrupando llamadas concurrentes.
+
+        Si varias corrutinas piden la misma clave mientras no está en caché, solo la primera
+        ejecuta `fetch`; el resto espera ese mismo resultado (o excepción). Cancelar a quien
+        espera no cancela la descarga compartida. Si la entrada venció hace menos de `revalidate`
+        segundos, se devuelve de inmediato y la descarga sigue en segundo plano.
+
+        Parámetros:
+        - key (str): Clave normalizada.
+        - fetch (callable): Corrutina sin argumentos que devuelve una tupla (valor, tamaño_en_bytes).
+
+        Devuelve:
+        - El valor almacenado o recién obtenido.
+        """
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        entry = self._entries.get(key) if self.revalidate > 0 else None
+        revalidar = entry is not None and entry[0] + self.revalidate > self._clock()
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            if self.coalesce is not None:
+                fetch, self._al_unirse[key] = self.coalesce(fetch)
+            if revalidar and self.background is not None:
+                fetch = self.background(fetch)
+            task = asyncio.ensure_future(self._fill(key, fetch))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._fill_done(key, t))
+        elif not revalidar:
+            self.coalesced += 1
+            if key in self._al_unirse:
+                self._al_unirse[key]()
+
+        if revalidar:
+            self.revalidations += 1
+            return entry[2]
+        return await asyncio.shield(task)
+
+    async def recover(self, key):
+        """
+        Como `get_stale`, pero si el nivel local no tiene la entrada la busca en el backend
+        compartido (otro worker pudo haberla descargado).
+
+        Devuelve:
+        - tuple or None: (valor, segundos desde que se guardó), o None si no hay entrada.
+        """
+        anterior = self.get_stale(key)
+        if anterior is not None or self.backend is None:
+            return anterior
+        try:
+            entry = await self.backend.get(self.namespace + key)
+        except CacheBackendError:
+            self.backend_errors += 1
+            return None
+        if entry is None:
+            return None
+        now = time.time()
+        if entry.expires_at <= now:
+            self.stale += 1
+        return entry.value, now - entry.stored_at
+
+    async def _fill(self, key, fetch):
+        if self.backend is None:
+            value, size = await fetch()
+            self.set(key, value, size)
+            return value
+
+        token = None
+        try:
+            token, entry = await self._esperar_compartida(key)
+        except CacheBackendError:
+            self.backend_errors += 1
+            entry = None
+        if entry is not None:
+            self.shared_hits += 1
+            self.set(key, entry.value, entry.size, entry.expires_at - time.time())
+            return entry.value
+
+        try:
+            value, size = await fetch()
+            self.set(key, value, size)
+            try:
+                await self.backend.set(self.namespace + key, value, self.ttl, self.stale_ttl)
+            except CacheBackendError:
+                self.backend_errors += 1
+        finally:
+            if token is not None:
+                try:
+                    await self.backend.release(self.namespace + key, token)
+                except CacheBackendError:
+                    self.backend_errors += 1
+        return value
+
+    async def _esperar_compartida(self, key):
+        """
+        Busca `key` fresca en el backend o toma su candado de descarga.
+
+        Si otro worker tiene el candado, consulta el backend cada `poll_interval` segundos hasta
+        que aparezca la entrada o pase `lease`; en ese caso se descarga sin candado.
+
+        Devuelve:
+        - tuple: (token del candado o None, entrada fresca del backend o None).
+        """
+        clave = self.namespace + key
+        limite = time.monotonic() + self.lease
+        esperando = False
+        while True:
+            entry = await self.backend.get(clave)
+            if entry is not None and entry.expires_at > time.time():
+                return None, entry
+            token = await self.backend.acquire(clave, self.lease)
+            if token is not None or time.monotonic() >= limite:
+                return token, None
+            if not esperando:
+                esperando = True
+                self.shared_waits += 1
+            await asyncio.sleep(self.poll_interval)
+
+    def _fill_done(self, key, task):
+        self._inflight.pop(key, None)
+        self._al_unirse.pop(key, None)
+        # Marcar la excepción como recuperada aunque nadie siga esperando la tarea
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self):
+        """
+        Devuelve los contadores de la caché para dimensionarla.
+
+        Devuelve:
+        - dict: Aciertos, fallos, solicitudes agrupadas, desalojos, expiraciones, entradas y bytes,
+            respuestas vencidas servidas mientras se revalidaban o por falta de upstream, y fallos
+            locales resueltos por el backend compartido (directamente o tras esperar a otro worker).
+        """
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "revalidations": self.revalidations,
+            "stale": self.stale,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            # None para cachés sin expiración (ttl infinito), que no se pueden representar en JSON
+            "ttl": self.ttl if math.isfinite(self.ttl) else None,
+            "stale_ttl": self.stale_ttl,
+            "shared_hits": self.shared_hits,
+            "shared_waits": self.shared_waits,
+            "backend_errors": self.backend_errors,
+        }
@@ -0,0 +1,189 @@
+"""
+Formas de respuesta del servicio: proyección de campos, modelo compacto y serialización rápida.
+
+El front end solo usa unos pocos campos de las respuestas de OpenWeather. Este módulo permite
+recortar la respuesta (`fields=` o `compact=true`) y serializarla con orjson o MessagePack
+cuando están instalados, según el encabezado `Accept` del cliente.
+"""
+
+import json
+from typing import List, Optional
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: se usa json de la biblioteca estándar
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # MessagePack es opcional: sin él siempre se responde JSON
+    msgpack = None
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+
+_MAIN_ACTUAL = ("temp", "feels_like", "temp_min", "temp_max", "pressure", "humidity")
+_MAIN_PRONOSTICO = ("temp", "temp_min", "temp_max", "pressure", "humidity")
+
+
+class Condition(BaseModel):
+    id: Optional[int] = None
+    main: Optional[str] = None
+    description: Optional[str] = None
+    icon: Optional[str] = None
+
+
+class CompactMain(BaseModel):
+    temp: Optional[float] = None
+    feels_like: Optional[float] = None
+    temp_min: Optional[float] = None
+    temp_max: Optional[float] = None
+    pressure: Optional[float] = None
+    humidity: Optional[float] = None
+
+
+class CompactSys(BaseModel):
+    country: Optional[str] = None
+    sunrise: Optional[int] = None
+    sunset: Optional[int] = None
+
+
+class Coord(BaseModel):
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+
+
+class CompactWind(BaseModel):
+    speed: Optional[float] = None
+    deg: Optional[float] = None
+
+
+class Stale(BaseModel):
+    age: int
+
+
+class CompactWeather(BaseModel):
+    """
+    Forma de `/weather/{city}?compact=true`: todos los campos están siempre presentes, con None
+    cuando OpenWeather no los envía. Solo documenta la respuesta en OpenAPI; el servicio la
+    construye como dict (`compactar_actual`) para no validar en cada solicitud.
+    """
+    name: Optional[str] = None
+    weather: List[Condition] = []
+    main: CompactMain
+    sys: CompactSys
+    coord: Coord
+    wind: CompactWind
+    timezone: Optional[int] = None
+    dt: Optional[int] = None
+    stale: Optional[Stale] = None
+
+
+def _subset(data, keys):
+    return {key: data[key] for key in keys if key in data}
+
+
+def _campos(data, keys):
+    # Todas las claves, con None para las que falten (o si el bloque entero no vino)
+    data = data or {}
+    return {key: data.get(key) for key in keys}
+
+
+def compactar_actual(data):
+    """
+    Normaliza la respuesta del clima actual a los campos que usa el front end (`CompactWeather`).
+
+    Conserva `name`, `weather` (solo la condición principal), `main`, `sys`, `coord`, `wind`,
+    `timezone` y `dt`, con la misma estructura que la respuesta original de OpenWeather, y la
+    marca `stale` de las respuestas obsoletas. Los bloques opcionales que OpenWeather no envía
+    quedan con sus campos en None.
+
+    Parámetros:
+    - data (dict): Respuesta de OpenWeather para el clima actual.
+
+    Devuelve:
+    - dict: Respuesta compacta.
+    """
+    compacto = {
+        "name": data.get("name"),
+        "weather": (data.get("weather") or [])[:1],
+        "main": _campos(data.get("main"), _MAIN_ACTUAL),
+        "sys": _campos(data.get("sys"), ("country", "sunrise", "sunset")),
+        "coord": _campos(data.get("coord"), ("lat", "lon")),
+        "wind": _campos(data.get("wind"), ("speed", "deg")),
+        "timezone": data.get("timezone"),
+        "dt": data.get("dt"),
+    }
+    if "stale" in data:
+        compacto["stale"] = data["stale"]
+    return compacto
+
+
+def compactar_pronostico(data):
+    """
+    Normaliza la respuesta del pronóstico a los campos que se usan para mostrarlo.
+
+    Parámetros:
+    - data (dict): Respuesta de OpenWeather para el pronóstico de 5 días.
+
+    Devuelve:
+    - dict: {"city": {...}, "list": [{"dt", "dt_txt", "main", "weather", "wind"}, ...]},
+            más la marca `stale` si la respuesta es obsoleta.
+    """
+    compacto = {
+        "city": _subset(data.get("city") or {}, ("name", "country", "coord", "timezone")),
+        "list": [
+            {
+                "dt": entry["dt"],
+                "dt_txt": entry.get("dt_txt"),
+                "main": _subset(entry.get("main") or {}, _MAIN_PRONOSTICO),
+                "weather": (entry.get("weather") or [])[:1],
+                "wind": _subset(entry.get("wind") or {}, ("speed",)),
+            }
+            for entry in data.get("list", [])
+        ],
+    }
+    if "stale" in data:
+        compacto["stale"] = data["stale"]
+    return compacto
+
+
+def proyectar(data, fields):
+    """
+    Devuelve solo los campos de primer nivel pedidos en `fields`.
+
+    Parámetros:
+    - data (dict): Respuesta a recortar.
+    - fields (str): Nombres separados por comas, p. ej. "name,main,weather". Si es None o
+        vacío, se devuelve `data` sin cambios. Los campos inexistentes se ignoran.
+
+    Devuelve:
+    - dict: Respuesta proyectada.
+    """
+    if not fields:
+        return data
+    return _subset(data, [field.strip() for field in fields.split(",")])
+
+
+def responder(payload, accept=None):
+    """
+    Serializa `payload` con el formato más rápido disponible.
+
+    Si el cliente acepta MessagePack y `msgpack` está instalado, responde en ese formato;
+    si no, responde JSON usando orjson cuando está instalado.
+
+    Parámetros:
+    - payload (dict): Datos a enviar (solo tipos JSON).
+    - accept (str): Valor del encabezado `Accept` de la solicitud.
+
+    Devuelve:
+    - fastapi.responses.Response: Respuesta ya serializada.
+    """
+    if msgpack is not None and accept and any(t in accept for t in MSGPACK_TYPES):
+        return Response(msgpack.packb(payload), media_type="application/msgpack")
+    if orjson is not None:
+        return Response(orjson.dumps(payload), media_type="application/json")
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return Response(body, media_type="application/json")
@@ -0,0 +1,115 @@
+"""
+Planificador de consultas periódicas del clima compartido entre todos los clientes.
+
+Mantiene un registro de ciudades seguidas con su número de suscriptores. Cada ciudad se
+consulta una sola vez por intervalo sin importar cuántos clientes la estén viendo, y el
+resultado se publica en la cola de cada suscriptor.
+"""
+
+import asyncio
+
+from weatherCache import normalizar_ciudad
+
+
+class _CiudadSeguida:
+    def __init__(self, city):
+        self.city = city
+        self.subscribers = set()
+        self.task = None
+        self.last_data = None
+        self.last_message = None
+
+
+def _publicar(queue, message):
+    # Cola de tamaño 1: un suscriptor lento solo recibe el mensaje más reciente
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(message)
+
+
+class PollScheduler:
+    """
+    Consulta periódicamente las ciudades con suscriptores y publica los resultados.
+
+    Parámetros:
+    - fetch (callable): Corrutina `fetch(city)` que devuelve los datos del clima de la ciudad.
+    - interval (float): Segundos entre consultas de una misma ciudad.
+    """
+
+    def __init__(self, fetch, interval=5.0):
+        self._fetch = fetch
+        self.interval = interval
+        self._cities = {}
+
+    def subscribe(self, city):
+        """
+        Registra un suscriptor para `city` y arranca su consulta periódica si es el primero.
+
+        Parámetros:
+        - city (str): Nombre de la ciudad.
+
+        Devuelve:
+        - asyncio.Queue: Cola donde se publican mensajes {"event": ..., "data": ...}.
+        """
+        key = normalizar_ciudad(city)
+        tracked = self._cities.get(key)
+        if tracked is None:
+            tracked = self._cities[key] = _CiudadSeguida(" ".join(city.split()))
+            tracked.task = asyncio.ensure_future(self._poll(tracked))
+
+        queue = asyncio.Queue(maxsize=1)
+        tracked.subscribers.add(queue)
+        if tracked.last_message is not None:
+            _publicar(queue, tracked.last_message)
+        return queue
+
+    def unsubscribe(self, city, queue):
+        """
+        Elimina un suscriptor; la ciudad sale del planificador cuando ya no le quedan suscriptores.
+        """
+        key = normalizar_ciudad(city)
+        tracked = self._cities.get(key)
+        if tracked is None:
+            return
+        tracked.subscribers.discard(queue)
+        if not tracked.subscribers:
+            tracked.task.cancel()
+            del self._cities[key]
+
+    async def _poll(self, tracked):
+        while True:
+            try:
+                data = await self._fetch(tracked.city)
+                message = {"event": "weather", "data": data}
+            except Exception as exc:
+                data = None
+                message = {
+                    "event": "error",
+                    "data": {
+                        "status": getattr(exc, "status_code", 500),
+                        "detail": getattr(exc, "detail", "API call failed"),
+                    },
+                }
+            # Las respuestas en caché son el mismo objeto: solo se publica cuando cambian
+            if data is None or data is not tracked.last_data:
+                tracked.last_data = data
+                tracked.last_message = message
+                for queue in tracked.subscribers:
+                    _publicar(queue, message)
+            await asyncio.sleep(self.interval)
+
+    def tracked(self):
+        """
+        Devuelve las ciudades seguidas y su número de suscriptores.
+        """
+        return {tracked.city: len(tracked.subscribers) for tracked in self._cities.values()}
+
+    async def close(self):
+        """
+        Cancela todas las consultas periódicas en curso.
+        """
+        tasks = [tracked.task for tracked in self._cities.values()]
+        self._cities.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,148 @@
+"""
+Cliente del flujo Server-Sent Events del clima (`GET /weather/{city}/stream`) para el front end.
+
+Cada ciudad se sigue con una única conexión por proceso de Streamlit, compartida por todas las
+sesiones que la muestran: un hilo lee el flujo y guarda el último evento, y la vista en vivo lo
+consulta en cada actualización en lugar de pedir el clima al servicio. La conexión se cierra sola
+cuando ninguna sesión lee la ciudad durante `idle_timeout` segundos, y entonces el servicio deja
+de consultarla.
+"""
+
+import json
+import threading
+import time
+
+import httpx
+
+
+def parsear_sse(lineas):
+    """
+    Convierte las líneas de un flujo Server-Sent Events en eventos.
+
+    Parámetros:
+    - lineas (iterable): Líneas del flujo, sin el salto de línea final.
+
+    Devuelve:
+    - generator: Tuplas (evento, datos) con los datos decodificados como JSON; los comentarios
+        (keep-alive) se ignoran.
+    """
+    evento, datos = "message", []
+    for linea in lineas:
+        if not linea:
+            if datos:
+                yield evento, json.loads("\n".join(datos))
+            evento, datos = "message", []
+        elif linea.startswith(":"):
+            continue
+        else:
+            campo, _, valor = linea.partition(":")
+            valor = valor[1:] if valor.startswith(" ") else valor
+            if campo == "event":
+                evento = valor
+            elif campo == "data":
+                datos.append(valor)
+
+
+class SuscripcionClima:
+    """
+    Conexión al flujo de una ciudad, leída en un hilo en segundo plano.
+
+    Parámetros:
+    - url (str): URL del flujo, p. ej. "http://localhost:8000/weather/London/stream".
+    - idle_timeout (float): Segundos sin lecturas tras los que se cierra la conexión.
+    - retry (float): Segundos de espera antes de reconectar tras un error.
+    - client (httpx.Client): Cliente HTTP a usar; por defecto uno propio.
+    """
+
+    def __init__(self, url, idle_timeout=30.0, retry=2.0, client=None):
+        self.url = url
+        self.idle_timeout = idle_timeout
+        self.retry = retry
+        self._client = client or httpx.Client(timeout=httpx.Timeout(5.0, read=None))
+        self._evento = None
+        self._recibido = 0.0
+        self._leido = time.monotonic()
+        self._parar = threading.Event()
+        self._hilo = threading.Thread(target=self._leer, name=f"sse {url}", daemon=True)
+        self._hilo.start()
+
+    @property
+    def activa(self):
+        """
+        Indica si el hilo lector sigue conectado o reconectando.
+        """
+        return self._hilo.is_alive()
+
+    def ultimo_evento(self, max_age=None):
+        """
+        Devuelve el último evento recibido y marca la ciudad como en uso.
+
+        Parámetros:
+        - max_age (float): Antigüedad máxima en segundos; si el último evento es más antiguo
+            se devuelve None.
+
+        Devuelve:
+        - tuple: (evento, datos), p. ej. ("weather", {...}) o ("error", {"status", "detail"}),
+            o None si todavía no llegó ninguno.
+        """
+        self._leido = time.monotonic()
+        if self._evento is None or (max_age is not None and self._leido - self._recibido > max_age):
+            return None
+        return self._evento
+
+    def _ociosa(self):
+        return self._parar.is_set() or time.monotonic() - self._leido > self.idle_timeout
+
+    def _lineas(self, respuesta):
+        # También los keep-alive cuentan: con el último se cierra una conexión ociosa
+        for linea in respuesta.iter_lines():
+            if self._ociosa():
+                return
+            yield linea
+
+    def _leer(self):
+        while not self._ociosa():
+            try:
+                with self._client.stream("GET", self.url, headers={"Accept": "text/event-stream"}) as respuesta:
+                    if respuesta.status_code != 200:
+                        respuesta.read()
+                        self._evento = ("error", {"status": respuesta.status_code, "detail": respuesta.text})
+                        self._recibido = time.monotonic()
+                    else:
+                        for evento in parsear_sse(self._lineas(respuesta)):
+                            self._evento = evento
+                            self._recibido = time.monotonic()
+                        if self._ociosa():
+                            return
+            except (httpx.HTTPError, ValueError):
+                pass
+            self._parar.wait(self.retry)
+
+    def cerrar(self):
+        """
+        Detiene el hilo lector; la conexión se cierra con la próxima línea recibida (a lo sumo
+        un keep-alive después).
+        """
+        self._parar.set()
+
+
+_suscripciones = {}
+_lock = threading.Lock()
+
+
+def suscripcion(url, **kwargs):
+    """
+    Devuelve la suscripción compartida al flujo `url`, creándola si no existe o si ya se cerró.
+
+    Parámetros:
+    - url (str): URL del flujo de la ciudad.
+    - **kwargs: Argumentos de `SuscripcionClima` para una suscripción nueva.
+
+    Devuelve:
+    - SuscripcionClima: Suscripción activa.
+    """
+    with _lock:
+        actual = _suscripciones.get(url)
+        if actual is None or not actual.activa:
+            actual = _suscripciones[url] = SuscripcionClima(url, **kwargs)
+        return actual